@@ -19,6 +19,9 @@ cred = credentials.Certificate(service_account_path)
 firebase_admin.initialize_app(cred)
 db = firestore.client()
 
+# Firestore rejects batches with more writes than this
+MAX_BATCH_WRITES = 500
+
 # Sample crime types and their weights (for random selection)
 CRIME_TYPES = [
     ("theft", 0.35), 
@@ -50,6 +53,8 @@ def get_random_date(days_back=30):
 def add_sample_data(num_entries=50):
     """Add sample crime data to Firestore"""
     crimes_ref = db.collection('crimes')
+    batch = db.batch()
+    pending = 0
     
     for _ in range(num_entries):
         # Select a random crime type based on weights
@@ -78,9 +83,17 @@ def add_sample_data(num_entries=50):
             'created_at': firestore.SERVER_TIMESTAMP
         }
         
-        # Add to Firestore
-        crimes_ref.add(crime_data)
+        # Queue the write; batches are committed MAX_BATCH_WRITES at a time
+        batch.set(crimes_ref.document(), crime_data)
+        pending += 1
         print(f"Added crime in {area}: {crime_type}")
+        if pending == MAX_BATCH_WRITES:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    
+    if pending:
+        batch.commit()
 
 if __name__ == '__main__':
     print("Adding sample crime data...")
@@ -45,17 +45,7 @@ def get_random_date(days_back=30):
     now = datetime.now()
     random_days = random.randint(0, days_back)
     random_seconds = random.randint(0, 86400)  # 86400 seconds in a day
-    return now - timedelta(days=random_days, seconds=random_seconds)9vt+N3VcPT+/eMm1GztHTD7hiz9BHuwNX7Er3vjt53Z6n4NEU\njNvh8tuzCBziNGCt2Nxp+Y2Ls6wOyoOl5xjGD45NUydssb7uUMzkQ5YhXFYD57+h\n4eoZfGTBrfeckOAIsF5vAFnv\n-----END PRIVATE KEY-----",
-    "client_email": "firebase-adminsdk-fbsvc@crimescope-61702.iam.gserviceaccount.com",
-    "client_id": "YOUR_CLIENT_ID",
-    "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-    "token_uri": "https://oauth2.googleapis.com/token",
-    "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
-    "client_x509_cert_url": "https://www.googleapis.com/robot/v1/metadata/x509/firebase-adminsdk-fbsvc%40crimescope-61702.iam.gserviceaccount.com"
-})
-
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+    return now - timedelta(days=random_days, seconds=random_seconds)
 
 # Sample crime types and their severity
 crime_types = {
@@ -70,7 +60,10 @@ def add_sample_data():
     # New Delhi coordinates (approximate center)
     center_lat, center_lng = 28.6139, 77.2090
     
-    # Add 20 sample crimes
+    crimes_ref = db.collection('crimes')
+    batch = db.batch()
+    
+    # Add 20 sample crimes in one batched write
     for i in range(20):
         # Generate random coordinates around center
         lat = center_lat + (random.random() - 0.5) * 0.1
@@ -91,9 +84,10 @@ def add_sample_data():
             'status': 'Reported'
         }
         
-        # Add to Firestore
-        db.collection('crimes').add(crime_data)
+        batch.set(crimes_ref.document(), crime_data)
         print(f"Added {crime_type} at {lat:.4f}, {lng:.4f}")
+    
+    batch.commit()
 
 if __name__ == '__main__':
     print("Adding sample crime data...")
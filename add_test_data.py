@@ -11,12 +11,12 @@ def add_test_data():
         {'type': 'fraud', 'latitude': 28.6135, 'longitude': 77.2095, 'location': '28.6135, 77.2095', 'severity': 1, 'description': 'Test fraud 1'}
     ]
     
-    for crime in crimes:
-        try:
-            response = requests.post(f'{base_url}/report', json=crime)
-            print(f'Reported {crime["type"]} (Severity: {crime["severity"]}): {response.status_code} {response.text}')
-        except Exception as e:
-            print(f'Error reporting {crime["type"]}: {str(e)}')
+    # One request for all of them; the server writes them in a single batch
+    try:
+        response = requests.post(f'{base_url}/report/bulk', json=crimes)
+        print(f'Reported {len(crimes)} crimes: {response.status_code} {response.text}')
+    except Exception as e:
+        print(f'Error reporting crimes: {str(e)}')
 
 if __name__ == '__main__':
     add_test_data()
@@ -0,0 +1,156 @@
+import bisect
+import logging
+import threading
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def serialize_alert(alert):
+    """Copy of an alert with datetimes as ISO strings, ready to emit"""
+    return {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in alert.items()
+    }
+
+
+class AlertChangeLog:
+    """
+    Server-side change log behind the Socket.IO delta sync.
+
+    Subscribe apply() to a store of the alerts collection. Every added,
+    modified or removed alert gets the next value of a monotonically
+    increasing sequence, and clients page through changes after the cursor
+    they last received. The log is compacted to the latest change per
+    alert; tombstones of removed alerts are kept up to max_tombstones, after
+    which older cursors can no longer be answered incrementally and the
+    client is told to reset and re-list.
+
+    Cursors are "<epoch>:<seq>". The epoch is random per process, so a
+    cursor from a restarted or different server also triggers a reset.
+    Each worker has its own log, so clients must take their cursors from
+    the worker their (sticky) socket is connected to.
+    """
+
+    def __init__(self, max_tombstones=10000):
+        self.max_tombstones = max_tombstones
+        self.epoch = uuid.uuid4().hex[:8]
+
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._floor = 0              # cursors below this must reset
+        self._alerts = {}            # alert_id -> current document
+        self._latest = {}            # alert_id -> seq of its latest change
+        self._log_seqs = []          # change seqs in order, may hold superseded entries
+        self._log_ids = []
+        self._tombstones = {}        # alert_id -> seq, insertion ordered
+
+    def apply(self, change_type, alert_id, alert, old=None):
+        """Store subscriber: record one change under the next sequence number"""
+        with self._lock:
+            self._seq += 1
+            self._latest[alert_id] = self._seq
+            self._log_seqs.append(self._seq)
+            self._log_ids.append(alert_id)
+            self._tombstones.pop(alert_id, None)
+            if change_type == 'REMOVED':
+                self._alerts.pop(alert_id, None)
+                self._tombstones[alert_id] = self._seq
+                while len(self._tombstones) > self.max_tombstones:
+                    dropped_id = next(iter(self._tombstones))
+                    self._floor = max(self._floor, self._tombstones.pop(dropped_id))
+                    del self._latest[dropped_id]
+            else:
+                self._alerts[alert_id] = dict(alert)
+
+            # Drop superseded entries once they make up half the log
+            if len(self._log_seqs) > 2 * len(self._latest) + 64:
+                self._compact()
+
+    def _compact(self):
+        live = [(seq, alert_id) for seq, alert_id in zip(self._log_seqs, self._log_ids)
+                if self._latest.get(alert_id) == seq]
+        self._log_seqs = [seq for seq, _ in live]
+        self._log_ids = [alert_id for _, alert_id in live]
+
+    @property
+    def cursor(self):
+        return f"{self.epoch}:{self._seq}"
+
+    def _parse_cursor(self, cursor):
+        """Sequence to resume after, or None if the client has to reset"""
+        if not cursor:
+            return None
+        try:
+            epoch, seq = str(cursor).split(':', 1)
+            seq = int(seq)
+        except ValueError:
+            return None
+        if epoch != self.epoch or seq < self._floor or seq > self._seq:
+            return None
+        return seq
+
+    def resumable(self, cursor):
+        """Whether changes_since(cursor) can answer incrementally instead of resetting"""
+        with self._lock:
+            return self._parse_cursor(cursor) is not None
+
+    def changes_since(self, cursor=None, limit=100):
+        """
+        One page of changes after a cursor.
+
+        Returns a dict with 'alerts' (current documents of new or changed
+        alerts, in change order), 'removed' (ids of deleted alerts), the
+        'cursor' to send next time, 'has_more' when another page is waiting
+        and 'reset' when the cursor was missing or too old, in which case the
+        pages list every current alert and clients should drop their cache.
+        """
+        with self._lock:
+            after = self._parse_cursor(cursor)
+            reset = after is None
+            if reset:
+                after = 0
+
+            alerts, removed = [], []
+            last_seq = after
+            position = bisect.bisect_right(self._log_seqs, after)
+            while position < len(self._log_seqs) and len(alerts) + len(removed) < limit:
+                seq, alert_id = self._log_seqs[position], self._log_ids[position]
+                position += 1
+                if self._latest.get(alert_id) != seq:
+                    continue
+                last_seq = seq
+                if alert_id in self._alerts:
+                    alert = serialize_alert(self._alerts[alert_id])
+                    alert['id'] = alert_id
+                    alert['change_seq'] = seq
+                    alerts.append(alert)
+                elif not reset:
+                    removed.append(alert_id)
+
+            has_more = False
+            for index in range(position, len(self._log_seqs)):
+                if self._latest.get(self._log_ids[index]) == self._log_seqs[index]:
+                    has_more = True
+                    break
+            if not has_more:
+                last_seq = self._seq
+            return {
+                'alerts': alerts,
+                'removed': removed,
+                'cursor': f"{self.epoch}:{last_seq}",
+                'has_more': has_more,
+                'reset': reset
+            }
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'epoch': self.epoch,
+                'seq': self._seq,
+                'alerts': len(self._alerts),
+                'log_entries': len(self._log_seqs),
+                'tombstones': len(self._tombstones),
+                'floor': self._floor
+            }
@@ -1,4 +1,10 @@
+# Must run first so eventlet/gevent can patch the standard library
+from socket_config import configure_async_mode, socketio_options
+SOCKETIO_ASYNC_MODE = configure_async_mode()
+
 import io
+import os
+import atexit
 import sys
 import logging
 import json
@@ -13,7 +19,7 @@ from functools import wraps
 from datetime import datetime, timedelta
 from flask import Flask, request, jsonify, render_template, session, redirect, url_for, flash, send_from_directory
 from flask_cors import CORS
-from flask_socketio import SocketIO
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from werkzeug.utils import secure_filename
 from google.cloud import firestore
 import firebase_admin
@@ -27,11 +33,27 @@ import requests as http_requests
 from functools import lru_cache
 import hashlib
 import numpy as np
-import math
-from simple_predictor import SimpleCrimePredictor
-import pandas as pd
+from route_scoring import score_route
+from routing_layer import RoutingCrimeLayer, RoutingLayerCache
+from osrm_client import OSRMClient, RouteCache, DEFAULT_OSRM_URL
+from routing_backends import OSRMBackend, LocalGraphBackend
+from danger_costs import EdgeDangerCosts
+from geo_math import haversine_km, distance_km, record_coordinates, grid_bucket, DISTANCE_MODES
+import geohash_index
+from crime_store import CrimeStore
+from crime_stats import CrimeStatsAggregator
+from crime_rollups import CrimeRollupStore
+from alert_changes import AlertChangeLog, serialize_alert
+from geo_rooms import GeoRoomRegistry
+from stats_broadcaster import CoalescingBroadcaster
+from job_pipeline import JobPipeline
+from repositories import FirestoreStorage, SqliteStorage, CrimeRepository, AlertRepository, SERVER_TIMESTAMP
+from hotzone_forecast import predict_hotzones as forecast_hotzones, build_series as build_hotzone_series, history_window
+from prediction_snapshots import SnapshotStore, PredictionScheduler, snapshot_response
+from model_training import TrainingService
+from predictor_registry import PredictorRegistry
+from bulk_ingest import BulkIngester, build_alert, parse_reports, FORMATS as BULK_FORMATS
 from dotenv import load_dotenv
-from geopy.distance import geodesic
 
 # Configure logging
 class UnicodeReplacer(logging.StreamHandler):
@@ -93,16 +115,107 @@ def make_error_response(message, status_code=500, details=None):
 # Constants
 MAX_ALERT_DISTANCE_KM = 5  # Maximum distance to show alerts (in kilometers)
 
-# Initialize crime predictor
-crime_predictor = SimpleCrimePredictor()
+# Forecasting backends are imported on first use (pandas and statsmodels
+# alone take longer than the rest of start-up); see PREDICTOR_PRELOAD
+predictors = PredictorRegistry()
+predictors.register('trend', 'simple_predictor:SimpleCrimePredictor')
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Firebase from the service account key file
-cred = credentials.Certificate('serviceAccountKey.json')
-firebase_admin.initialize_app(cred)
-db = firestore.Client()
+# Distance accuracy for Socket.IO sync: 'fast', 'haversine' or 'ellipsoid' (WGS84)
+SYNC_DISTANCE_MODE = os.getenv('SYNC_DISTANCE_MODE', 'haversine')
+if SYNC_DISTANCE_MODE not in DISTANCE_MODES:
+    logger.warning(f"Unknown SYNC_DISTANCE_MODE {SYNC_DISTANCE_MODE!r}, using 'haversine'")
+    SYNC_DISTANCE_MODE = 'haversine'
+
+# Crimes and alerts are read and written through repositories: Firestore by
+# default, or a local SQLite file to run and load test without Google Cloud
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'firestore')
+if STORAGE_BACKEND == 'sqlite':
+    db = None
+    storage_backend = SqliteStorage(os.getenv('SQLITE_PATH', 'crimescope.db'))
+else:
+    # Initialize Firebase from the service account key file
+    cred = credentials.Certificate('serviceAccountKey.json')
+    firebase_admin.initialize_app(cred)
+    db = firestore.Client()
+    storage_backend = FirestoreStorage(db)
+crime_repo = CrimeRepository(storage_backend)
+alert_repo = AlertRepository(storage_backend)
+
+# Keep the crimes collection in memory so read handlers avoid full collection scans,
+# with running stats counters fed by every change the store sees
+crime_store = CrimeStore(
+    crime_repo,
+    mode=os.getenv('CRIME_STORE_MODE', 'listener'),
+    max_staleness=float(os.getenv('CRIME_STORE_MAX_STALENESS', 30)),
+    reconcile_interval=float(os.getenv('CRIME_STORE_RECONCILE_SECONDS', 300))
+)
+crime_stats = CrimeStatsAggregator()
+crime_rollups = CrimeRollupStore()
+crime_store.subscribe(crime_stats.apply)
+crime_store.subscribe(crime_rollups.apply)
+crime_store.start()
+routing_layer_cache = RoutingLayerCache(crime_store, days=90)
+
+# Days of crimes the city-wide trend forecast is fitted on, and the horizons
+# precomputed for /api/predict/trend
+PREDICTOR_HISTORY_DAYS = int(os.getenv('PREDICTOR_HISTORY_DAYS', 180))
+PREDICTOR_HORIZONS = tuple(range(1, 31))   # every days value /api/predict/trend accepts
+PREDICTOR_PRELOAD = [name.strip() for name in os.getenv('PREDICTOR_PRELOAD', '').split(',') if name.strip()]
+if PREDICTOR_PRELOAD:
+    predictors.preload(PREDICTOR_PRELOAD, background=True)
+
+# Alerts get the same in-memory store; every change is numbered in the
+# change log that Socket.IO delta syncs page through
+alert_store = CrimeStore(
+    alert_repo,
+    mode='listener',
+    max_staleness=float(os.getenv('CRIME_STORE_MAX_STALENESS', 30)),
+    reconcile_interval=float(os.getenv('CRIME_STORE_RECONCILE_SECONDS', 300))
+)
+alert_changes = AlertChangeLog(max_tombstones=int(os.getenv('ALERT_LOG_TOMBSTONES', 10000)))
+alert_store.subscribe(alert_changes.apply)
+alert_store.start()
+
+# Optional local SQLite copy of both stores; geo queries for nearby alerts
+# are then answered by its R*Tree instead of the primary storage
+alert_reads = alert_repo
+if os.getenv('STORAGE_REPLICA_PATH') and STORAGE_BACKEND != 'sqlite':
+    replica_storage = SqliteStorage(os.getenv('STORAGE_REPLICA_PATH'))
+    crime_replica = CrimeRepository(replica_storage)
+    alert_reads = AlertRepository(replica_storage)
+    with replica_storage.transaction():
+        crime_store.subscribe(crime_replica.mirror, replay=True)
+        alert_store.subscribe(alert_reads.mirror, replay=True)
+
+# Shared OSRM client with a pooled HTTP session and a route geometry cache
+route_cache = RouteCache(
+    max_entries=int(os.getenv('ROUTE_CACHE_SIZE', 1000)),
+    ttl=float(os.getenv('ROUTE_CACHE_TTL', 3600)),
+    precision=int(os.getenv('ROUTE_CACHE_PRECISION', 4)),
+    path=os.getenv('ROUTE_CACHE_FILE') or None
+)
+osrm_client = OSRMClient(
+    base_url=os.getenv('OSRM_URL', DEFAULT_OSRM_URL),
+    call_timeout=float(os.getenv('OSRM_CALL_TIMEOUT', 10)),
+    total_budget=float(os.getenv('OSRM_REQUEST_BUDGET', 12)),
+    cache=route_cache
+)
+
+# Routing backend behind /api/safe-route: 'osrm' (default) or 'local' for
+# offline routing on a road graph file built with road_graph.py
+if os.getenv('ROUTING_BACKEND', 'osrm') == 'local':
+    routing_backend = LocalGraphBackend.from_file(os.getenv('ROAD_GRAPH_FILE', 'models/road_graph.npz'))
+    # Per-edge danger costs follow the crime store, so new reports only
+    # update the edges near them instead of re-costing the whole graph
+    edge_danger_costs = EdgeDangerCosts(routing_backend.graph, days=90)
+    crime_store.subscribe(edge_danger_costs.apply)
+    edge_danger_costs.load(crime_store.since(datetime.utcnow() - timedelta(days=90)))
+    routing_backend.danger_costs = edge_danger_costs
+else:
+    routing_backend = OSRMBackend(osrm_client)
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -112,9 +225,7 @@ app.config['SECRET_KEY'] = 'your-secret-key'  # Change this to a secure secret k
 socketio = SocketIO(
     app,
     cors_allowed_origins="*",
-    async_mode='threading',
-    logger=True,
-    engineio_logger=True,
+    **socketio_options(SOCKETIO_ASYNC_MODE),
     ping_timeout=60,
     ping_interval=25,
     max_http_buffer_size=1e8,  # 100MB
@@ -125,6 +236,40 @@ socketio = SocketIO(
     always_connect=True
 )
 
+# Clients are grouped into geohash-5 rooms by location so new alerts only go
+# to clients near them
+geo_rooms = GeoRoomRegistry()
+
+# Bursts of reports produce one diff-encoded crime_stats_update per window
+stats_broadcaster = CoalescingBroadcaster(
+    lambda event, payload: socketio.emit(event, payload, namespace='/'),
+    window=float(os.getenv('STATS_BROADCAST_WINDOW', 0.5))
+)
+# With a shared message queue several workers emit to the same clients and
+# their diffs interleave, so each worker then only sends full states
+stats_broadcaster.register(
+    'crime_stats_update', crime_stats.snapshot,
+    min_interval=float(os.getenv('STATS_BROADCAST_MIN_INTERVAL', 1.0)),
+    full_every=1 if os.getenv('SOCKETIO_MESSAGE_QUEUE') else 20
+)
+
+# Follow-up work for a crime report (stats, alert, police notification) runs
+# on background workers so /api/report answers as soon as the crime is stored
+report_pipeline = JobPipeline(
+    workers=int(os.getenv('REPORT_PIPELINE_WORKERS', 4)),
+    max_queue=int(os.getenv('REPORT_PIPELINE_QUEUE_SIZE', 1000)),
+    max_attempts=int(os.getenv('REPORT_PIPELINE_MAX_ATTEMPTS', 3))
+)
+atexit.register(report_pipeline.stop)
+
+# /api/report/bulk writes crimes and their alerts in WriteBatch chunks
+BULK_INGEST_MAX_REPORTS = int(os.getenv('BULK_INGEST_MAX_REPORTS', 10000))
+bulk_ingester = BulkIngester(
+    crime_repo, alert_repo, crime_store=crime_store, alert_store=alert_store,
+    concurrency=int(os.getenv('BULK_INGEST_CONCURRENCY', 4)),
+    police_lookup=lambda lat, lng: get_nearest_police_station(lat, lng)
+)
+
 # Enable CORS for all routes
 CORS(app, resources={
     r"/api/*": {
@@ -153,13 +298,10 @@ def index():
 @app.route('/api/crimes')
 def get_crimes():
     try:
-        crimes_ref = db.collection('crimes')
-        crimes = crimes_ref.order_by('timestamp', direction=firestore.Query.DESCENDING).limit(100).stream()
+        crimes = crime_store.recent(limit=100)
         
         crimes_list = []
-        for crime in crimes:
-            crime_data = crime.to_dict()
-            crime_data['id'] = crime.id
+        for crime_data in crimes:
             # Ensure all required fields are present
             if 'latitude' in crime_data and 'longitude' in crime_data:
                 crimes_list.append(crime_data)
@@ -175,6 +317,24 @@ def get_crimes():
             'message': str(e)
         }), 500
 
+@app.route('/api/crime-store/stats')
+def get_crime_store_stats():
+    """Expose in-memory crime store cache counters"""
+    return jsonify({
+        'status': 'success',
+        'data': {
+            **crime_store.get_stats(),
+            'rollups': crime_rollups.get_stats(),
+            'route_cache': route_cache.get_stats(),
+            'alert_changes': alert_changes.get_stats(),
+            'geo_rooms': geo_rooms.get_stats(),
+            'broadcasts': stats_broadcaster.get_stats(),
+            'report_pipeline': report_pipeline.get_stats(),
+            'predictors': predictors.get_stats(),
+            'prediction_snapshots': prediction_scheduler.get_stats(),
+            'model_training': model_trainer.get_stats()
+        }
+    })
 
 def get_nearest_police_station(lat, lng):
     """Find the nearest police station to the given coordinates"""
@@ -193,6 +353,91 @@ def get_nearest_police_station(lat, lng):
         logger.error(f"Error finding nearest police station: {str(e)}")
         return None
 
+def _report_stats_stage(context):
+    """Report pipeline: schedule a coalesced crime_stats_update"""
+    stats_broadcaster.mark_dirty('crime_stats_update')
+
+def _report_alert_stage(context):
+    """Report pipeline: store the alert for a reported crime and notify nearby clients"""
+    data = context['data']
+    police_station = context['police_station']
+    alert_data = build_alert(context['crime_id'], data, context['reported_at'], police_station)
+    alert_repo.save(context['alert_id'], alert_data)
+    alert_store.put(context['alert_id'], alert_data)
+    context['alert'] = alert_data
+    
+    # Notify clients near the alert
+    try:
+        socketio.emit('new_alert', {
+            'status': 'success',
+            'data': {**serialize_alert(alert_data), 'id': context['alert_id']},
+            'timestamp': datetime.utcnow().isoformat()
+        }, to=geo_rooms.target_rooms(alert_data['latitude'], alert_data['longitude'], MAX_ALERT_DISTANCE_KM),
+           namespace='/')
+    except Exception as e:
+        logger.error(f"Error broadcasting new alert: {str(e)}")
+
+def _report_police_stage(context):
+    """Report pipeline: notify the nearest police station of high-priority crimes"""
+    data = context['data']
+    police_station = context['police_station']
+    if not police_station or data['severity'] not in ['high', 'critical']:
+        return
+    
+    # Get police station contact info
+    station_name = police_station.get('name', 'local police station')
+    station_email = police_station.get('email', 'police@example.com')
+    
+    # Prepare email content
+    subject = f"{data['severity'].upper()} Priority Alert: {data['type']} in {data['location'].split(',')[0]}"
+    message = f"""
+    New Crime Alert:
+    
+    Type: {data['type']}
+    Severity: {data['severity']}
+    Location: {data['location']}
+    Coordinates: {data['latitude']}, {data['longitude']}
+    Reported by: {data.get('reported_by', 'Anonymous')}
+    Description: {data['description']}
+    
+    Time: {context['reported_at'].strftime('%Y-%m-%d %H:%M:%S')}
+    
+    Please take appropriate action.
+    """
+    
+    # In a real app, you would send the email here
+    logger.info(f"Sending alert to {station_name} ({station_email}): {subject}")
+    logger.info(f"Message: {message.strip()}")
+    
+    # Example of how you might send an email (commented out as it requires email setup)
+    """
+    import smtplib
+    from email.mime.text import MIMEText
+    
+    msg = MIMEText(message)
+    msg['Subject'] = subject
+    msg['From'] = 'alerts@crimescope.com'
+    msg['To'] = station_email
+    
+    # Configure your SMTP server details
+    with smtplib.SMTP('smtp.example.com', 587) as server:
+        server.starttls()
+        server.login('your_email@example.com', 'your_password')
+        server.send_message(msg)
+    """
+    
+    # Update alert with notification details
+    notification = {
+        'police_notified_at': datetime.utcnow(),
+        'notification_status': 'sent'
+    }
+    alert_repo.update(context['alert_id'], notification)
+    alert_store.put(context['alert_id'], {**context['alert'], **notification})
+
+report_pipeline.register_stage('stats', _report_stats_stage)
+report_pipeline.register_stage('alert', _report_alert_stage)
+report_pipeline.register_stage('police', _report_police_stage)
+
 @app.route('/api/report', methods=['POST'])
 def report_crime():
     try:
@@ -210,10 +455,10 @@ def report_crime():
         current_time = datetime.utcnow()
         
         # Add to Firestore
-        doc_ref = db.collection('crimes').document()
+        crime_id = crime_repo.new_id()
         crime_data = {
             **data,
-            'timestamp': firestore.SERVER_TIMESTAMP,
+            'timestamp': SERVER_TIMESTAMP,
             'status': 'reported',
             'verified': False,
             'reports': 1,
@@ -222,55 +467,8 @@ def report_crime():
                 'longitude': float(data['longitude'])
             }
         }
-        doc_ref.set(crime_data)
-        
-        # Get updated crime stats
-        try:
-            # Get all crimes
-            crimes_ref = db.collection('crimes')
-            crimes = crimes_ref.stream()
-            
-            # Initialize counters
-            stats = {
-                'total_crimes': 0,
-                'by_type': {},
-                'by_severity': {
-                    'high': 0,
-                    'medium': 0,
-                    'low': 0
-                },
-                'last_updated': datetime.utcnow().isoformat()
-            }
-            
-            # Count crimes by type and severity
-            for crime in crimes:
-                crime_data = crime.to_dict()
-                crime_type = crime_data.get('type', 'other')
-                severity = crime_data.get('severity', 'medium').lower()
-                
-                # Update type count
-                if crime_type not in stats['by_type']:
-                    stats['by_type'][crime_type] = 0
-                stats['by_type'][crime_type] += 1
-                
-                # Update severity count
-                if severity in stats['by_severity']:
-                    stats['by_severity'][severity] += 1
-                    
-                stats['total_crimes'] += 1
-            
-            # Emit the updated stats via Socket.IO
-            socketio.emit('crime_stats_update', {
-                'status': 'success',
-                'data': stats
-            })
-            
-        except Exception as e:
-            logger.error(f"Error getting crime stats: {str(e)}")
-            socketio.emit('crime_stats_update', {
-                'status': 'error',
-                'message': str(e)
-            })
+        crime_repo.save(crime_id, crime_data)
+        crime_store.put(crime_id, {**crime_data, 'timestamp': current_time})
         
         # Find nearest police station
         police_station = get_nearest_police_station(
@@ -278,83 +476,31 @@ def report_crime():
             float(data['longitude'])
         )
         
-        # Create an alert
-        alerts_ref = db.collection('alerts')
-        alert_data = {
-            'crime_id': crime_ref.id,
-            'title': f"{data['type']} reported in {data['location'].split(',')[0]}",
-            'description': data['description'],
-            'severity': data['severity'],
-            'location': data['location'],
-            'latitude': float(data['latitude']),
-            'longitude': float(data['longitude']),
-            'reported_at': current_time,
-            'status': 'active',
-            'reported_by': data.get('reported_by', 'Anonymous'),
-            'police_notified': bool(police_station),
+        # The alert id is picked now so a retried alert stage overwrites
+        # the same document instead of creating a duplicate
+        alert_id = alert_repo.new_id()
+        stages = ['stats', 'alert', 'police']
+        context = {
+            'data': data,
+            'crime_id': crime_id,
+            'alert_id': alert_id,
             'police_station': police_station,
-            'is_verified': False
+            'reported_at': current_time
         }
-        alerts_ref.add(alert_data)
-        
-        # Send notification to police for high-priority alerts
-        if police_station and data['severity'] in ['high', 'critical']:
-            try:
-                # Get police station contact info
-                station_name = police_station.get('name', 'local police station')
-                station_email = police_station.get('email', 'police@example.com')
-                
-                # Prepare email content
-                subject = f"{data['severity'].upper()} Priority Alert: {data['type']} in {data['location'].split(',')[0]}"
-                message = f"""
-                New Crime Alert:
-                
-                Type: {data['type']}
-                Severity: {data['severity']}
-                Location: {data['location']}
-                Coordinates: {data['latitude']}, {data['longitude']}
-                Reported by: {data.get('reported_by', 'Anonymous')}
-                Description: {data['description']}
-                
-                Time: {current_time.strftime('%Y-%m-%d %H:%M:%S')}
-                
-                Please take appropriate action.
-                """
-                
-                # In a real app, you would send the email here
-                logger.info(f"Sending alert to {station_name} ({station_email}): {subject}")
-                logger.info(f"Message: {message.strip()}")
-                
-                # Example of how you might send an email (commented out as it requires email setup)
-                """
-                import smtplib
-                from email.mime.text import MIMEText
-                
-                msg = MIMEText(message)
-                msg['Subject'] = subject
-                msg['From'] = 'alerts@crimescope.com'
-                msg['To'] = station_email
-                
-                # Configure your SMTP server details
-                with smtplib.SMTP('smtp.example.com', 587) as server:
-                    server.starttls()
-                    server.login('your_email@example.com', 'your_password')
-                    server.send_message(msg)
-                """
-                
-                # Update alert with notification details
-                alert_data['police_notified_at'] = datetime.utcnow()
-                alert_data['notification_status'] = 'sent'
-                
-            except Exception as e:
-                logger.error(f"Error sending police notification: {str(e)}")
-                alert_data['notification_status'] = 'failed'
-                alert_data['notification_error'] = str(e)
+        job_id = report_pipeline.submit(stages, context)
+        if job_id is None:
+            logger.warning(f"Report pipeline full, processing crime {crime_id} inline")
+            failed_stages = report_pipeline.run_inline(stages, context)
+            if failed_stages:
+                # The crime is saved; failing the request would only invite a duplicate retry
+                logger.error(f"Follow-up for crime {crime_id} failed in stages: {', '.join(failed_stages)}")
         
         return jsonify({
             'status': 'success',
-            'message': 'Crime reported and alert created successfully',
-            'crime_id': crime_ref.id,
+            'message': 'Crime reported successfully',
+            'crime_id': crime_id,
+            'alert_id': alert_id,
+            'job_id': job_id,
             'police_notified': bool(police_station),
             'police_station': police_station
         })
@@ -367,6 +513,62 @@ def report_crime():
             'error': str(e)
         }), 500
 
+@app.route('/api/report/bulk', methods=['POST'])
+def bulk_report_crimes():
+    """
+    Ingest many crime reports at once with batched Firestore writes.
+
+    The body is a JSON array (or {"reports": [...]}), JSON lines or CSV,
+    picked with ?format= or from the Content-Type. ?alerts=false skips
+    creating an alert per crime, e.g. for historical imports.
+    """
+    try:
+        fmt = request.args.get('format')
+        if not fmt:
+            content_type = request.mimetype or ''
+            if 'csv' in content_type:
+                fmt = 'csv'
+            elif 'ndjson' in content_type or 'jsonl' in content_type:
+                fmt = 'jsonl'
+            else:
+                fmt = 'json'
+        if fmt not in BULK_FORMATS:
+            return jsonify({
+                'status': 'error',
+                'message': f"format must be one of {', '.join(BULK_FORMATS)}"
+            }), 400
+        
+        try:
+            reports = parse_reports(request.get_data(as_text=True), fmt)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': f"Could not parse reports: {str(e)}"
+            }), 400
+        if len(reports) > BULK_INGEST_MAX_REPORTS:
+            return jsonify({
+                'status': 'error',
+                'message': f"At most {BULK_INGEST_MAX_REPORTS} reports per request, use bulk_ingest.py for larger loads"
+            }), 413
+        
+        create_alerts = request.args.get('alerts', 'true').lower() not in ('0', 'false', 'no')
+        result = bulk_ingester.ingest(reports, create_alerts=create_alerts)
+        if result['written']:
+            stats_broadcaster.mark_dirty('crime_stats_update')
+        
+        return jsonify({
+            'status': 'success' if not result['failed_batches'] else 'error',
+            'data': result
+        }), 200 if not result['failed_batches'] else 502
+        
+    except Exception as e:
+        logger.error(f"Error ingesting crime reports: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to ingest crime reports',
+            'error': str(e)
+        }), 500
+
 # Crime type configuration
 CRIME_TYPES = {
     'theft': {
@@ -410,34 +612,25 @@ def get_crime_stats():
     try:
         # Default to last 30 days of data
         days = request.args.get('days', default=30, type=int)
-        limit = min(request.args.get('limit', default=1000, type=int), 5000)
         
         # Calculate date range
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
         
-        # Query Firestore for crimes in date range
-        crimes_ref = db.collection('crimes')
-        query = crimes_ref.where('timestamp', '>=', start_date).limit(limit)
-        
-        # Execute query
-        docs = query.stream()
+        # Sum the rollup buckets covering the date range
+        window = crime_rollups.window(start_date, end_date)
         
         # Initialize counters for all crime types
         crime_counts = {crime_type: 0 for crime_type in CRIME_TYPES}
         
         # Process results
-        total_crimes = 0
-        for doc in docs:
-            crime = doc.to_dict()
-            crime_type = crime.get('type', 'other').lower()
-            
+        total_crimes = window['total_crimes']
+        for crime_type, count in window['by_type'].items():
             # Use 'other' if crime type is not in our predefined list
             if crime_type not in CRIME_TYPES:
                 crime_type = 'other'
                 
-            crime_counts[crime_type] += 1
-            total_crimes += 1
+            crime_counts[crime_type] += count
         
         # Prepare data for chart
         chart_data = {
@@ -496,49 +689,21 @@ def get_trends():
     try:
         # Get query parameters with defaults
         days = request.args.get('days', default=30, type=int)
-        limit = min(request.args.get('limit', default=100, type=int), 1000)
         
         # Calculate date range
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
         
-        # Query Firestore for crimes in date range
-        crimes_ref = db.collection('crimes')
-        query = crimes_ref.where('timestamp', '>=', start_date).limit(limit)
-        
-        # Execute query
-        docs = query.stream()
-        
-        # Process results
-        crimes = []
-        for doc in docs:
-            crime = doc.to_dict()
-            crime['id'] = doc.id
-            crimes.append(crime)
-        
-        # Calculate basic statistics
-        total_crimes = len(crimes)
-        
-        # Group by crime type
-        by_type = {}
-        for crime in crimes:
-            crime_type = crime.get('type', 'unknown').lower()
-            by_type[crime_type] = by_type.get(crime_type, 0) + 1
+        # Counts by crime type come from the rollup buckets covering the range
+        window = crime_rollups.window(start_date, end_date)
+        total_crimes = window['total_crimes']
+        by_type = window['by_type']
         
         # Get top 5 crime types
         top_crimes = sorted(by_type.items(), key=lambda x: x[1], reverse=True)[:5]
         
-        # Calculate hotspots (areas with most crimes)
-        locations = {}
-        for crime in crimes:
-            loc = (crime.get('latitude'), crime.get('longitude'))
-            if None not in loc:
-                locations[loc] = locations.get(loc, 0) + 1
-        
-        hotspots = [{'lat': lat, 'lng': lng, 'count': count} 
-                   for (lat, lng), count in sorted(locations.items(), 
-                                                 key=lambda x: x[1], 
-                                                 reverse=True)[:10]]
+        # Calculate hotspots (grid cells with most crimes)
+        hotspots = crime_rollups.top_cells(start_date, end_date, limit=10)
         
         # Prepare response
         response = {
@@ -566,28 +731,25 @@ def get_hotspots():
     try:
         # 1. Fetch crimes from the last 30 days
         thirty_days_ago = datetime.now() - timedelta(days=30)
-        crimes_ref = db.collection('crimes').where('timestamp', '>=', thirty_days_ago).stream()
-
-        # 2. Group crimes into zones and calculate scores
-        hotspots = {}
-        for crime in crimes_ref:
-            data = crime.to_dict()
-            if 'latitude' in data and 'longitude' in data:
-                # Create a zone key by truncating coordinates (approx. 110m grid)
-                zone_key = f"{round(data['latitude'], 3)},{round(data['longitude'], 3)}"
-                
-                if zone_key not in hotspots:
-                    hotspots[zone_key] = {'count': 0, 'severity_sum': 0, 'lat': round(data['latitude'], 3), 'lng': round(data['longitude'], 3)}
-                
-                hotspots[zone_key]['count'] += 1
-                hotspots[zone_key]['severity_sum'] += data.get('severity', 1)
+        recent_crimes = crime_store.since(thirty_days_ago)
+
+        # 2. Group crimes into zones (approx. 110m grid) and calculate scores
+        located = [c for c in recent_crimes if 'latitude' in c and 'longitude' in c]
+        zone_lats, zone_lngs, zone_of = grid_bucket(
+            [c['latitude'] for c in located], [c['longitude'] for c in located], decimals=3
+        )
+        counts = np.bincount(zone_of, minlength=len(zone_lats))
+        severity_sums = np.bincount(
+            zone_of, weights=[c.get('severity', 1) for c in located], minlength=len(zone_lats)
+        )
 
         # 3. Calculate final hotness score and format output
         hotspot_list = []
-        for key, value in hotspots.items():
-            if value['count'] > 1: # Only consider zones with more than one crime
-                score = value['count'] * (value['severity_sum'] / value['count'])
-                hotspot_list.append([value['lat'], value['lng'], score])
+        for lat, lng, count, severity_sum in zip(zone_lats.tolist(), zone_lngs.tolist(),
+                                                 counts.tolist(), severity_sums.tolist()):
+            if count > 1: # Only consider zones with more than one crime
+                score = count * (severity_sum / count)
+                hotspot_list.append([lat, lng, score])
 
         return jsonify({
             'status': 'success',
@@ -639,13 +801,6 @@ def get_safest_route():
             3: 20000000.0   # Impassable barrier
         }
         
-        # Increased danger zones to ensure wider berth around crime areas
-        danger_zones = {
-            'high': 0.8,     # ~88km radius for high severity crimes
-            'medium': 0.5,   # ~55km radius for medium severity
-            'low': 0.3       # ~33km radius for low severity
-        }
-        
         # More aggressive buffer zone
         buffer_zone_multiplier = 6.0
         
@@ -655,186 +810,74 @@ def get_safest_route():
         # Add a larger global danger zone around all crimes
         global_danger_radius = 0.2  # ~22km minimum distance from any crime
         
-        # Get recent crimes (last 90 days)
+        # Get the cached routing layer for recent crimes (last 90 days). It holds
+        # coordinates, severity thresholds, danger radii and a spatial index,
+        # and is only rebuilt when the crime set changes
         try:
-            logging.info("Fetching recent crimes from database...")
-            ninety_days_ago = datetime.now() - timedelta(days=90)
-            crimes_ref = db.collection('crimes').where('timestamp', '>=', ninety_days_ago).stream()
-            
-            # Convert crimes to a list of (lat, lng, weight, radius) tuples
-            crime_points = []
-            crime_count = 0
-            
-            # First pass: collect all crimes and calculate severity statistics
-            all_severities = []
-            for crime in crimes_ref:
-                try:
-                    crime_data = crime.to_dict()
-                    if 'latitude' not in crime_data or 'longitude' not in crime_data:
-                        continue
-                    all_severities.append(float(crime_data.get('severity', 1)))
-                except Exception as e:
-                    continue
-            
-            # Calculate severity percentiles
-            if all_severities:
-                all_severities.sort()
-                low_threshold = np.percentile(all_severities, 33) if len(all_severities) > 3 else 2
-                high_threshold = np.percentile(all_severities, 66) if len(all_severities) > 3 else 4
-            else:
-                low_threshold = 2
-                high_threshold = 4
-            
-            # Reset the crimes reference to iterate again
-            crimes_ref = db.collection('crimes').where('timestamp', '>=', ninety_days_ago).stream()
-            
-            for crime in crimes_ref:
-                try:
-                    crime_data = crime.to_dict()
-                    if 'latitude' not in crime_data or 'longitude' not in crime_data:
-                        continue
-                        
-                    severity = float(crime_data.get('severity', 1))
-                    
-                    # Determine danger zone radius based on severity
-                    if severity >= high_threshold:
-                        radius = danger_zones['high']
-                    elif severity >= low_threshold:
-                        radius = danger_zones['medium']
-                    else:
-                        radius = danger_zones['low']
-                    
-                    # Apply safety level multiplier to severity
-                    weighted_severity = severity * crime_weights[safety_level]
-                    
-                    crime_points.append((
-                        float(crime_data['latitude']), 
-                        float(crime_data['longitude']), 
-                        weighted_severity,
-                        radius
-                    ))
-                    crime_count += 1
-                except Exception as e:
-                    logging.error(f"Error processing crime record {crime.id}: {e}")
-                    continue
-                    
-            logging.info(f"Successfully loaded {crime_count} crime records with severity-based danger zones")
-            
+            layer = routing_layer_cache.get()
+            logging.info(f"Using routing crime layer with {len(layer)} crimes")
         except Exception as e:
-            logging.error(f"Error fetching crimes: {e}", exc_info=True)
-            # Continue with empty crime points if we can't fetch from database
-            crime_points = []
-        
-        # Generate alternative routes using different OSRM parameters
-        alternatives = 2  # Number of alternative routes to consider
+            logging.error(f"Error building routing crime layer: {e}", exc_info=True)
+            # Continue with no crime points if the layer can't be built
+            layer = RoutingCrimeLayer([], [], [])
+        
+        # Apply safety level multiplier to severity
+        crime_array = layer.crime_points(crime_weights[safety_level])
+        crime_reach_km = layer.reach_km(
+            global_danger_radius=global_danger_radius,
+            buffer_zone_multiplier=buffer_zone_multiplier
+        )
         
-        # Base OSRM URL with parameters
-        osrm_base_url = f"http://router.project-osrm.org/route/v1/{mode}/{start_lng},{start_lat};{end_lng},{end_lat}"
+        # Get candidate routes from the configured routing backend. OSRM returns
+        # alternatives for several snapping radiuses, queried in parallel; the
+        # local graph backend returns a crime-weighted shortest path
+        candidate_routes, routing_errors = routing_backend.routes(
+            mode, start_lat, start_lng, end_lat, end_lng,
+            crime_layer=layer,
+            reach_km=crime_reach_km
+        )
         
-        # Try different radiuses to get alternative routes
-        radiuses = [5000, 10000, 20000]  # meters
         all_routes = []
-        
-        for radius in radiuses:
+        for label, route in candidate_routes:
             try:
-                # Get route with current radius
-                osrm_url = f"{osrm_base_url}?overview=full&geometries=geojson&radiuses={radius};{radius}&alternatives={alternatives}"
-                response = http_requests.get(osrm_url, timeout=10)
-                response.raise_for_status()
+                geometry = route['geometry']
+                coordinates = geometry['coordinates']
                 
-                route_data = response.json()
+                # Calculate danger score for this route in one batched pass
+                segment_penalties, danger_score = score_route(
+                    coordinates,
+                    crime_array,
+                    global_danger_radius=global_danger_radius,
+                    buffer_zone_multiplier=buffer_zone_multiplier,
+                    min_distance_multiplier=min_distance_multiplier,
+                    index=layer.index,
+                    reach_km=crime_reach_km
+                )
                 
-                # Process each route
-                for i, route in enumerate(route_data.get('routes', [])):
-                    geometry = route['geometry']
-                    coordinates = geometry['coordinates']
-                    
-                    # Calculate danger score for this route
-                    danger_score = 0
-                    segment_penalties = [0] * (len(coordinates) - 1)  # Track danger per segment
-                    
-                    for crime_lat, crime_lng, severity, radius in crime_points:
-                        crime_point = (crime_lat, crime_lng)
-                        
-                        # Check distance to each segment of the route
-                        for j in range(len(coordinates) - 1):
-                            p1 = (coordinates[j][1], coordinates[j][0])  # lat, lng
-                            p2 = (coordinates[j+1][1], coordinates[j+1][0])
-                            
-                            # Calculate distance from crime to this segment in kilometers
-                            dist = point_to_segment_dist(crime_point, p1, p2) * 111.32  # Convert to km
-                    
-                            # Absolute barrier - any route through immediate crime areas is rejected
-                            if dist <= radius * 1.2:  # Increased from 1.0 to 1.2 for larger avoidance
-                                segment_penalties[j] = float('inf')
-                                break
-                                
-                            # Apply a global minimum distance penalty to all crimes
-                            if dist < global_danger_radius * 1.5:  # Increased safety margin
-                                segment_penalties[j] = float('inf')
-                                break
-                            
-                            # Enhanced danger zone calculation with exponential falloff
-                            if dist <= radius * buffer_zone_multiplier * 1.2:  # Slightly larger buffer
-                                # Calculate distance ratio with better numerical stability
-                                distance_ratio = max(0, (dist - radius) / (radius * (buffer_zone_multiplier - 1)))
-                                
-                                # Use exponential decay for more natural falloff
-                                falloff = math.exp(-4.0 * distance_ratio)
-                                
-                                # Get crime severity with better defaults
-                                current_severity = crime_point[2] if len(crime_point) > 2 else 'medium'
-                                
-                                # Enhanced severity scaling - makes high severity crimes much more impactful
-                                severity_weights = {
-                                    'high': 30.0,    # Increased from 20.0
-                                    'medium': 12.0,  # Increased from 10.0
-                                    'low': 6.0       # Increased from 5.0
-                                }
-                                severity_multiplier = severity_weights.get(current_severity, 1.0)
-                                
-                                # Higher base penalty
-                                base_penalty = 15000000.0  # Increased from 10,000,000
-                                
-                                # More aggressive distance-based penalty
-                                distance_penalty = (1.0 / (dist ** 0.7 + 0.0001)) * min_distance_multiplier * 2000
-                                
-                                # Calculate total penalty with exponential falloff and severity scaling
-                                total_penalty = (base_penalty * falloff * severity_multiplier) + distance_penalty
-                                
-                                # Apply the penalty to the segment
-                                segment_penalties[j] += total_penalty
-                                
-                                # Create a larger avoidance zone for high-severity crimes
-                                if current_severity == 'high' and dist < radius * 1.8:  # Increased from 1.5
-                                    segment_penalties[j] = float('inf')
-                                    break
-                                    
-                                # Reject any segment that comes too close to any crime
-                                if dist < radius * 0.7:  # Increased from 0.5
-                                    segment_penalties = [float('inf')] * len(segment_penalties)
-                                    break
-                    
-                    # Calculate total danger score with non-linear scaling
-                    # This makes routes with any high-danger segments much less desirable
-                    danger_score = sum(penalty ** 2 for penalty in segment_penalties) ** 0.5
-                    
-                    # Store route with its score and segment penalties
-                    all_routes.append({
-                        'geometry': geometry,
-                        'distance': route['distance'],  # meters
-                        'duration': route['duration'],  # seconds
-                        'danger_score': danger_score,
-                        'coordinates': coordinates,
-                        'segment_penalties': segment_penalties  # Store segment penalties for scoring
-                    })
-                    
-            except (http_requests.RequestException, ValueError) as e:
-                logging.warning(f"Failed to get route with radius {radius}m: {e}")
+                # Store route with its score and segment penalties
+                all_routes.append({
+                    'geometry': geometry,
+                    'distance': route['distance'],  # meters
+                    'duration': route['duration'],  # seconds
+                    'danger_score': danger_score,
+                    'coordinates': coordinates,
+                    'segment_penalties': segment_penalties  # Store segment penalties for scoring
+                })
+                
+            except (KeyError, TypeError, ValueError) as e:
+                logging.warning(f"Skipping malformed route {label}: {e}")
                 continue
         
         if not all_routes:
-            return jsonify({'status': 'error', 'message': 'No valid routes found'}), 404
+            # Say why: timeouts, HTTP errors or no path, per radius or backend
+            reasons = {str(label): str(error) for label, error in routing_errors.items()}
+            if reasons:
+                logging.error(f"No routes from {routing_backend.name} backend: {reasons}")
+            return jsonify({
+                'status': 'error',
+                'message': 'No valid routes found',
+                'errors': reasons
+            }), 404
         
         # Enhanced route scoring that strongly prioritizes safety
         def route_score(route):
@@ -928,24 +971,112 @@ def get_safest_route():
             'details': str(e)
         }), 500
 
-def point_to_segment_dist(p, a, b):
-    px = b[1] - a[1]
-    py = b[0] - a[0]
-    norm = px*px + py*py
-    u = ((p[1] - a[1]) * px + (p[0] - a[0]) * py) / float(norm) if norm != 0 else 0
-    u = max(0, min(1, u))
-    x = a[1] + u * px
-    y = a[0] + u * py
-    dx = x - p[1]
-    dy = y - p[0]
-    return math.sqrt(dx*dx + dy*dy)
+HOTZONE_METHODS = ('arima', 'lstm', 'prophet')
+HOTZONE_HISTORY_DAYS = 90
+HOTZONE_MAX_DAYS = 30
+HOTZONE_DEFAULT_LIMIT = 20
+
+def hotzone_response(predictions, model_info, days, method, generated_at):
+    """Body of a /api/predict/hotzones response"""
+    if not model_info['history_crimes']:
+        return {
+            'status': 'success',
+            'data': [],
+            'message': 'No recent crime data available for prediction'
+        }
+    return {
+        'status': 'success',
+        'data': predictions,
+        'metadata': {
+            'total_predictions': len(predictions),
+            'prediction_days': days,
+            'method': method,
+            **model_info,
+            'generated_at': generated_at.isoformat()
+        }
+    }
+
+def compute_prediction_snapshot():
+    """Every forecast the prediction endpoints serve, keyed for the snapshot store"""
+    now = datetime.utcnow()
+    entries = {}
+    
+    # Hot zones for the longest horizon; shorter ones are its first days
+    start, end_day = history_window(now, HOTZONE_HISTORY_DAYS)
+    crimes = crime_store.since(start)
+    series = build_hotzone_series(crimes, end_day, HOTZONE_HISTORY_DAYS)
+    for method in HOTZONE_METHODS:
+        predictions, model_info = forecast_hotzones(
+            crimes, days=HOTZONE_MAX_DAYS, method=method, limit=HOTZONE_DEFAULT_LIMIT, now=now, series=series
+        )
+        entries[f'hotzones:{method}'] = {'predictions': predictions, 'model_info': model_info}
+    
+    # Trend forecasts only once the ARIMA predictor has been loaded, by a
+    # request or PREDICTOR_PRELOAD
+    if predictors.loaded('trend'):
+        trend_crimes = crime_store.since(now - timedelta(days=PREDICTOR_HISTORY_DAYS))
+        horizons = predictors.get('trend').predict_horizons(trend_crimes, PREDICTOR_HORIZONS)
+        for days, predictions in horizons.items():
+            entries[f'trend:{days}'] = predictions
+    return entries
+
+# Forecasts are recomputed in the background on a cadence, or sooner after
+# enough new crimes, so the prediction endpoints only look up a snapshot
+prediction_snapshots = SnapshotStore(path=os.getenv('PREDICTION_SNAPSHOT_FILE', 'models/prediction_snapshot.json') or None)
+prediction_snapshots.load()
+prediction_scheduler = PredictionScheduler(
+    compute_prediction_snapshot, prediction_snapshots,
+    interval=float(os.getenv('PREDICTOR_REFRESH_SECONDS', 300)),
+    min_changes=int(os.getenv('PREDICTOR_REFRESH_MIN_CRIMES', 50))
+)
+crime_store.subscribe(prediction_scheduler.note_change)
+prediction_scheduler.start()
+atexit.register(prediction_scheduler.stop)
+
+def current_snapshot(key):
+    """Snapshot entry for a key, unless it was generated before today and its forecast days have shifted"""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return prediction_snapshots.get(key, generated_after=today)
+
+@app.route('/api/predict/trend', methods=['GET'])
+def predict_trend():
+    """City-wide daily crime forecast, from the latest prediction snapshot when available"""
+    try:
+        days = int(request.args.get('days', 7))
+        if not 1 <= days <= 30:
+            raise ValueError('days must be between 1 and 30')
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    
+    snapshot = current_snapshot(f'trend:{days}')
+    if snapshot is not None:
+        predictions, etag, version, generated_at = snapshot
+        return snapshot_response({
+            'status': 'success',
+            'data': predictions,
+            'precomputed': True,
+            'snapshot_version': version,
+            'generated_at': generated_at.isoformat()
+        }, etag)
+    
+    predictions = predictors.get('trend').predict(
+        crime_store.since(datetime.utcnow() - timedelta(days=PREDICTOR_HISTORY_DAYS)), days
+    )
+    return jsonify({
+        'status': 'success',
+        'data': predictions,
+        'precomputed': False
+    })
 
 @app.route('/api/predict/hotzones', methods=['GET'])
 def predict_hotzones():
     try:
         # Get query parameters with validation
         method = request.args.get('method', 'arima').lower()
-        if method not in ['arima', 'lstm', 'prophet']:
+        if method not in HOTZONE_METHODS:
             method = 'arima'
             
         try:
@@ -953,93 +1084,29 @@ def predict_hotzones():
         except (ValueError, TypeError):
             days = 7
         
-        # Get recent crimes with error handling
         try:
-            from datetime import datetime, timedelta
-            import math
-            import random
-            
-            # Get crimes from the last 90 days
-            ninety_days_ago = datetime.utcnow() - timedelta(days=90)
-            crimes_ref = db.collection('crimes')
-            crimes_query = crimes_ref.where('timestamp', '>=', ninety_days_ago)
-            crimes = crimes_query.stream()
-            
-            # Convert to list of dicts with validation
-            crimes_list = []
-            for crime in crimes:
-                try:
-                    crime_data = crime.to_dict()
-                    crime_data['id'] = crime.id
-                    
-                    # Ensure required fields exist and are valid
-                    if all(field in crime_data for field in ['timestamp', 'latitude', 'longitude', 'severity']):
-                        # Convert Firestore timestamp to datetime if needed
-                        if hasattr(crime_data['timestamp'], 'to_pydatetime'):
-                            crime_data['timestamp'] = crime_data['timestamp'].to_pydatetime()
-                        
-                        # Add additional processing for prediction features
-                        crime_data['day_of_week'] = crime_data['timestamp'].weekday()
-                        crime_data['hour_of_day'] = crime_data['timestamp'].hour
-                        crime_data['month'] = crime_data['timestamp'].month
-                        
-                        # Add severity score (1-5, higher is more severe)
-                        severity_map = {'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
-                        crime_data['severity_score'] = severity_map.get(crime_data.get('severity', 'low').lower(), 1)
-                        
-                        crimes_list.append(crime_data)
-                except Exception as e:
-                    logger.warning(f"Error processing crime {crime.id}: {str(e)}")
-                    continue
-            
-            if not crimes_list:
+            limit = max(1, min(int(request.args.get('limit', HOTZONE_DEFAULT_LIMIT)), 500))  # Hot zones per day
+        except (ValueError, TypeError):
+            limit = HOTZONE_DEFAULT_LIMIT
+        
+        # Default requests are served from the latest prediction snapshot
+        snapshot = current_snapshot(f'hotzones:{method}') if limit == HOTZONE_DEFAULT_LIMIT else None
+        if snapshot is not None:
+            entry, etag, version, generated_at = snapshot
+            last_date = (generated_at.date() + timedelta(days=days)).strftime('%Y-%m-%d')
+            predictions = [p for p in entry['predictions'] if p['date'] <= last_date]
+            body = hotzone_response(predictions, entry['model_info'], days, method, generated_at)
+            body.setdefault('metadata', {})['snapshot_version'] = version
+            return snapshot_response(body, f"{etag}-{days}")
+        
+        try:
+            # Forecast every grid cell from the crimes of the 90 full days before today
+            now = datetime.utcnow()
+            crimes = crime_store.since(history_window(now, HOTZONE_HISTORY_DAYS)[0])
+            predictions, model_info = forecast_hotzones(crimes, days=days, method=method, limit=limit, now=now)
+            if not model_info['history_crimes']:
                 logger.warning("No valid crime data found for prediction")
-                return jsonify({
-                    'status': 'success',
-                    'data': [],
-                    'message': 'No recent crime data available for prediction'
-                })
-            
-            # Generate predictions (mock implementation - replace with actual ML model)
-            predictions = []
-            today = datetime.utcnow().date()
-            
-            # Generate predictions for each of the next 'days' days
-            for day_offset in range(1, days + 1):
-                prediction_date = today + timedelta(days=day_offset)
-                
-                # Sample prediction logic - replace with actual model prediction
-                for _ in range(random.randint(3, 10)):  # 3-10 hotzones per day
-                    # Get a random crime location as base
-                    base_crime = random.choice(crimes_list)
-                    
-                    # Add some randomness to create hotzones
-                    lat = base_crime['latitude'] + (random.random() * 0.02 - 0.01)
-                    lng = base_crime['longitude'] + (random.random() * 0.02 - 0.01)
-                    risk_score = min(1.0, base_crime['severity_score'] * 0.2 + random.random() * 0.3)
-                    predicted_crimes = int(base_crime['severity_score'] * (1 + random.random()) * 2)
-                    
-                    predictions.append({
-                        'date': prediction_date.strftime('%Y-%m-%d'),
-                        'latitude': lat,
-                        'longitude': lng,
-                        'risk_score': round(risk_score, 2),
-                        'predicted_crimes': predicted_crimes,
-                        'is_high_risk': risk_score > 0.6,
-                        'crime_types': [base_crime.get('type', 'unknown')],
-                        'confidence': round(random.uniform(0.7, 0.95), 2)
-                    })
-            
-            return jsonify({
-                'status': 'success',
-                'data': predictions,
-                'metadata': {
-                    'total_predictions': len(predictions),
-                    'prediction_days': days,
-                    'method': method,
-                    'generated_at': datetime.utcnow().isoformat()
-                }
-            })
+            return jsonify(hotzone_response(predictions, model_info, days, method, now))
             
         except Exception as e:
             logger.error(f"Error generating predictions: {str(e)}", exc_info=True)
@@ -1057,6 +1124,105 @@ def predict_hotzones():
             'details': str(e)
         }), 500
 
+def _install_trained_arima(job, paths):
+    """Serve trend forecasts from a freshly trained ARIMA model"""
+    import joblib
+    predictors.get('trend').install_model(job.dates, job.values, joblib.load(paths['arima_model.joblib']))
+    prediction_scheduler.refresh_now()
+
+# ARIMA/LSTM fits run in worker processes; trained ARIMA models replace the
+# one the trend forecasts extend. No endpoint serves LSTM forecasts, so LSTM
+# artifacts are only saved to models/
+model_trainer = TrainingService(
+    model_dir='models',
+    workers=int(os.getenv('TRAINING_WORKERS', 1)),
+    installers={'arima': _install_trained_arima},
+    timeout=float(os.getenv('TRAINING_TIMEOUT_SECONDS', 3600))
+)
+atexit.register(model_trainer.stop)
+
+@app.route('/api/models/train', methods=['POST'])
+def train_model():
+    """Queue a model fit on the daily crime counts; poll /api/models/jobs/<job_id> for the result"""
+    data = request.get_json(silent=True) or {}
+    model = str(data.get('model', 'arima')).lower()
+    params = data.get('params') or {}
+    if not isinstance(params, dict):
+        return jsonify({
+            'status': 'error',
+            'message': 'params must be an object'
+        }), 400
+    
+    crimes = crime_store.since(datetime.utcnow() - timedelta(days=PREDICTOR_HISTORY_DAYS))
+    try:
+        counts = predictors.get('trend').daily_counts(crimes) if crimes else []
+    except (KeyError, TypeError, ValueError) as e:
+        logging.error(f'Could not build daily crime counts for training: {str(e)}')
+        return jsonify({
+            'status': 'error',
+            'message': 'Crime history could not be turned into daily counts',
+            'details': str(e)
+        }), 400
+    if len(counts) < 3:
+        return jsonify({
+            'status': 'error',
+            'message': 'Not enough crime history to train a model'
+        }), 400
+    
+    # The serving ARIMA model covers every day but the last, which is still filling up
+    if model == 'arima':
+        counts = counts.iloc[:-1]
+    try:
+        job_id = model_trainer.submit(model, counts.to_numpy(dtype=float), dates=list(counts.index), **params)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    return jsonify({
+        'status': 'success',
+        'job': model_trainer.status(job_id)
+    }), 202
+
+@app.route('/api/models/jobs', methods=['GET'])
+def list_training_jobs():
+    return jsonify({
+        'status': 'success',
+        'jobs': model_trainer.jobs()
+    })
+
+@app.route('/api/models/jobs/<job_id>', methods=['GET'])
+def training_job_status(job_id):
+    job = model_trainer.status(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Training job not found'
+        }), 404
+    return jsonify({
+        'status': 'success',
+        'job': job
+    })
+
+@app.route('/api/models/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_training_job(job_id):
+    if not model_trainer.cancel(job_id):
+        job = model_trainer.status(job_id)
+        if job is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Training job not found'
+            }), 404
+        return jsonify({
+            'status': 'error',
+            'message': f"Training job can no longer be cancelled, it is {job['status']}",
+            'job': job
+        }), 409
+    return jsonify({
+        'status': 'success',
+        'job': model_trainer.status(job_id)
+    })
+
 @app.route('/predictions')
 def predictions():
     return render_template('predictions.html')
@@ -1143,21 +1309,23 @@ def create_alert():
             'description': data['description'],
             'latitude': float(data['latitude']),
             'longitude': float(data['longitude']),
-            'created_at': firestore.SERVER_TIMESTAMP,
+            'geohash': geohash_index.encode(float(data['latitude']), float(data['longitude'])),
+            'created_at': SERVER_TIMESTAMP,
             'status': 'active',
             'reported_by': data.get('reported_by', 'Anonymous'),
             'category': data.get('category', 'general'),
             'severity': data.get('severity', 'medium')
         }
         
-        # Add to Firestore
-        alert_ref = db.collection('alerts').document()
-        alert_data['id'] = alert_ref.id  # Add ID to the data before saving
-        alert_ref.set(alert_data)
+        # Add to storage
+        alert_id = alert_repo.new_id()
+        alert_data['id'] = alert_id  # Add ID to the data before saving
+        alert_repo.save(alert_id, alert_data)
+        alert_store.put(alert_id, {**alert_data, 'created_at': datetime.utcnow()})
         
         # Create response data without the SERVER_TIMESTAMP sentinel
         response_data = {
-            'id': alert_ref.id,
+            'id': alert_id,
             'title': alert_data['title'],
             'description': alert_data['description'],
             'latitude': alert_data['latitude'],
@@ -1170,13 +1338,14 @@ def create_alert():
         }
         
         try:
-            # Broadcast the new alert to all connected clients
+            # Broadcast the new alert to clients in the geo rooms around it
+            rooms = geo_rooms.target_rooms(alert_data['latitude'], alert_data['longitude'], MAX_ALERT_DISTANCE_KM)
             socketio.emit('new_alert', {
                 'status': 'success',
                 'data': response_data,
                 'timestamp': datetime.utcnow().isoformat()
-            }, namespace='/')
-            logging.info(f'Broadcasted new alert {alert_ref.id} to all connected clients')
+            }, to=rooms, namespace='/')
+            logging.info(f'Broadcasted new alert {alert_id} to {len(rooms)} geo rooms')
             
         except Exception as e:
             logging.error(f'Error broadcasting new alert: {str(e)}')
@@ -1214,21 +1383,16 @@ def get_alerts():
         print(f"Fetching up to {limit} alerts with status: {status}")
         
         try:
-            # Initialize Firestore query - get all documents first
-            alerts_ref = db.collection('alerts')
-            print("1. Connected to Firestore collection")
-            
             # Execute query and process all results
-            print("2. Fetching all alerts...")
-            all_docs = list(alerts_ref.stream())
-            print(f"3. Found {len(all_docs)} total alerts")
+            print("1. Fetching all alerts...")
+            all_docs = list(alert_repo.all())
+            print(f"2. Found {len(all_docs)} total alerts")
             
             # Process and filter alerts in memory
             alerts = []
-            for doc in all_docs:
+            for doc_id, alert in all_docs:
                 try:
-                    alert = doc.to_dict()
-                    alert['id'] = doc.id
+                    alert['id'] = doc_id
                     
                     # Skip if status doesn't match
                     if status and alert.get('status') != status:
@@ -1251,21 +1415,21 @@ def get_alerts():
                     alerts.append(alert)
                     
                 except Exception as e:
-                    print(f"Error processing document {doc.id}: {safe_str(str(e))}")
+                    print(f"Error processing document {doc_id}: {safe_str(str(e))}")
                     continue
             
             # Sort by created_at in memory
             try:
                 alerts.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-                print("4. Sorted alerts by created_at")
+                print("3. Sorted alerts by created_at")
             except Exception as e:
                 print(f"Warning: Could not sort by created_at: {str(e)}")
             
             # Apply limit
             alerts = alerts[:limit]
-            print(f"5. Applied limit: {len(alerts)} alerts")
+            print(f"4. Applied limit: {len(alerts)} alerts")
             
-            print(f"7. Successfully processed {len(alerts)} alerts")
+            print(f"5. Successfully processed {len(alerts)} alerts")
             return jsonify({
                 'status': 'success',
                 'data': alerts,  # Ensure consistent format with get_nearby_alerts
@@ -1461,48 +1625,40 @@ def get_nearby_alerts():
                 'received': {'radius': radius, 'limit': limit}
             }), 400
             
-        # Initialize Firestore
-        db = firestore.Client()
-        alerts_ref = db.collection('alerts').where('status', '==', 'active')
+        # Only fetch alerts in the index cells around the search circle
+        candidates = []
+        for alert_id, alert in alert_reads.active_near(lat, lng, radius):
+            try:
+                alert['latitude'] = float(alert['latitude'])
+                alert['longitude'] = float(alert['longitude'])
+                alert['id'] = alert_id
+                candidates.append(alert)
+            except (KeyError, ValueError, TypeError) as e:
+                logger.warning(f"Skipping alert {alert_id} due to invalid coordinates: {e}")
+                continue
         
-        # Process alerts
+        # Exact distance filter on the candidates
         alerts = []
-        for doc in alerts_ref.stream():
-            try:
-                alert = doc.to_dict()
-                if 'latitude' not in alert or 'longitude' not in alert:
-                    continue
-                    
-                # Calculate distance using Haversine formula
-                try:
-                    alert_lat, alert_lng = float(alert['latitude']), float(alert['longitude'])
-                    lat1, lng1 = radians(lat), radians(lng)
-                    lat2, lng2 = radians(alert_lat), radians(alert_lng)
-                    dlat, dlng = lat2 - lat1, lng2 - lng1
-                    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlng/2)**2
-                    distance = 6371 * 2 * atan2(sqrt(a), sqrt(1-a))  # Earth's radius in km
-                    
-                    if distance <= radius:
-                        # Format the alert data
-                        formatted_alert = {
-                            'id': doc.id,
-                            'distance': round(distance, 2),
-                            **alert  # Include all original alert fields
-                        }
-                        
-                        # Format timestamp if it exists
-                        if 'created_at' in alert and hasattr(alert['created_at'], 'isoformat'):
-                            formatted_alert['created_at'] = alert['created_at'].isoformat()
-                        
-                        alerts.append(formatted_alert)
-                        
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"Skipping alert {doc.id} due to invalid coordinates: {e}")
-                    continue
-                    
-            except Exception as e:
-                logger.error(f"Error processing alert {doc.id}: {str(e)}")
+        distances = haversine_km(
+            lat, lng,
+            np.array([a['latitude'] for a in candidates], dtype=float),
+            np.array([a['longitude'] for a in candidates], dtype=float)
+        )
+        for alert, distance in zip(candidates, distances.tolist()):
+            if distance > radius:
                 continue
+            
+            # Format the alert data
+            formatted_alert = {
+                'distance': round(distance, 2),
+                **alert  # Include all original alert fields
+            }
+            
+            # Format timestamp if it exists
+            if 'created_at' in alert and hasattr(alert['created_at'], 'isoformat'):
+                formatted_alert['created_at'] = alert['created_at'].isoformat()
+            
+            alerts.append(formatted_alert)
         
         # Sort by distance and limit results
         alerts.sort(key=lambda x: x.get('distance', float('inf')))
@@ -1590,13 +1746,16 @@ def handle_connect():
         session['connected_at'] = datetime.utcnow().isoformat()
         session['client_ip'] = client_ip
         
+        # Until the client sends a location it gets every alert
+        join_room(geo_rooms.connect(client_id))
+        
         # Acknowledge connection with server info
         emit('connection_response', {
             'status': 'success',
             'message': 'Connected to CrimeScope WebSocket',
             'server_time': datetime.utcnow().isoformat(),
             'max_alert_distance_km': MAX_ALERT_DISTANCE_KM,
-            'features': ['realtime_alerts', 'location_updates', 'alert_notifications']
+            'features': ['realtime_alerts', 'location_updates', 'alert_notifications', 'geo_rooms']
         })
         
         logging.info(f'Successfully established WebSocket connection with {client_id}')
@@ -1614,6 +1773,7 @@ def handle_disconnect():
     """Handle client disconnection with cleanup."""
     client_id = request.sid
     connection_duration = 'unknown'
+    geo_rooms.disconnect(client_id)
     
     try:
         # Calculate connection duration if we have the connect time
@@ -1626,6 +1786,37 @@ def handle_disconnect():
     except Exception as e:
         logging.error(f'Error during WebSocket disconnection: {str(e)}')
 
+@socketio.on('update_location')
+def handle_update_location(data):
+    """Move the client into the geo room of its location so it receives nearby alerts."""
+    try:
+        lat, lng = float(data['lat']), float(data['lng'])
+        if not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
+            raise ValueError('coordinates out of range')
+    except (TypeError, KeyError, ValueError) as e:
+        emit('location_registered', {'status': 'error', 'message': f'Invalid location: {e}'})
+        return
+    
+    old_room, room = geo_rooms.locate(request.sid, lat, lng)
+    if old_room != room:
+        if old_room:
+            leave_room(old_room)
+        join_room(room)
+    emit('location_registered', {
+        'status': 'success',
+        'room': room,
+        'max_alert_distance_km': MAX_ALERT_DISTANCE_KM
+    })
+
+@socketio.on('request_crime_stats')
+def handle_request_crime_stats(data=None):
+    """Send the full crime stats to a client that missed a diff or just connected."""
+    try:
+        emit('crime_stats_update', stats_broadcaster.full_payload('crime_stats_update'))
+    except Exception as e:
+        logging.error(f'Error sending crime stats to {request.sid}: {str(e)}')
+        emit('crime_stats_update', {'status': 'error', 'message': str(e)})
+
 @socketio.on('ping')
 def handle_ping(data=None):
     """Handle ping/pong for connection health monitoring."""
@@ -1645,64 +1836,64 @@ def handle_ping(data=None):
 
 @socketio.on('sync')
 def handle_sync(data):
-    """Synchronize client with latest alerts and updates."""
+    """Send the client alerts added, changed or removed since its cursor, one page at a time."""
     if not isinstance(data, dict):
         data = {}
     
     client_id = request.sid
-    last_sync = data.get('lastSync')
     location = data.get('location')
     
     try:
-        logging.info(f'Sync request from {client_id} - Last sync: {last_sync}')
-        
-        # Build the base query
-        alerts_ref = db.collection('alerts')
+        logging.info(f"Sync request from {client_id} - Cursor: {data.get('cursor')}")
+        
+        # Page through the change log after the client's cursor
+        page_size = max(1, min(int(data.get('limit', 100)), 500))
+        if not alert_changes.resumable(data.get('cursor')):
+            # Don't replay the whole log; hand out this worker's cursor and let the client
+            # re-list through /api/alerts. Cursors are per worker, which holds because
+            # Socket.IO sessions are sticky to the worker that accepted them.
+            emit('sync_response', {
+                'status': 'success',
+                'timestamp': datetime.utcnow().isoformat(),
+                'alerts': [],
+                'removed': [],
+                'count': 0,
+                'cursor': alert_changes.cursor,
+                'has_more': False,
+                'reset': True
+            })
+            logging.info(f"Sync cursor of {client_id} is unknown or too old, asked it to re-list")
+            return
+        page = alert_changes.changes_since(data.get('cursor'), limit=page_size)
+        alerts = page['alerts']
         
-        # Add timestamp filter if provided
-        if last_sync:
+        # Add distances if location is provided, in one batched call
+        if location and alerts:
             try:
-                # Convert string timestamp to datetime if needed
-                if isinstance(last_sync, str):
-                    last_sync = datetime.fromisoformat(last_sync.replace('Z', '+00:00'))
-                alerts_ref = alerts_ref.where('timestamp', '>', last_sync)
-            except (ValueError, TypeError) as e:
-                logging.warning(f'Invalid lastSync timestamp: {last_sync}, error: {str(e)}')
-        
-        # Execute the query
-        alerts = []
-        for doc in alerts_ref.stream():
-            alert = doc.to_dict()
-            alert['id'] = doc.id
-            
-            # Add distance if location is provided
-            if location and 'latitude' in alert and 'longitude' in alert:
-                try:
-                    alert_loc = (alert['latitude'], alert['longitude'])
-                    client_loc = (float(location['lat']), float(location['lng']))
-                    alert['distance_km'] = round(geodesic(client_loc, alert_loc).kilometers, 2)
-                except (ValueError, KeyError) as e:
-                    logging.warning(f'Error calculating distance for alert {doc.id}: {str(e)}')
-            
-            alerts.append(alert)
-        
-        # Sort by timestamp (newest first)
-        alerts.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        
-        # Limit number of alerts to prevent overwhelming the client
-        max_alerts = min(int(data.get('limit', 50)), 100)
-        alerts = alerts[:max_alerts]
-        
-        # Prepare response
+                client_lat, client_lng = float(location['lat']), float(location['lng'])
+                alert_lats, alert_lngs = record_coordinates(alerts)
+                distances = distance_km(client_lat, client_lng, alert_lats, alert_lngs,
+                                        mode=SYNC_DISTANCE_MODE)
+                for alert, distance in zip(alerts, distances.tolist()):
+                    if math.isfinite(distance):
+                        alert['distance_km'] = round(distance, 2)
+            except (ValueError, KeyError, TypeError) as e:
+                logging.warning(f'Error calculating alert distances for {client_id}: {str(e)}')
+        
+        # Prepare response; clients send 'cursor' back and ask again while 'has_more'
         response = {
             'status': 'success',
             'timestamp': datetime.utcnow().isoformat(),
             'alerts': alerts,
-            'count': len(alerts)
+            'removed': page['removed'],
+            'count': len(alerts),
+            'cursor': page['cursor'],
+            'has_more': page['has_more'],
+            'reset': page['reset']
         }
         
         emit('sync_response', response)
-        logging.info(f'Sent {len(alerts)} alerts to {client_id}')
+        logging.info(f"Sent {len(alerts)} alerts and {len(page['removed'])} removals to {client_id}")
         
     except Exception as e:
         error_msg = f'Error syncing alerts: {str(e)}'
@@ -1715,5 +1906,5 @@ def handle_sync(data):
         emit('error', {'message': 'Failed to sync alerts'})
 
 if __name__ == '__main__':
-    print("Starting CrimeScope server with WebSocket support on http://127.0.0.1:8000")
+    print(f"Starting CrimeScope server with WebSocket support on http://127.0.0.1:8000 ({SOCKETIO_ASYNC_MODE} mode)")
     socketio.run(app, debug=True, host='127.0.0.1', port=8000, allow_unsafe_werkzeug=True)
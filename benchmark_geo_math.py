@@ -0,0 +1,105 @@
+import argparse
+import random
+import time
+import numpy as np
+from geo_math import haversine_km, haversine_m, equirectangular_km, point_to_polyline_km
+
+try:
+    from geopy.distance import geodesic
+except ImportError:
+    geodesic = None
+
+# Hyderabad city centre, same area as the sample data scripts
+CENTER_LAT, CENTER_LNG = 17.3850, 78.4867
+
+
+def time_call(func, *args, repeat=1):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def make_points(count, center_lat, center_lng, spread_km):
+    """Random points within roughly spread_km of a centre"""
+    dlat = spread_km / 111.2
+    dlng = dlat / max(np.cos(np.radians(center_lat)), 1e-6)
+    lats = np.clip(center_lat + np.random.uniform(-dlat, dlat, count), -89.9, 89.9)
+    lngs = center_lng + np.random.uniform(-dlng, dlng, count)
+    return lats, lngs
+
+
+def relative_error(approx, exact):
+    mask = exact > 1e-6
+    return float(np.max(np.abs(approx[mask] - exact[mask]) / exact[mask])) if mask.any() else 0.0
+
+
+def speed(counts):
+    print(f"{'points':>8} {'loop (s)':>10} {'haversine (s)':>14} {'equirect (s)':>13} {'speedup':>8}")
+    for count in counts:
+        lats, lngs = make_points(count, CENTER_LAT, CENTER_LNG, 20)
+        pairs = list(zip(lats.tolist(), lngs.tolist()))
+
+        loop_time, _ = time_call(
+            lambda: [haversine_m(CENTER_LAT, CENTER_LNG, lat, lng) / 1000 for lat, lng in pairs]
+        )
+        batch_time, _ = time_call(haversine_km, CENTER_LAT, CENTER_LNG, lats, lngs, repeat=5)
+        fast_time, _ = time_call(equirectangular_km, CENTER_LAT, CENTER_LNG, lats, lngs, repeat=5)
+        print(f"{count:>8} {loop_time:>10.4f} {batch_time:>14.5f} {fast_time:>13.5f} "
+              f"{loop_time / max(batch_time, 1e-9):>7.1f}x")
+
+
+def accuracy(samples):
+    print(f"\n{'lat':>5} {'km':>6} {'equirect vs haversine':>22} {'haversine vs geodesic':>22}")
+    for center_lat in (0, 17.4, 45, 70):
+        for spread in (1, 10, 100):
+            lats, lngs = make_points(samples, center_lat, CENTER_LNG, spread)
+            exact = haversine_km(center_lat, CENTER_LNG, lats, lngs)
+            fast = equirectangular_km(center_lat, CENTER_LNG, lats, lngs)
+            if geodesic is not None:
+                ellipsoid = np.array([geodesic((center_lat, CENTER_LNG), (lat, lng)).kilometers
+                                      for lat, lng in zip(lats[:200], lngs[:200])])
+                sphere_error = f"{relative_error(exact[:200], ellipsoid):.4%}"
+            else:
+                sphere_error = 'geopy missing'
+            print(f"{center_lat:>5} {spread:>6} {relative_error(fast, exact):>22.4%} {sphere_error:>22}")
+
+
+def polyline(points, vertices):
+    print(f"\n{'points':>8} {'vertices':>9} {'polyline (s)':>13} {'max error vs sampled line':>26}")
+    line_lats, line_lngs = make_points(vertices, CENTER_LAT, CENTER_LNG, 10)
+    line_lats, line_lngs = np.sort(line_lats), line_lngs
+    lats, lngs = make_points(points, CENTER_LAT, CENTER_LNG, 15)
+    elapsed, distances = time_call(point_to_polyline_km, lats, lngs, line_lats, line_lngs, repeat=3)
+
+    # Reference: haversine to densely sampled points along every segment
+    t = np.linspace(0, 1, 1000)[:, None]
+    dense_lats = (line_lats[:-1] + t * (line_lats[1:] - line_lats[:-1])).ravel()
+    dense_lngs = (line_lngs[:-1] + t * (line_lngs[1:] - line_lngs[:-1])).ravel()
+    sample = slice(0, min(points, 200))
+    reference = np.array([haversine_km(lat, lng, dense_lats, dense_lngs).min()
+                          for lat, lng in zip(lats[sample], lngs[sample])])
+    error = float(np.max(np.abs(distances[sample] - reference)))
+    print(f"{points:>8} {vertices:>9} {elapsed:>13.5f} {error:>24.4f}km")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the geo_math distance kernels')
+    parser.add_argument('--points', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--samples', type=int, default=10000, help='Points per accuracy check')
+    parser.add_argument('--vertices', type=int, default=500, help='Polyline vertices')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    speed(args.points)
+    accuracy(args.samples)
+    polyline(min(max(args.points), 10000), args.vertices)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from hotzone_forecast import build_series, forecast_counts, history_window, predict_hotzones, MODELS
+
+# Hyderabad city centre, same area as the sample data scripts
+CENTER_LAT, CENTER_LNG = 17.3850, 78.4867
+CRIME_TYPES = ('theft', 'assault', 'burglary', 'vandalism', 'fraud')
+SEVERITIES = ('low', 'medium', 'high', 'critical')
+
+
+def make_crimes(count, hotspots, now, spread=0.3, history_days=90):
+    """Crimes clustered around random hotspots over the history window"""
+    centres = [(CENTER_LAT + random.uniform(-spread, spread), CENTER_LNG + random.uniform(-spread, spread))
+               for _ in range(hotspots)]
+    weights = [random.expovariate(1.0) for _ in range(hotspots)]
+    crimes = []
+    for lat, lng in random.choices(centres, weights=weights, k=count):
+        crimes.append({
+            'timestamp': now - timedelta(days=random.randrange(history_days), hours=random.randrange(24)),
+            'latitude': lat + random.gauss(0, 0.002),
+            'longitude': lng + random.gauss(0, 0.002),
+            'type': random.choice(CRIME_TYPES),
+            'severity': random.choice(SEVERITIES)
+        })
+    return crimes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-cell hot zone forecasting')
+    parser.add_argument('--crimes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--hotspots', type=int, default=3000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    now = datetime.utcnow()
+    print(f"{'crimes':>8} {'cells':>6} {'binning (ms)':>13} {'model':>9} {'forecast (ms)':>14} {'request (ms)':>13}")
+    for count in args.crimes:
+        crimes = make_crimes(count, args.hotspots, now)
+        start = time.perf_counter()
+        series = build_series(crimes, history_window(now)[1])
+        binning = time.perf_counter() - start
+        for model in MODELS:
+            start = time.perf_counter()
+            forecast_counts(series, args.days, model)
+            forecast = time.perf_counter() - start
+            start = time.perf_counter()
+            predict_hotzones(crimes, args.days, model, now=now)
+            request = time.perf_counter() - start
+            print(f"{count:>8} {len(series):>6} {binning * 1000:>13.1f} {model:>9} {forecast * 1000:>14.2f} "
+                  f"{request * 1000:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import random
+import time
+import numpy as np
+from route_scoring import score_route, score_route_loop
+
+# Hyderabad city centre, same area as the sample data scripts
+CENTER_LAT, CENTER_LNG = 17.3850, 78.4867
+
+
+def make_crimes(count, spread=1.5):
+    """Generate crime points as (lat, lng, weighted_severity, radius) tuples"""
+    crimes = []
+    for _ in range(count):
+        crimes.append((
+            CENTER_LAT + random.uniform(-spread, spread),
+            CENTER_LNG + random.uniform(-spread, spread),
+            random.randint(1, 5) * 10000000.0,
+            random.choice([0.3, 0.5, 0.8])
+        ))
+    return crimes
+
+
+def make_route(points, length=0.5):
+    """Generate a wandering route geometry as [lng, lat] pairs"""
+    lat, lng = CENTER_LAT - length / 2, CENTER_LNG - length / 2
+    coordinates = []
+    for _ in range(points):
+        coordinates.append([lng, lat])
+        lat += length / points + random.uniform(-0.0005, 0.0005)
+        lng += length / points + random.uniform(-0.0005, 0.0005)
+    return coordinates
+
+
+def time_call(func, *args, repeat=1):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark safe-route danger scoring')
+    parser.add_argument('--crimes', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--points', type=int, nargs='+', default=[500, 2000])
+    parser.add_argument('--spread', type=float, default=1.5,
+                        help='Crime scatter around the route in degrees')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    print(f"{'crimes':>8} {'points':>8} {'loop (s)':>10} {'numpy (s)':>10} {'speedup':>8}  match")
+    for crime_count in args.crimes:
+        crimes = make_crimes(crime_count, args.spread)
+        for points in args.points:
+            route = make_route(points)
+
+            loop_time, (loop_penalties, loop_score) = time_call(score_route_loop, route, crimes)
+            fast_time, (fast_penalties, fast_score) = time_call(score_route, route, crimes, repeat=3)
+
+            match = (np.allclose(loop_penalties, fast_penalties, rtol=1e-9, atol=0)
+                     and np.isclose(loop_score, fast_score, rtol=1e-9, atol=0))
+            print(f"{crime_count:>8} {points:>8} {loop_time:>10.4f} {fast_time:>10.4f} "
+                  f"{loop_time / max(fast_time, 1e-9):>7.1f}x  {'yes' if match else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
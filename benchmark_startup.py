@@ -0,0 +1,92 @@
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Modules the app only imports on first use
+LAZY_BACKENDS = ('simple_predictor', 'crime_predictor', 'hot_zone_predictor')
+
+# Runs in a fresh interpreter: imports the modules in order, reports the ones missing
+IMPORT_SCRIPT = """
+import importlib, json, sys, time
+missing = {}
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    try:
+        importlib.import_module(name)
+    except Exception as e:
+        missing[name] = f'{type(e).__name__}: {e}'
+print(json.dumps({'seconds': time.perf_counter() - start, 'missing': missing}))
+"""
+
+
+def app_imports(path):
+    """Modules app.py imports at module level, in order"""
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules = [node.module]
+        else:
+            continue
+        names.extend(module for module in modules if module not in names)
+    return names
+
+
+def import_run(modules):
+    """(total seconds, {top-level import: cumulative seconds}, missing) for one cold import"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', IMPORT_SCRIPT, *modules],
+        cwd=HERE, capture_output=True, text=True, check=True
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, total, name = line.split('|')
+        # Indented names were imported by the module above them
+        if name[1:].startswith(' ') or not total.strip().isdigit():
+            continue
+        cumulative[name.strip()] = int(total) / 1e6
+    summary = json.loads(result.stdout.strip().splitlines()[-1])
+    return summary['seconds'], cumulative, summary['missing']
+
+
+def best_run(modules, runs):
+    results = [import_run(modules) for _ in range(runs)]
+    return min(results, key=lambda result: result[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the import time of the app and its predictors')
+    parser.add_argument('--runs', type=int, default=3, help='cold imports per measurement; the fastest is reported')
+    parser.add_argument('--top', type=int, default=15, help='slowest top-level imports to list')
+    args = parser.parse_args()
+
+    modules = app_imports(os.path.join(HERE, 'app.py'))
+    total, cumulative, missing = best_run(modules, args.runs)
+    print(f"Web tier: {len(modules)} modules imported by app.py in {total * 1000:.0f} ms")
+    print(f"{'import':<32} {'cumulative (ms)':>16}")
+    for name, seconds in sorted(cumulative.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<32} {seconds * 1000:>16.1f}")
+    for name, error in missing.items():
+        print(f"not installed, not timed: {name} ({error})")
+
+    print()
+    print(f"{'lazy backend':<32} {'extra import (ms)':>18}")
+    for backend in LAZY_BACKENDS:
+        with_backend, _, backend_missing = best_run(modules + [backend], args.runs)
+        if backend in backend_missing:
+            print(f"{backend:<32} {'unavailable':>18}  ({backend_missing[backend]})")
+        else:
+            print(f"{backend:<32} {(with_backend - total) * 1000:>18.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import random
+import time
+import numpy as np
+from geo_math import distance_km, record_coordinates, vincenty_km, DISTANCE_MODES
+
+try:
+    from geopy.distance import geodesic
+except ImportError:
+    geodesic = None
+
+# Hyderabad city centre, same area as the sample data scripts
+CENTER_LAT, CENTER_LNG = 17.3850, 78.4867
+
+
+def make_alerts(count, spread=0.5):
+    """Alert dicts as handle_sync reads them from Firestore"""
+    return [{
+        'id': f'alert-{i}',
+        'latitude': CENTER_LAT + random.uniform(-spread, spread),
+        'longitude': CENTER_LNG + random.uniform(-spread, spread),
+        'status': 'active'
+    } for i in range(count)]
+
+
+def sync_geodesic_loop(client, alerts):
+    """The previous per-alert geopy geodesic path"""
+    for alert in alerts:
+        alert['distance_km'] = round(geodesic(client, (alert['latitude'], alert['longitude'])).kilometers, 2)
+    return np.array([alert['distance_km'] for alert in alerts])
+
+
+def sync_batched(client, alerts, mode):
+    """The handle_sync path: coordinates to arrays, one distance call, write back"""
+    lats, lngs = record_coordinates(alerts)
+    distances = distance_km(client[0], client[1], lats, lngs, mode=mode)
+    for alert, distance in zip(alerts, distances.tolist()):
+        alert['distance_km'] = round(distance, 2)
+    return distances
+
+
+def time_call(func, *args, repeat=1):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-sync alert distance cost')
+    parser.add_argument('--alerts', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    client = (CENTER_LAT + 0.01, CENTER_LNG - 0.02)
+    print(f"{'alerts':>8} {'mode':>16} {'per sync (ms)':>14} {'max error (m)':>14}")
+    for count in args.alerts:
+        alerts = make_alerts(count)
+        lats, lngs = record_coordinates(alerts)
+        reference = vincenty_km(client[0], client[1], lats, lngs)
+
+        if geodesic is not None:
+            elapsed, _ = time_call(sync_geodesic_loop, client, alerts)
+            print(f"{count:>8} {'geopy geodesic':>16} {elapsed * 1000:>14.2f} {'-':>14}")
+        for mode in DISTANCE_MODES:
+            elapsed, distances = time_call(sync_batched, client, alerts, mode, repeat=5)
+            error = float(np.max(np.abs(distances - reference))) * 1000
+            print(f"{count:>8} {mode:>16} {elapsed * 1000:>14.2f} {error:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
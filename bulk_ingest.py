@@ -0,0 +1,265 @@
+"""
+Bulk crime ingestion with Firestore batched writes.
+
+Reports (JSON array, JSON lines or CSV) are validated and written with
+batch commits (a Firestore WriteBatch or one SQLite transaction) of at most
+MAX_BATCH_WRITES documents; a crime and the alert derived from it always
+share a batch so they land together.
+
+    python bulk_ingest.py crimes.csv --alerts
+    python bulk_ingest.py history.jsonl --format jsonl --concurrency 8
+    python bulk_ingest.py history.jsonl --sqlite crimescope.db
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import geohash_index
+from crime_store import to_utc_naive
+from repositories import SERVER_TIMESTAMP
+
+logger = logging.getLogger(__name__)
+
+# Firestore rejects batches with more writes than this
+MAX_BATCH_WRITES = 500
+REQUIRED_FIELDS = ('type', 'severity', 'location', 'description', 'latitude', 'longitude')
+FORMATS = ('json', 'jsonl', 'csv')
+
+
+def parse_reports(text, fmt='jsonl'):
+    """Report dicts from a JSON array, JSON lines or CSV with a header row"""
+    if fmt == 'json':
+        reports = json.loads(text)
+        if isinstance(reports, dict):
+            reports = reports.get('reports', [])
+        if not isinstance(reports, list):
+            raise ValueError('Expected a JSON array of reports')
+        return reports
+    if fmt == 'jsonl':
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if fmt == 'csv':
+        return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+    raise ValueError(f"Unknown format {fmt!r}, expected one of {FORMATS}")
+
+
+def normalize_report(report):
+    """
+    Crime document for one report, shaped like the ones /api/report writes.
+
+    'location' becomes the {latitude, longitude} map /api/report stores; the
+    reported place name is kept as 'location_name'. An optional 'timestamp'
+    (ISO string) keeps the original time of historical records. Raises
+    ValueError for an invalid report.
+    """
+    if not isinstance(report, dict):
+        raise ValueError('Report must be an object')
+    missing = [field for field in REQUIRED_FIELDS if report.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+    try:
+        lat = float(report['latitude'])
+        lng = float(report['longitude'])
+    except (TypeError, ValueError):
+        raise ValueError('latitude and longitude must be numbers')
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError('latitude/longitude out of range')
+
+    timestamp = None
+    if report.get('timestamp') not in (None, ''):
+        timestamp = to_utc_naive(report['timestamp'])
+        if timestamp is None:
+            raise ValueError(f"Invalid timestamp {report['timestamp']!r}")
+
+    return {
+        **report,
+        'latitude': lat,
+        'longitude': lng,
+        'location': {'latitude': lat, 'longitude': lng},
+        'location_name': str(report['location']),
+        'timestamp': timestamp,
+        'status': report.get('status') or 'reported',
+        'verified': False,
+        'reports': 1
+    }
+
+
+def build_alert(crime_id, data, reported_at, police_station=None):
+    """Alert document derived from a report or a normalized crime (which has 'location_name')"""
+    location = str(data.get('location_name', data['location']))
+    return {
+        'crime_id': crime_id,
+        'title': f"{data['type']} reported in {location.split(',')[0]}",
+        'description': data['description'],
+        'severity': data['severity'],
+        'location': location,
+        'latitude': float(data['latitude']),
+        'longitude': float(data['longitude']),
+        'geohash': geohash_index.encode(float(data['latitude']), float(data['longitude'])),
+        'reported_at': reported_at,
+        'status': 'active',
+        'reported_by': data.get('reported_by') or 'Anonymous',
+        'police_notified': bool(police_station),
+        'police_station': police_station,
+        'is_verified': False
+    }
+
+
+class BulkIngester:
+    """
+    Writes validated reports to the crime and alert repositories in batches.
+
+    Each batch holds up to batch_size writes (a crime plus its alert when
+    alerts are created) and up to `concurrency` batches are committed at
+    once. Once a batch commits, its documents are put into the optional
+    crime and alert stores so the in-memory stats, rollups and sync log
+    pick them up without waiting for the listeners.
+    """
+
+    def __init__(self, crimes, alerts, crime_store=None, alert_store=None, batch_size=MAX_BATCH_WRITES,
+                 concurrency=4, police_lookup=None):
+        if not 1 <= batch_size <= MAX_BATCH_WRITES:
+            raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_WRITES}")
+        self.crimes = crimes
+        self.alerts = alerts
+        self.crime_store = crime_store
+        self.alert_store = alert_store
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.police_lookup = police_lookup
+
+    def _prepare(self, reports, create_alerts):
+        """Split reports into (writes, rejected); a write is (crime_id, crime, alert_id, alert, reported_at)"""
+        now = datetime.utcnow()
+        writes = []
+        rejected = []
+        for index, report in enumerate(reports):
+            try:
+                crime = normalize_report(report)
+            except ValueError as e:
+                rejected.append({'index': index, 'error': str(e)})
+                continue
+            crime_id = self.crimes.new_id()
+            reported_at = crime['timestamp'] or now
+            if crime['timestamp'] is None:
+                crime['timestamp'] = SERVER_TIMESTAMP
+            alert_id = alert = None
+            if create_alerts:
+                station = self.police_lookup(crime['latitude'], crime['longitude']) if self.police_lookup else None
+                alert_id = self.alerts.new_id()
+                alert = build_alert(crime_id, crime, reported_at, station)
+            writes.append((crime_id, crime, alert_id, alert, reported_at))
+        return writes, rejected
+
+    def _chunks(self, writes):
+        per_report = 2 if writes and writes[0][2] is not None else 1
+        step = max(1, self.batch_size // per_report)
+        for start in range(0, len(writes), step):
+            yield writes[start:start + step]
+
+    def _commit(self, chunk):
+        batch = self.crimes.storage.batch()
+        for crime_id, crime, alert_id, alert, _ in chunk:
+            batch.set(self.crimes.collection, crime_id, crime)
+            if alert_id is not None:
+                batch.set(self.alerts.collection, alert_id, alert)
+        batch.commit()
+        return chunk
+
+    def _publish(self, chunk):
+        for crime_id, crime, alert_id, alert, reported_at in chunk:
+            if self.crime_store is not None:
+                self.crime_store.put(crime_id, {**crime, 'timestamp': reported_at})
+            if self.alert_store is not None and alert_id is not None:
+                self.alert_store.put(alert_id, alert)
+
+    def ingest(self, reports, create_alerts=True):
+        """Validate and write reports; returns counts, rejected reports and throughput"""
+        start = time.perf_counter()
+        writes, rejected = self._prepare(reports, create_alerts)
+        chunks = list(self._chunks(writes))
+
+        written = alerts = batches = 0
+        failed = []
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as pool:
+            futures = {pool.submit(self._commit, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"Bulk ingest batch of {len(chunk)} reports failed: {e}")
+                    failed.append({'reports': len(chunk), 'error': str(e)})
+                    continue
+                self._publish(chunk)
+                batches += 1
+                written += len(chunk)
+                alerts += sum(1 for write in chunk if write[2] is not None)
+
+        seconds = time.perf_counter() - start
+        return {
+            'received': len(reports),
+            'written': written,
+            'alerts_created': alerts,
+            'rejected': rejected,
+            'failed_batches': failed,
+            'batches': batches,
+            'seconds': round(seconds, 3),
+            'reports_per_second': round(written / seconds, 1) if seconds > 0 else None
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk load crime reports into Firestore')
+    parser.add_argument('path', help='File of reports')
+    parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension')
+    parser.add_argument('--alerts', action='store_true', help='Also create an active alert per crime')
+    parser.add_argument('--batch-size', type=int, default=MAX_BATCH_WRITES, help='Writes per batch')
+    parser.add_argument('--concurrency', type=int, default=4, help='Batches committed in parallel')
+    parser.add_argument('--chunk', type=int, default=50000, help='Reports read and ingested per pass')
+    parser.add_argument('--sqlite', metavar='PATH', help='Load into a local SQLite database instead of Firestore')
+    args = parser.parse_args()
+
+    fmt = args.format or args.path.rsplit('.', 1)[-1].lower()
+    if fmt == 'ndjson':
+        fmt = 'jsonl'
+    if fmt not in FORMATS:
+        parser.error(f"Cannot infer the format of {args.path}, pass --format")
+
+    from repositories import FirestoreStorage, SqliteStorage, CrimeRepository, AlertRepository
+    if args.sqlite:
+        storage = SqliteStorage(args.sqlite)
+    else:
+        from google.cloud import firestore
+        storage = FirestoreStorage(firestore.Client())
+    ingester = BulkIngester(CrimeRepository(storage), AlertRepository(storage),
+                            batch_size=args.batch_size, concurrency=args.concurrency)
+
+    with open(args.path, encoding='utf-8') as f:
+        reports = parse_reports(f.read(), fmt)
+
+    totals = {'written': 0, 'alerts_created': 0, 'rejected': 0, 'failed_batches': 0}
+    start = time.perf_counter()
+    for offset in range(0, len(reports), args.chunk):
+        result = ingester.ingest(reports[offset:offset + args.chunk], create_alerts=args.alerts)
+        for error in result['rejected']:
+            print(f"Skipped report {offset + error['index']}: {error['error']}")
+        totals['written'] += result['written']
+        totals['alerts_created'] += result['alerts_created']
+        totals['rejected'] += len(result['rejected'])
+        totals['failed_batches'] += len(result['failed_batches'])
+        print(f"{min(offset + args.chunk, len(reports))}/{len(reports)} reports, "
+              f"{result['reports_per_second']} reports/s")
+
+    seconds = time.perf_counter() - start
+    print(f"Wrote {totals['written']} crimes and {totals['alerts_created']} alerts in {seconds:.1f}s "
+          f"({totals['written'] / seconds if seconds else 0:.0f} reports/s); "
+          f"{totals['rejected']} rejected, {totals['failed_batches']} failed batches")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,9 +7,9 @@ import joblib
 import os
 
 class CrimePredictor:
-    def __init__(self):
+    def __init__(self, model_dir='models'):
         self.scaler = MinMaxScaler()
-        self.model_dir = 'models'
+        self.model_dir = model_dir
         os.makedirs(self.model_dir, exist_ok=True)
         self.arima_model = None
         self.sequence_length = 7  # Number of days to look back for predictions
@@ -66,6 +66,9 @@ class CrimePredictor:
 
     def build_lstm_model(self, input_shape):
         """Build LSTM model"""
+        # TensorFlow is only imported by the processes that train or run an LSTM
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import LSTM, Dense, Dropout
         model = Sequential([
             LSTM(50, return_sequences=True, input_shape=input_shape),
             Dropout(0.2),
@@ -188,21 +191,6 @@ class CrimePredictor:
                 'status': 'success',
                 'data': predictions
             }
-                        self.train_lstm(X, y)
-                
-                # Get last sequence for prediction
-                last_sequence = scaled_data[-self.sequence:].flatten()
-                predictions = self.predict_lstm(last_sequence, steps=days_ahead)
-                
-                # Create date range for predictions
-                last_date = ts_data.index[-1]
-                date_range = [last_date + timedelta(days=i+1) for i in range(days_ahead)]
-                
-                return pd.Series(predictions, index=date_range)
-            
-            else:
-                raise ValueError("Invalid method. Choose 'arima' or 'lstm'.")
-                
         except Exception as e:
             print(f"Error in predict_hot_zones: {e}")
             return None
@@ -0,0 +1,158 @@
+import math
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from crime_stats import crime_severity, crime_type
+from crime_store import to_utc_naive
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+DIMENSIONS = ('type', 'severity', 'cell')
+
+
+def grid_cell(lat, lng, cell_size=0.01):
+    """Grid cell id for a coordinate, e.g. '1738:7848' for ~1.1km cells"""
+    try:
+        return f"{math.floor(float(lat) / cell_size)}:{math.floor(float(lng) / cell_size)}"
+    except (TypeError, ValueError):
+        return None
+
+
+class CrimeRollupStore:
+    """
+    Pre-aggregated crime counts in hourly and daily buckets.
+
+    Each bucket maps (type, severity, grid cell) to a count. A time window is
+    answered from daily buckets for the whole days it covers and hourly
+    buckets for the partial days at either end, so the cost depends on the
+    number of buckets rather than the number of crimes. Windows resolve to
+    whole hours. Like CrimeStatsAggregator it is fed by CrimeStore changes.
+    """
+
+    def __init__(self, cell_size=0.01):
+        self.cell_size = cell_size
+        self._lock = threading.Lock()
+        self._contributions = {}
+        self.hourly = {}
+        self.daily = {}
+
+    def _key(self, crime):
+        timestamp = to_utc_naive(crime.get('timestamp'))
+        if timestamp is None:
+            return None
+        hour = timestamp.replace(minute=0, second=0, microsecond=0)
+        dims = (
+            crime_type(crime),
+            crime_severity(crime),
+            grid_cell(crime.get('latitude'), crime.get('longitude'), self.cell_size)
+        )
+        return hour, dims
+
+    def _add(self, key, delta):
+        hour, dims = key
+        day = hour.replace(hour=0)
+        for buckets, start in ((self.hourly, hour), (self.daily, day)):
+            counts = buckets.setdefault(start, Counter())
+            counts[dims] += delta
+            if counts[dims] <= 0:
+                del counts[dims]
+                if not counts:
+                    del buckets[start]
+
+    def apply(self, change_type, crime_id, crime, old=None):
+        """CrimeStore subscriber: move one crime between buckets"""
+        with self._lock:
+            previous = self._contributions.pop(crime_id, None)
+            if previous is not None:
+                self._add(previous, -1)
+            if change_type != 'REMOVED' and crime is not None:
+                key = self._key(crime)
+                if key is not None:
+                    self._contributions[crime_id] = key
+                    self._add(key, 1)
+
+    def rebuild(self, crimes):
+        """Reset the rollups from a full snapshot of crime dicts carrying an 'id'"""
+        with self._lock:
+            self._contributions = {}
+            self.hourly = {}
+            self.daily = {}
+        for crime in crimes:
+            self.apply('ADDED', crime['id'], crime)
+
+    @staticmethod
+    def _bucket_range(buckets, start, end, step):
+        """Bucket counters with start <= bucket < end"""
+        if start >= end:
+            return []
+        if (end - start) / step > len(buckets):
+            return [counts for bucket, counts in buckets.items() if start <= bucket < end]
+        found = []
+        bucket = start
+        while bucket < end:
+            counts = buckets.get(bucket)
+            if counts:
+                found.append(counts)
+            bucket += step
+        return found
+
+    def _window_buckets(self, start_date, end_date):
+        start_hour = to_utc_naive(start_date).replace(minute=0, second=0, microsecond=0)
+        end_hour = to_utc_naive(end_date).replace(minute=0, second=0, microsecond=0) + HOUR
+
+        first_day = start_hour.replace(hour=0)
+        if first_day < start_hour:
+            first_day += DAY
+        last_day = end_hour.replace(hour=0)
+
+        if first_day >= last_day:
+            return self._bucket_range(self.hourly, start_hour, end_hour, HOUR)
+        return (self._bucket_range(self.hourly, start_hour, first_day, HOUR)
+                + self._bucket_range(self.daily, first_day, last_day, DAY)
+                + self._bucket_range(self.hourly, last_day, end_hour, HOUR))
+
+    def query(self, start_date, end_date=None, group_by=('type',)):
+        """
+        Count crimes between start_date and end_date grouped by dimensions.
+
+        group_by is a tuple drawn from 'type', 'severity' and 'cell'; a single
+        dimension gives plain keys, several give tuple keys.
+        """
+        positions = [DIMENSIONS.index(dim) for dim in group_by]
+        totals = Counter()
+        with self._lock:
+            for counts in self._window_buckets(start_date, end_date or datetime.utcnow()):
+                for dims, count in counts.items():
+                    key = tuple(dims[p] for p in positions)
+                    totals[key[0] if len(key) == 1 else key] += count
+        return dict(totals)
+
+    def window(self, start_date, end_date=None):
+        """Total and per-type counts for a window"""
+        by_type = self.query(start_date, end_date, group_by=('type',))
+        return {'total_crimes': sum(by_type.values()), 'by_type': by_type}
+
+    def top_cells(self, start_date, end_date=None, limit=10):
+        """Busiest grid cells in a window as dicts with the cell centre and count"""
+        by_cell = self.query(start_date, end_date, group_by=('cell',))
+        cells = []
+        for cell, count in sorted(by_cell.items(), key=lambda item: item[1], reverse=True):
+            if cell is None:
+                continue
+            y, x = (int(part) for part in cell.split(':'))
+            cells.append({
+                'lat': round((y + 0.5) * self.cell_size, 6),
+                'lng': round((x + 0.5) * self.cell_size, 6),
+                'count': count
+            })
+            if len(cells) >= limit:
+                break
+        return cells
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'hourly_buckets': len(self.hourly),
+                'daily_buckets': len(self.daily),
+                'crimes': len(self._contributions)
+            }
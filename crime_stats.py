@@ -0,0 +1,78 @@
+import threading
+from collections import Counter
+from datetime import datetime
+
+SEVERITY_LEVELS = ('high', 'medium', 'low')
+
+
+def crime_type(crime):
+    """Type a crime is counted under, lowercased so 'Theft' and 'theft' match"""
+    return str(crime.get('type') or 'other').strip().lower()
+
+
+def crime_severity(crime):
+    return str(crime.get('severity', 'medium')).lower()
+
+
+class CrimeStatsAggregator:
+    """
+    Running crime counters updated one change at a time.
+
+    Keeps all-time totals by type and severity, so a new, changed or removed
+    crime costs O(1) instead of a rescan. Windowed counts live in
+    CrimeRollupStore. It is meant to be subscribed to a CrimeStore, which
+    replays the whole collection through apply() when it loads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contributions = {}
+        self.total = 0
+        self.by_type = Counter()
+        self.by_severity = Counter()
+        self.last_updated = None
+
+    @staticmethod
+    def _key(crime):
+        """Return the (type, severity) a crime contributes to"""
+        return crime_type(crime), crime_severity(crime)
+
+    def _add(self, key, delta):
+        crime_type, severity = key
+        self.total += delta
+        self.by_type[crime_type] += delta
+        if severity in SEVERITY_LEVELS:
+            self.by_severity[severity] += delta
+
+    def apply(self, change_type, crime_id, crime, old=None):
+        """CrimeStore subscriber: fold one ADDED/MODIFIED/REMOVED change into the counters"""
+        with self._lock:
+            previous = self._contributions.pop(crime_id, None)
+            if previous is not None:
+                self._add(previous, -1)
+            if change_type != 'REMOVED' and crime is not None:
+                key = self._key(crime)
+                self._contributions[crime_id] = key
+                self._add(key, 1)
+            self.last_updated = datetime.utcnow()
+
+    def rebuild(self, crimes):
+        """Reset the counters from a full snapshot of crime dicts carrying an 'id'"""
+        with self._lock:
+            self._contributions = {}
+            self.total = 0
+            self.by_type = Counter()
+            self.by_severity = Counter()
+        for crime in crimes:
+            self.apply('ADDED', crime['id'], crime)
+
+    def snapshot(self):
+        """All-time stats in the crime_stats_update payload format"""
+        with self._lock:
+            return {
+                'total_crimes': self.total,
+                'by_type': {k: v for k, v in self.by_type.items() if v > 0},
+                'by_severity': {level: self.by_severity[level] for level in SEVERITY_LEVELS},
+                'last_updated': (self.last_updated or datetime.utcnow()).isoformat()
+            }
+
@@ -0,0 +1,338 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+
+def to_utc_naive(value):
+    """Normalize Firestore/ISO timestamps to naive UTC datetimes (None if unknown)"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    elif not isinstance(value, datetime):
+        if hasattr(value, 'to_pydatetime'):
+            value = value.to_pydatetime()
+        elif hasattr(value, 'timestamp'):
+            value = datetime.fromtimestamp(value.timestamp(), tz=timezone.utc)
+        else:
+            return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class CrimeStore:
+    """
+    Process-wide in-memory copy of a repository's documents (crimes by default).
+
+    The collection is read once at start-up and then kept current either by
+    the repository's change listener ('listener' mode) or by fetching documents
+    newer than the latest seen timestamp ('poll' mode). A read that finds
+    the data older than max_staleness seconds refreshes first and counts as
+    a miss (concurrent stale reads wait for one shared refresh); every other
+    read is served from memory as a hit. A healthy
+    listener keeps the data current however quiet it is, so in listener
+    mode only a snapshot the store failed to apply makes the next read
+    reconcile the whole collection. Handlers that write crimes call put() so
+    their own writes are visible immediately.
+
+    The poll watermark only advances from polled documents, never from put(),
+    so another worker's writes with earlier timestamps are still fetched.
+    Polling by timestamp cannot see updates to older documents or deletes,
+    so in poll mode every reconcile_interval seconds a poll re-reads the
+    whole collection instead. A reconcile leaves alone documents changed
+    while it was reading. Subscribers are called after the store lock is
+    released, in the order the changes were applied.
+    """
+
+    def __init__(self, repository, mode='listener', max_staleness=30.0, reconcile_interval=300.0):
+        self.repository = repository
+        self.mode = mode if mode in ('listener', 'poll') else 'listener'
+        self.max_staleness = float(max_staleness)
+        self.reconcile_interval = float(reconcile_interval)
+
+        self._lock = threading.RLock()
+        self._notify_lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()   # one refresh at a time; other stale readers wait for it
+        self._docs = {}
+        self._changed_at = {}       # crime_id -> version of its latest change, pruned by reload()
+        self._timestamps = {}
+        self._subscribers = []
+        self._pending = []          # changes applied but not yet sent to subscribers
+        self._watch = None
+        self._loaded = False
+        self._last_sync = 0.0
+        self._last_reload = 0.0
+        self._latest_timestamp = None
+        self._listener_failed = False
+
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.reconciles = 0
+        self.listener_errors = 0
+
+    def start(self):
+        """Load the collection and begin tracking changes"""
+        self.reload()
+        if self.mode == 'listener':
+            try:
+                self._watch = self.repository.watch(self._on_changes)
+            except Exception as e:
+                logger.error(f"Crime listener unavailable, falling back to polling: {e}")
+                self.mode = 'poll'
+        return self
+
+    def stop(self):
+        if self._watch is not None:
+            try:
+                self._watch.unsubscribe()
+            except Exception as e:
+                logger.warning(f"Error stopping crime listener: {e}")
+            self._watch = None
+
+    def subscribe(self, callback, replay=False):
+        """
+        Register callback(change_type, crime_id, new_doc, old_doc) for every change.
+
+        With replay=True the callback first gets an 'ADDED' change for every
+        cached document, then every later change, so it misses nothing.
+        """
+        with self._notify_lock:
+            with self._lock:
+                # Changes queued so far are already part of the replayed state
+                earlier, self._pending = self._pending, []
+                subscribers = list(self._subscribers)
+                docs = list(self._docs.items()) if replay else []
+                self._subscribers.append(callback)
+            self._deliver(earlier, subscribers)
+            for crime_id, data in docs:
+                callback('ADDED', crime_id, data, None)
+        self._notify()
+
+    def reload(self):
+        """Reconcile the cached documents with a full read of the collection"""
+        with self._reload_lock:
+            with self._lock:
+                # Anything the listener drops from here on is caught by the next reload
+                self._listener_failed = False
+                read_version = self.version
+            docs = {}
+            for crime_id, data in self.repository.all():
+                docs[crime_id] = data
+
+            with self._lock:
+                # put() or the listener may have changed a document after the read; theirs is newer
+                def unchanged(crime_id):
+                    return self._changed_at.get(crime_id, 0) <= read_version
+
+                for crime_id in list(self._docs):
+                    if crime_id not in docs and unchanged(crime_id):
+                        self._apply('REMOVED', crime_id, None)
+                for crime_id, data in docs.items():
+                    if self._docs.get(crime_id) != data and unchanged(crime_id):
+                        self._apply('MODIFIED' if crime_id in self._docs else 'ADDED', crime_id, data)
+                    self._advance_watermark(data)
+                self._changed_at = {
+                    crime_id: version for crime_id, version in self._changed_at.items()
+                    if version > read_version
+                }
+                if self._loaded:
+                    self.reconciles += 1
+                self._loaded = True
+                self._last_sync = self._last_reload = time.monotonic()
+                self.refreshes += 1
+        self._notify()
+        logger.info(f"Crime store loaded {len(docs)} crimes")
+
+    def refresh(self):
+        """Fetch documents newer than the poll watermark, or reconcile when one is due"""
+        # The listener sees updates and deletes itself, so only polling reconciles on a timer
+        reconcile_due = (self.mode == 'poll'
+                         and time.monotonic() - self._last_reload >= self.reconcile_interval)
+        if not self._loaded or self._latest_timestamp is None or self._listener_failed or reconcile_due:
+            self.reload()
+            return
+
+        docs = list(self.repository.since(self._latest_timestamp))
+        with self._lock:
+            for crime_id, data in docs:
+                if self._docs.get(crime_id) != data:
+                    self._apply('MODIFIED' if crime_id in self._docs else 'ADDED', crime_id, data)
+                self._advance_watermark(data)
+            self._last_sync = time.monotonic()
+            self.refreshes += 1
+        self._notify()
+
+    def put(self, crime_id, data):
+        """Write-through for documents the app has just saved"""
+        with self._lock:
+            # Storage that notifies synchronously may have delivered it already
+            if self._docs.get(crime_id) == data:
+                return
+            self._apply('MODIFIED' if crime_id in self._docs else 'ADDED', crime_id, dict(data))
+        self._notify()
+
+    def remove(self, crime_id):
+        with self._lock:
+            if crime_id in self._docs:
+                self._apply('REMOVED', crime_id, None)
+        self._notify()
+
+    def _on_changes(self, changes):
+        try:
+            with self._lock:
+                for change_type, crime_id, data in changes:
+                    if change_type == 'REMOVED':
+                        if crime_id in self._docs:
+                            self._apply('REMOVED', crime_id, None)
+                    else:
+                        # Ignore echoes of a write-through that carry no new data
+                        if self._docs.get(crime_id) == data:
+                            continue
+                        self._apply('MODIFIED' if crime_id in self._docs else 'ADDED', crime_id, data)
+                self._last_sync = time.monotonic()
+            self._notify()
+        except Exception as e:
+            with self._lock:
+                self.listener_errors += 1
+                self._listener_failed = True
+            logger.error(f"Error applying crime snapshot: {e}", exc_info=True)
+
+    def _advance_watermark(self, data):
+        """Move the poll watermark to a polled document's time field; caller holds the lock"""
+        timestamp = to_utc_naive(data.get(getattr(self.repository, 'time_field', None) or 'timestamp'))
+        if timestamp is not None and (self._latest_timestamp is None or timestamp > self._latest_timestamp):
+            self._latest_timestamp = timestamp
+
+    def _apply(self, change_type, crime_id, data):
+        """Apply one change under the lock and queue it for the subscribers"""
+        old = self._docs.get(crime_id)
+        if change_type == 'REMOVED':
+            self._docs.pop(crime_id, None)
+            self._timestamps.pop(crime_id, None)
+        else:
+            timestamp = to_utc_naive(data.get('timestamp'))
+            # SERVER_TIMESTAMP sentinels resolve to the time we saw the write
+            if timestamp is None and 'timestamp' in data:
+                timestamp = datetime.utcnow()
+            self._docs[crime_id] = data
+            self._timestamps[crime_id] = timestamp
+        self.version += 1
+        self._changed_at[crime_id] = self.version
+        self._pending.append((change_type, crime_id, data, old))
+
+    def _notify(self):
+        """Send queued changes to the subscribers, in order, without holding the store lock"""
+        with self._notify_lock:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        return
+                    changes, self._pending = self._pending, []
+                    subscribers = list(self._subscribers)
+                self._deliver(changes, subscribers)
+
+    def _deliver(self, changes, subscribers):
+        for change in changes:
+            for callback in subscribers:
+                try:
+                    callback(*change)
+                except Exception as e:
+                    logger.error(f"Crime store subscriber failed: {e}", exc_info=True)
+
+    def _is_stale(self):
+        """Whether a read has to refresh first; caller holds the lock"""
+        if not self._loaded or self._listener_failed:
+            return True
+        return self.mode == 'poll' and time.monotonic() - self._last_sync > self.max_staleness
+
+    def _ensure_fresh(self):
+        """Count the read and refresh first if the cached data is too old"""
+        with self._lock:
+            stale = self._is_stale()
+            if stale:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if not stale:
+            return
+
+        with self._refresh_lock:
+            # Readers that queued behind another refresh find the data fresh again
+            with self._lock:
+                if not self._is_stale():
+                    return
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing crime store: {e}", exc_info=True)
+
+    def _copy(self, crime_id):
+        crime = dict(self._docs[crime_id])
+        crime['id'] = crime_id
+        return crime
+
+    def get(self, crime_id):
+        """Return a copy of one crime, or None"""
+        self._ensure_fresh()
+        with self._lock:
+            return self._copy(crime_id) if crime_id in self._docs else None
+
+    def all(self):
+        """Return copies of every cached crime"""
+        self._ensure_fresh()
+        with self._lock:
+            return [self._copy(crime_id) for crime_id in self._docs]
+
+    def since(self, start_date, limit=None):
+        """Return crimes with a timestamp at or after start_date"""
+        self._ensure_fresh()
+        start_date = to_utc_naive(start_date)
+        with self._lock:
+            crimes = [
+                self._copy(crime_id) for crime_id, timestamp in self._timestamps.items()
+                if timestamp is not None and timestamp >= start_date
+            ]
+        return crimes[:limit] if limit is not None else crimes
+
+    def recent(self, limit=100):
+        """Return the newest crimes, ordered by timestamp descending"""
+        self._ensure_fresh()
+        with self._lock:
+            ordered = sorted(
+                (item for item in self._timestamps.items() if item[1] is not None),
+                key=lambda item: item[1],
+                reverse=True
+            )
+            return [self._copy(crime_id) for crime_id, _ in ordered[:limit]]
+
+    def get_stats(self):
+        """Cache counters for monitoring"""
+        with self._lock:
+            reads = self.hits + self.misses
+            return {
+                'mode': self.mode,
+                'loaded': self._loaded,
+                'crimes': len(self._docs),
+                'version': self.version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / reads, 4) if reads else None,
+                'refreshes': self.refreshes,
+                'reconciles': self.reconciles,
+                'reconcile_interval_seconds': self.reconcile_interval,
+                'listener_errors': self.listener_errors,
+                'listener_failed': self._listener_failed,
+                'max_staleness_seconds': self.max_staleness,
+                'seconds_since_sync': round(time.monotonic() - self._last_sync, 3) if self._loaded else None,
+                'latest_timestamp': self._latest_timestamp.isoformat() if self._latest_timestamp else None
+            }
@@ -0,0 +1,208 @@
+import bisect
+import heapq
+import logging
+import math
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+from crime_store import to_utc_naive
+from route_scoring import influence_radius_km
+from routing_backends import BLOCKED_EDGE_PENALTY
+from routing_layer import DANGER_ZONES
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(sorted_values, q):
+    """Linear-interpolated percentile of an already sorted list (numpy's default method)"""
+    position = (len(sorted_values) - 1) * q / 100.0
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+class EdgeDangerCosts:
+    """
+    Per-edge crime danger costs for a RoadGraph, maintained incrementally.
+
+    Each crime from the last `days` adds its falloff penalty and barrier
+    flag to the edges within reach of it, using the same rules and severity
+    bands as RoutingCrimeLayer. A new or changed crime only touches the
+    edges near it; crimes whose severity band moves because the 33rd/66th
+    percentile thresholds shifted are re-applied, and crimes that age out
+    of the window are removed. Subscribe apply() to a CrimeStore.
+    """
+
+    def __init__(self, graph, days=90, danger_zones=None):
+        self.graph = graph
+        self.days = days
+        self.zones = danger_zones or DANGER_ZONES
+        self.reach_km = influence_radius_km([[0, 0, 0, max(self.zones.values())]])
+
+        self._lock = threading.Lock()
+        self.penalty_sum = np.zeros(graph.num_edges)
+        self.barrier_count = np.zeros(graph.num_edges, dtype=np.int64)
+
+        self._crimes = {}            # crime_id -> (lat, lng, severity, timestamp)
+        self._contributions = {}     # crime_id -> (edges, penalty, barrier)
+        self._by_severity = {}       # severity -> set of crime ids
+        self._severities = []        # sorted severities of tracked crimes
+        self._expiry = []            # heap of (timestamp, crime_id)
+        self._thresholds = (2, 4)
+
+        self._weights = None
+        self._weight_list = None     # _weights as a list, for RoadGraph.shortest_path
+        self.version = 0
+        self.updates = 0
+
+    def _band_radius(self, severity, thresholds=None):
+        low_threshold, high_threshold = thresholds or self._thresholds
+        if severity >= high_threshold:
+            return self.zones['high']
+        if severity >= low_threshold:
+            return self.zones['medium']
+        return self.zones['low']
+
+    def _compute_thresholds(self):
+        if len(self._severities) > 3:
+            return (percentile(self._severities, 33), percentile(self._severities, 66))
+        return (2, 4)
+
+    def _contribute(self, crime_id):
+        lat, lng, severity, _ = self._crimes[crime_id]
+        radius = self._band_radius(severity)
+        edges, penalty, barrier = self.graph.crime_contribution(lat, lng, radius, self.reach_km)
+        self.penalty_sum[edges] += penalty
+        self.barrier_count[edges] += barrier
+        self._contributions[crime_id] = (edges, penalty, barrier)
+
+    def _withdraw(self, crime_id):
+        contribution = self._contributions.pop(crime_id, None)
+        if contribution is not None:
+            edges, penalty, barrier = contribution
+            self.penalty_sum[edges] -= penalty
+            self.barrier_count[edges] -= barrier
+
+    def _forget(self, crime_id):
+        self._withdraw(crime_id)
+        previous = self._crimes.pop(crime_id, None)
+        if previous is not None:
+            severity = previous[2]
+            del self._severities[bisect.bisect_left(self._severities, severity)]
+            ids = self._by_severity[severity]
+            ids.discard(crime_id)
+            if not ids:
+                del self._by_severity[severity]
+
+    def _parse(self, crime):
+        try:
+            timestamp = to_utc_naive(crime.get('timestamp'))
+            if timestamp is None or timestamp < datetime.utcnow() - timedelta(days=self.days):
+                return None
+            if 'latitude' not in crime or 'longitude' not in crime:
+                return None
+            return (float(crime['latitude']), float(crime['longitude']),
+                    float(crime.get('severity', 1)), timestamp)
+        except (TypeError, ValueError):
+            return None
+
+    def _rebalance(self):
+        """Re-apply crimes whose severity band changed with the percentile thresholds"""
+        old = self._thresholds
+        new = self._compute_thresholds()
+        if new == old:
+            return
+        self._thresholds = new
+        moved = [
+            crime_id
+            for severity, ids in self._by_severity.items()
+            if self._band_radius(severity, old) != self._band_radius(severity, new)
+            for crime_id in ids
+            if crime_id in self._contributions
+        ]
+        for crime_id in moved:
+            self._withdraw(crime_id)
+            self._contribute(crime_id)
+
+    def _track(self, crime_id, crime):
+        """Record a crime without contributing it; returns False if it is outside the window"""
+        parsed = self._parse(crime)
+        if parsed is None:
+            return False
+        self._crimes[crime_id] = parsed
+        bisect.insort(self._severities, parsed[2])
+        self._by_severity.setdefault(parsed[2], set()).add(crime_id)
+        heapq.heappush(self._expiry, (parsed[3], crime_id))
+        return True
+
+    def apply(self, change_type, crime_id, crime, old=None):
+        """CrimeStore subscriber: update the edges near one added, changed or removed crime"""
+        with self._lock:
+            self._forget(crime_id)
+            tracked = change_type != 'REMOVED' and crime is not None and self._track(crime_id, crime)
+            self._rebalance()
+            if tracked:
+                self._contribute(crime_id)
+            self._weights = None
+            self.version += 1
+            self.updates += 1
+
+    def load(self, crimes):
+        """
+        Apply a snapshot of crime dicts carrying an 'id'.
+
+        All crimes are recorded first and the thresholds settled once, so
+        each crime is contributed a single time rather than re-applied
+        whenever a new crime shifts the percentiles.
+        """
+        with self._lock:
+            added = []
+            for crime in crimes:
+                self._forget(crime['id'])
+                if self._track(crime['id'], crime):
+                    added.append(crime['id'])
+            self._rebalance()
+            for crime_id in added:
+                self._contribute(crime_id)
+            self._weights = None
+            self.version += 1
+            self.updates += len(added)
+        logger.info(f"Edge danger costs cover {len(self._crimes)} crimes on {self.graph.num_edges} edges")
+
+    def expire(self):
+        """Drop crimes that have aged out of the window"""
+        cutoff = datetime.utcnow() - timedelta(days=self.days)
+        with self._lock:
+            expired = False
+            while self._expiry and self._expiry[0][0] < cutoff:
+                timestamp, crime_id = heapq.heappop(self._expiry)
+                current = self._crimes.get(crime_id)
+                if current is not None and current[3] == timestamp:
+                    self._forget(crime_id)
+                    expired = True
+            if expired:
+                self._rebalance()
+                self._weights = None
+                self.version += 1
+
+    def edge_weights(self):
+        """Edge lengths plus danger penalties, ready for RoadGraph.shortest_path"""
+        self.expire()
+        with self._lock:
+            if self._weights is None:
+                penalties = np.where(self.barrier_count > 0, BLOCKED_EDGE_PENALTY,
+                                     np.maximum(self.penalty_sum, 0.0))
+                self._weights = self.graph.lengths + penalties
+            return self._weights
+
+    def edge_weight_list(self):
+        """edge_weights() as a list, converted once per version of the costs"""
+        weights = self.edge_weights()
+        with self._lock:
+            if self._weight_list is None or self._weight_list[0] is not weights:
+                self._weight_list = (weights, weights.tolist())
+            return self._weight_list[1]
+
+    def __len__(self):
+        return len(self._crimes)
@@ -0,0 +1,219 @@
+"""
+Shared distance kernels. Everything takes NumPy arrays (or scalars that
+broadcast against them) and returns kilometers unless noted otherwise.
+
+Accuracy, measured with benchmark_geo_math.py:
+
+- haversine_km treats the Earth as a sphere of radius EARTH_RADIUS_KM. Against
+  the WGS84 ellipsoid (geopy's geodesic) it is within 0.6% at any distance.
+- equirectangular_km projects around the mean latitude of each pair. For
+  pairs up to 100km apart below 70 degrees latitude it stays within 0.02% of
+  haversine_km; error grows with distance and latitude, so it is meant for
+  short-range filtering and ranking.
+- vincenty_km solves the inverse problem on the WGS84 ellipsoid and agrees
+  with geopy's geodesic to well under a meter. Nearly antipodal pairs where
+  the iteration does not converge fall back to haversine_km.
+- point_to_polyline_km projects each polyline around the query point with the
+  same equirectangular approximation and shares its error bounds.
+- points_to_segments_dist is the planar degree metric of route scoring. It
+  ignores the narrowing of longitude degrees and is not a ground distance.
+"""
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+# Great-circle km per degree of latitude, used to size haversine searches
+ARC_KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+# WGS84 ellipsoid
+WGS84_A_KM = 6378.137
+WGS84_F = 1 / 298.257223563
+WGS84_B_KM = WGS84_A_KM * (1 - WGS84_F)
+
+# Accuracy modes accepted by distance_km, cheapest first
+DISTANCE_MODES = ('fast', 'haversine', 'ellipsoid')
+
+# Points x segments handled per block in point_to_polyline_km (~16MB of floats)
+MAX_BLOCK_ELEMENTS = 2000000
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in km between broadcastable arrays of points"""
+    lat1, lng1 = np.radians(lat1), np.radians(lng1)
+    lat2, lng2 = np.radians(lat2), np.radians(lng2)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + \
+        np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance in meters between two points, for scalar hot loops"""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return EARTH_RADIUS_KM * 1000 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def _wrap_degrees(delta):
+    return (delta + 180.0) % 360.0 - 180.0
+
+
+def equirectangular_km(lat1, lng1, lat2, lng2):
+    """Fast approximate distance in km between broadcastable arrays of points"""
+    lat1, lat2 = np.asarray(lat1, dtype=float), np.asarray(lat2, dtype=float)
+    x = _wrap_degrees(np.asarray(lng2, dtype=float) - lng1) * np.cos(np.radians((lat1 + lat2) / 2))
+    y = lat2 - lat1
+    return ARC_KM_PER_DEGREE * np.sqrt(x * x + y * y)
+
+
+def vincenty_km(lat1, lng1, lat2, lng2, max_iterations=200, tolerance=1e-12):
+    """Ellipsoidal (WGS84) distance in km between broadcastable arrays of points"""
+    lat1, lng1, lat2, lng2 = np.broadcast_arrays(
+        *(np.asarray(v, dtype=float) for v in (lat1, lng1, lat2, lng2))
+    )
+    f = WGS84_F
+    u1 = np.arctan((1 - f) * np.tan(np.radians(lat1)))
+    u2 = np.arctan((1 - f) * np.tan(np.radians(lat2)))
+    sin_u1, cos_u1 = np.sin(u1), np.cos(u1)
+    sin_u2, cos_u2 = np.sin(u2), np.cos(u2)
+    big_l = np.radians(_wrap_degrees(lng2 - lng1))
+
+    lam = big_l.copy()
+    converged = np.zeros(lam.shape, dtype=bool)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for _ in range(max_iterations):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+            cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma != 0, cos_u1 * cos_u2 * sin_lam / sin_sigma, 0.0)
+            cos_sq_alpha = 1 - sin_alpha ** 2
+            # Equatorial lines have cos_sq_alpha == 0
+            cos_2sigma_m = np.where(cos_sq_alpha != 0,
+                                    cos_sigma - 2 * sin_u1 * sin_u2 / cos_sq_alpha, 0.0)
+            c = f / 16 * cos_sq_alpha * (4 + f * (4 - 3 * cos_sq_alpha))
+            lam_next = big_l + (1 - c) * f * sin_alpha * (
+                sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+            )
+            converged = np.abs(lam_next - lam) <= tolerance
+            lam = lam_next
+            if converged.all():
+                break
+
+        u_sq = cos_sq_alpha * (WGS84_A_KM ** 2 - WGS84_B_KM ** 2) / WGS84_B_KM ** 2
+        big_a = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+        big_b = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+        delta_sigma = big_b * sin_sigma * (cos_2sigma_m + big_b / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+            - big_b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+        ))
+        distance = WGS84_B_KM * big_a * (sigma - delta_sigma)
+
+    distance = np.where(sin_sigma == 0, 0.0, distance)
+    fallback = ~converged | ~np.isfinite(distance)
+    if fallback.any():
+        distance = np.where(fallback, haversine_km(lat1, lng1, lat2, lng2), distance)
+    return distance
+
+
+def distance_km(lat1, lng1, lat2, lng2, mode='haversine'):
+    """Distance in km with the accuracy mode picked from DISTANCE_MODES"""
+    if mode == 'fast':
+        return equirectangular_km(lat1, lng1, lat2, lng2)
+    if mode == 'haversine':
+        return haversine_km(lat1, lng1, lat2, lng2)
+    if mode == 'ellipsoid':
+        return vincenty_km(lat1, lng1, lat2, lng2)
+    raise ValueError(f"Unknown distance mode {mode!r}, expected one of {DISTANCE_MODES}")
+
+
+def record_coordinates(records, lat_field='latitude', lng_field='longitude'):
+    """Latitude and longitude arrays from dicts, NaN where a coordinate is missing or invalid"""
+    lats = np.full(len(records), np.nan)
+    lngs = np.full(len(records), np.nan)
+    for i, record in enumerate(records):
+        try:
+            lats[i] = float(record[lat_field])
+            lngs[i] = float(record[lng_field])
+        except (KeyError, TypeError, ValueError):
+            lats[i] = lngs[i] = np.nan
+    return lats, lngs
+
+
+def points_to_segments_dist(crime_lat, crime_lng, a_lat, a_lng, b_lat, b_lng):
+    """Planar distance in degrees for every (point, segment) pair.
+
+    Point arrays have shape (C,), segment arrays shape (S,); returns a (C, S)
+    matrix. This is the metric route scoring is calibrated against.
+    """
+    px = b_lng - a_lng
+    py = b_lat - a_lat
+    norm = px * px + py * py
+    safe_norm = np.where(norm != 0, norm, 1.0)
+
+    rel_lng = crime_lng[:, None] - a_lng[None, :]
+    rel_lat = crime_lat[:, None] - a_lat[None, :]
+    u = (rel_lng * px + rel_lat * py) / safe_norm
+    u = np.where(norm != 0, u, 0.0)
+    np.clip(u, 0, 1, out=u)
+
+    dx = (a_lng + u * px) - crime_lng[:, None]
+    dy = (a_lat + u * py) - crime_lat[:, None]
+    return np.sqrt(dx * dx + dy * dy)
+
+
+def point_to_polyline_km(lats, lngs, line_lats, line_lngs):
+    """
+    Distance in km from each point to the nearest part of a polyline.
+
+    The polyline is projected around each query point (longitudes scaled by
+    the cosine of the point's latitude) and the closest segment is found in
+    that plane. A single-vertex polyline is treated as a point.
+    """
+    lats = np.atleast_1d(np.asarray(lats, dtype=float))
+    lngs = np.atleast_1d(np.asarray(lngs, dtype=float))
+    line_lats = np.atleast_1d(np.asarray(line_lats, dtype=float))
+    line_lngs = np.atleast_1d(np.asarray(line_lngs, dtype=float))
+    if line_lats.size == 0:
+        return np.full(lats.shape, np.inf)
+    if line_lats.size == 1:
+        return equirectangular_km(lats, lngs, line_lats[0], line_lngs[0])
+
+    a_lat, b_lat = line_lats[:-1], line_lats[1:]
+    a_lng, b_lng = line_lngs[:-1], line_lngs[1:]
+    result = np.empty(lats.shape)
+    block = max(1, int(MAX_BLOCK_ELEMENTS // a_lat.size))
+    for start in range(0, lats.size, block):
+        p_lat = lats[start:start + block, None]
+        p_lng = lngs[start:start + block, None]
+        scale = np.cos(np.radians(p_lat))
+
+        ax = _wrap_degrees(a_lng - p_lng) * scale
+        bx = _wrap_degrees(b_lng - p_lng) * scale
+        ay = a_lat - p_lat
+        by = b_lat - p_lat
+        dx, dy = bx - ax, by - ay
+        norm = dx * dx + dy * dy
+        u = np.where(norm != 0, -(ax * dx + ay * dy) / np.where(norm != 0, norm, 1.0), 0.0)
+        np.clip(u, 0, 1, out=u)
+        x = ax + u * dx
+        y = ay + u * dy
+        result[start:start + block] = np.sqrt(x * x + y * y).min(axis=1)
+    return result * ARC_KM_PER_DEGREE
+
+
+def grid_bucket(lats, lngs, decimals=3):
+    """
+    Bucket points into a grid by rounding coordinates to `decimals` places.
+
+    Returns (cell_lats, cell_lngs, inverse): the rounded coordinates of each
+    occupied cell and, for every input point, the index of its cell.
+    """
+    cells = np.column_stack([
+        np.round(np.asarray(lats, dtype=float), decimals),
+        np.round(np.asarray(lngs, dtype=float), decimals)
+    ])
+    if cells.size == 0:
+        return np.empty(0), np.empty(0), np.empty(0, dtype=np.int64)
+    unique, inverse = np.unique(cells, axis=0, return_inverse=True)
+    return unique[:, 0], unique[:, 1], inverse.ravel()
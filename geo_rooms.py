@@ -0,0 +1,85 @@
+import threading
+import geohash_index
+
+# Geohash-5 cells are roughly 4.9km x 4.9km
+ROOM_PRECISION = 5
+ROOM_PREFIX = 'geo:'
+# Clients that have not sent a location yet still get every alert
+UNLOCATED_ROOM = 'geo:unlocated'
+
+
+def room_for(lat, lng, precision=ROOM_PRECISION):
+    """Socket.IO room of the geohash cell containing a point"""
+    return ROOM_PREFIX + geohash_index.encode(lat, lng, precision)
+
+
+def rooms_for_alert(lat, lng, radius_km, precision=ROOM_PRECISION):
+    """Rooms whose cells intersect the circle around an alert, plus the unlocated room"""
+    _, cells = geohash_index.cover_circle(lat, lng, radius_km, precision=precision)
+    return [ROOM_PREFIX + cell for cell in cells] + [UNLOCATED_ROOM]
+
+
+class GeoRoomRegistry:
+    """
+    Which geo room each connected client is in.
+
+    Joining and leaving the Socket.IO rooms is left to the handlers (it needs
+    the request context); this keeps the membership so a client can be moved
+    when its location changes and rooms can be counted for monitoring.
+    """
+
+    def __init__(self, precision=ROOM_PRECISION):
+        self.precision = precision
+        self._lock = threading.Lock()
+        self._rooms = {}     # sid -> room
+        self._members = {}   # room -> count
+        self.emits = 0
+        self.rooms_targeted = 0
+
+    def _move(self, sid, room):
+        previous = self._rooms.get(sid)
+        if previous is not None:
+            self._members[previous] -= 1
+            if not self._members[previous]:
+                del self._members[previous]
+        if room is None:
+            self._rooms.pop(sid, None)
+        else:
+            self._rooms[sid] = room
+            self._members[room] = self._members.get(room, 0) + 1
+        return previous
+
+    def connect(self, sid):
+        """Put a new client in the unlocated room; returns the room to join"""
+        with self._lock:
+            self._move(sid, UNLOCATED_ROOM)
+        return UNLOCATED_ROOM
+
+    def locate(self, sid, lat, lng):
+        """Move a client to the room of its location; returns (old_room, new_room)"""
+        room = room_for(lat, lng, self.precision)
+        with self._lock:
+            return self._move(sid, room), room
+
+    def disconnect(self, sid):
+        with self._lock:
+            self._move(sid, None)
+
+    def target_rooms(self, lat, lng, radius_km):
+        """Rooms a new alert should be emitted to"""
+        rooms = rooms_for_alert(lat, lng, radius_km, self.precision)
+        with self._lock:
+            self.emits += 1
+            self.rooms_targeted += len(rooms)
+        return rooms
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'precision': self.precision,
+                'clients': len(self._rooms),
+                'rooms': len(self._members),
+                'unlocated_clients': self._members.get(UNLOCATED_ROOM, 0),
+                'emits': self.emits,
+                'avg_rooms_per_emit': round(self.rooms_targeted / self.emits, 2) if self.emits else None
+            }
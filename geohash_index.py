@@ -0,0 +1,149 @@
+import argparse
+import math
+from geo_math import ARC_KM_PER_DEGREE
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_BASE32_VALUES = {c: i for i, c in enumerate(BASE32)}
+
+# Precision of the geohash stored on documents (~1.2m x 0.6m cells)
+STORED_PRECISION = 10
+# Sorts after every base32 character, so prefix + RANGE_END bounds a prefix range
+RANGE_END = '~'
+
+
+def encode(lat, lng, precision=STORED_PRECISION):
+    """Geohash of a point"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (interval[0] + interval[1]) / 2
+        if coord >= mid:
+            value = (value << 1) | 1
+            interval[0] = mid
+        else:
+            value <<= 1
+            interval[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(lat, lng) size in degrees of a geohash cell"""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def _to_int(geohash):
+    value = 0
+    for c in geohash:
+        value = value * 32 + _BASE32_VALUES[c]
+    return value
+
+
+def cover_circle(lat, lng, radius_km, max_cells=16, max_precision=9, precision=None):
+    """
+    Geohash cells covering the bounding box of a search circle.
+
+    Uses the given precision, or else the finest precision at which the box
+    spans at most max_cells cells. Returns (precision, sorted list of cell
+    geohashes).
+    """
+    dlat = radius_km / ARC_KM_PER_DEGREE
+    max_abs_lat = min(abs(lat) + dlat, 90.0)
+    cos_lat = math.cos(math.radians(max_abs_lat))
+    dlng = 180.0 if cos_lat < 1e-9 else min(dlat / cos_lat, 180.0)
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    min_lng, max_lng = max(lng - dlng, -180.0), min(lng + dlng, 180.0)
+
+    for precision in ([precision] if precision else range(max_precision, 0, -1)):
+        height, width = cell_size(precision)
+        rows = range(math.floor((min_lat + 90) / height), math.floor((max_lat + 90) / height) + 1)
+        cols = range(math.floor((min_lng + 180) / width), math.floor((max_lng + 180) / width) + 1)
+        if len(rows) * len(cols) <= max_cells or precision == 1:
+            break
+
+    cells = set()
+    for row in rows:
+        cell_lat = min(-90 + (row + 0.5) * height, 90.0)
+        for col in cols:
+            cell_lng = min(-180 + (col + 0.5) * width, 180.0)
+            cells.add(encode(cell_lat, cell_lng, precision))
+    return precision, sorted(cells)
+
+
+def prefix_ranges(lat, lng, radius_km, max_cells=16):
+    """
+    (start, end) string ranges of the stored geohash field that cover a circle.
+
+    Cells that follow each other in geohash order are merged into one range,
+    so each range is a single `start <= geohash < end` query.
+    """
+    _, cells = cover_circle(lat, lng, radius_km, max_cells)
+    ranges = []
+    previous = None
+    for cell in cells:
+        value = _to_int(cell)
+        if previous is not None and value == previous + 1:
+            ranges[-1][1] = cell
+        else:
+            ranges.append([cell, cell])
+        previous = value
+    return [(first, last + RANGE_END) for first, last in ranges]
+
+
+def query_nearby(collection, lat, lng, radius_km, max_cells=16):
+    """
+    Stream the documents of a collection whose geohash falls in the cells
+    around a search circle. These are candidates only; callers still filter
+    by exact distance.
+    """
+    seen = set()
+    for start, end in prefix_ranges(lat, lng, radius_km, max_cells):
+        query = collection.where('geohash', '>=', start).where('geohash', '<', end)
+        for doc in query.stream():
+            if doc.id not in seen:
+                seen.add(doc.id)
+                yield doc
+
+
+def backfill(collection, overwrite=False):
+    """Add a geohash field to documents with coordinates that do not have one yet"""
+    updated = 0
+    for doc in collection.stream():
+        data = doc.to_dict()
+        if data.get('geohash') and not overwrite:
+            continue
+        try:
+            geohash = encode(float(data['latitude']), float(data['longitude']))
+        except (KeyError, TypeError, ValueError):
+            continue
+        doc.reference.update({'geohash': geohash})
+        updated += 1
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Add geohash fields to existing Firestore documents')
+    parser.add_argument('--collection', default='alerts')
+    parser.add_argument('--overwrite', action='store_true', help='Recompute geohashes that already exist')
+    args = parser.parse_args()
+
+    from google.cloud import firestore
+    db = firestore.Client()
+    updated = backfill(db.collection(args.collection), overwrite=args.overwrite)
+    print(f"Added geohash to {updated} documents in {args.collection}")
+
+
+if __name__ == '__main__':
+    main()
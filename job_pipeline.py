@@ -0,0 +1,222 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class StageMetrics:
+    """Latency samples and outcome counters for one pipeline stage"""
+
+    def __init__(self, samples=1000):
+        self.latencies = deque(maxlen=samples)
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+
+    def snapshot(self):
+        ordered = sorted(self.latencies)
+
+        def percentile(q):
+            return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 2) if ordered else None
+
+        return {
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'retried': self.retried,
+            'latency_ms': {
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'max': round(ordered[-1] * 1000, 2) if ordered else None,
+                'samples': len(ordered)
+            }
+        }
+
+
+class JobPipeline:
+    """
+    Bounded in-process job queue with a worker pool.
+
+    A job is a list of stage names run in order against a shared context
+    dict. A stage that raises is retried with exponential backoff and jitter
+    (without holding a worker) up to max_attempts, after which the rest of
+    the job is abandoned and logged. Stages should be idempotent since a
+    retry re-runs the whole stage. submit() never blocks: when the queue is
+    full it returns None and the caller decides what to do. Retries are not
+    counted against the limit, so an accepted job is never dropped.
+    """
+
+    def __init__(self, workers=4, max_queue=1000, max_attempts=3, backoff=0.5, max_backoff=10.0):
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._stages = {}
+        self._ready = deque()       # jobs waiting for a worker
+        self._delayed = []          # heap of (due, tiebreak, job) waiting out a backoff
+        self._tiebreak = itertools.count()
+        self._cond = threading.Condition()
+        self._lock = threading.Lock()
+        self._running = True
+        self._unfinished = 0        # accepted jobs not yet completed or abandoned
+
+        self.metrics = {}
+        self.submitted = 0
+        self.completed = 0
+        self.abandoned = 0
+        self.rejected = 0
+        self.in_flight = 0
+
+        self._threads = [
+            threading.Thread(target=self._work, name=f'pipeline-worker-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def register_stage(self, name, func):
+        """func(context) runs one stage; raise to have it retried"""
+        self._stages[name] = func
+        self.metrics[name] = StageMetrics()
+
+    def submit(self, stages, context):
+        """Queue a job; returns its id, or None if the queue is full"""
+        job = {'id': uuid.uuid4().hex, 'stages': list(stages), 'next': 0, 'attempt': 1,
+               'context': context, 'enqueued': time.monotonic()}
+        with self._cond:
+            if not self._running or len(self._ready) >= self.max_queue:
+                with self._lock:
+                    self.rejected += 1
+                return None
+            self._ready.append(job)
+            self._unfinished += 1
+            self._cond.notify()
+        with self._lock:
+            self.submitted += 1
+        return job['id']
+
+    def run_inline(self, stages, context):
+        """
+        Run a job's stages in the calling thread, once each, without retries.
+        A failing stage is logged and the remaining stages still run; returns
+        the names of the stages that failed.
+        """
+        failed = []
+        for name in stages:
+            metrics = self.metrics[name]
+            try:
+                self._run_stage(name, context)
+            except Exception as e:
+                failed.append(name)
+                with self._lock:
+                    metrics.failed += 1
+                logger.error(f"Inline stage {name} failed: {e}", exc_info=True)
+                continue
+            with self._lock:
+                metrics.succeeded += 1
+        return failed
+
+    def _run_stage(self, name, context):
+        start = time.perf_counter()
+        try:
+            self._stages[name](context)
+        finally:
+            with self._lock:
+                self.metrics[name].latencies.append(time.perf_counter() - start)
+
+    def _next_job(self):
+        """Block until a job is ready or a retry's backoff has passed; None once stopped"""
+        with self._cond:
+            while True:
+                if self._ready:
+                    return self._ready.popleft()
+                now = time.monotonic()
+                if self._delayed and self._delayed[0][0] <= now:
+                    return heapq.heappop(self._delayed)[2]
+                if not self._running:
+                    return None
+                self._cond.wait(self._delayed[0][0] - now if self._delayed else None)
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            with self._lock:
+                self.in_flight += 1
+            finished = True
+            try:
+                finished = self._advance(job)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                if finished:
+                    with self._cond:
+                        self._unfinished -= 1
+                        self._cond.notify_all()
+
+    def _advance(self, job):
+        """Run the job's remaining stages; False if a stage was scheduled for a retry"""
+        while job['next'] < len(job['stages']):
+            name = job['stages'][job['next']]
+            metrics = self.metrics[name]
+            try:
+                self._run_stage(name, job['context'])
+            except Exception as e:
+                if job['attempt'] >= self.max_attempts:
+                    with self._lock:
+                        metrics.failed += 1
+                        self.abandoned += 1
+                    logger.error(f"Job {job['id']} stage {name} failed after {job['attempt']} attempts: {e}",
+                                 exc_info=True)
+                    return True
+                delay = min(self.backoff * 2 ** (job['attempt'] - 1), self.max_backoff)
+                delay *= random.uniform(0.5, 1.0)
+                with self._lock:
+                    metrics.retried += 1
+                logger.warning(f"Job {job['id']} stage {name} failed (attempt {job['attempt']}), "
+                               f"retrying in {delay:.2f}s: {e}")
+                job['attempt'] += 1
+                with self._cond:
+                    heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._tiebreak), job))
+                    self._cond.notify()
+                return False
+            with self._lock:
+                metrics.succeeded += 1
+            job['next'] += 1
+            job['attempt'] = 1
+        with self._lock:
+            self.completed += 1
+        return True
+
+    def stop(self, timeout=10.0):
+        """Let queued jobs and their retries finish (up to timeout seconds) and stop the workers"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._unfinished and time.monotonic() < deadline:
+                self._cond.wait(deadline - time.monotonic())
+            self._running = False
+            self._cond.notify_all()
+
+    def get_stats(self):
+        with self._cond:
+            queue_depth = len(self._ready)
+            waiting_retry = len(self._delayed)
+        with self._lock:
+            return {
+                'queue_depth': queue_depth,
+                'queue_capacity': self.max_queue,
+                'waiting_retry': waiting_retry,
+                'in_flight': self.in_flight,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'abandoned': self.abandoned,
+                'rejected': self.rejected,
+                'stages': {name: metrics.snapshot() for name, metrics in self.metrics.items()}
+            }
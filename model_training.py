@@ -0,0 +1,301 @@
+"""
+Model training off the web process.
+
+TrainingService runs CrimePredictor ARIMA/LSTM fits in worker processes
+(`python -m model_training <job dir>`), at most `workers` at a time, so a
+long fit never holds the server's GIL. Each job trains into its own
+staging directory through CrimePredictor's joblib/keras save paths. On
+success the model's installer (if any) hot-swaps it into the serving
+predictor, and only then are the artifacts moved into model_dir with
+os.replace, so readers never see a partial file and a model the server
+refused never replaces the previous one. A worker process is used per job
+rather than a pool so that cancelling a running job can terminate it.
+
+Only ARIMA models are hot-swapped (into the trend forecasts). Nothing in
+the app serves LSTM forecasts, so LSTM jobs have no installer and their
+artifacts are only saved to model_dir for offline use.
+"""
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# SimpleCrimePredictor extends installed models, so they must have its order
+ARIMA_ORDER = (1, 1, 1)
+# Parameters each model accepts, with their defaults
+TRAINING_PARAMS = {
+    'arima': {},
+    'lstm': {'epochs': 20, 'batch_size': 32, 'sequence_length': 7}
+}
+# Files each model's training writes to its model directory
+ARTIFACTS = {
+    'arima': ('arima_model.joblib',),
+    'lstm': ('lstm_model.keras', 'lstm_scaler.joblib')
+}
+FINISHED = ('succeeded', 'failed', 'cancelled')
+
+
+def train_arima(values, model_dir):
+    from crime_predictor import CrimePredictor
+    predictor = CrimePredictor(model_dir=model_dir)
+    if not predictor.train_arima(values, order=ARIMA_ORDER):
+        raise RuntimeError('ARIMA training failed')
+    return {'observations': len(values), 'aic': float(predictor.arima_model.aic)}
+
+
+def train_lstm(values, model_dir, epochs=20, batch_size=32, sequence_length=7):
+    import pandas as pd
+    from crime_predictor import CrimePredictor
+    predictor = CrimePredictor(model_dir=model_dir)
+    predictor.sequence_length = sequence_length
+    X, y = predictor.prepare_lstm_data(pd.Series(values, dtype=float), sequence_length)
+    if len(X) == 0:
+        raise ValueError(f'LSTM training needs more than {sequence_length} days of data')
+    if not predictor.train_lstm(X.reshape(-1, sequence_length, 1), y, epochs=epochs, batch_size=batch_size):
+        raise RuntimeError('LSTM training failed')
+    return {'observations': len(values), 'sequences': int(len(X))}
+
+
+TRAINERS = {'arima': train_arima, 'lstm': train_lstm}
+
+
+class TrainingJob:
+    def __init__(self, model, values, params, dates=None):
+        self.id = str(uuid.uuid4())
+        self.model = model
+        self.values = values
+        self.dates = dates      # day of each value, kept here for the installer
+        self.params = params
+        self.status = 'queued'
+        self.submitted_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self.metrics = None
+        self.artifacts = None
+        self.installed = False
+        self.error = None
+        self.process = None
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'model': self.model,
+            'status': self.status,
+            'params': self.params,
+            'observations': len(self.values),
+            'submitted_at': self.submitted_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'metrics': self.metrics,
+            'artifacts': self.artifacts,
+            'installed': self.installed,
+            'error': self.error
+        }
+
+
+class TrainingService:
+    """
+    Queue of training jobs run in worker processes.
+
+    installers maps a model name to installer(job, paths), called in this
+    process before the artifacts are moved into model_dir; paths maps each
+    artifact file name to its staged path. If it raises, the job fails and
+    model_dir keeps the previous artifacts.
+    """
+
+    def __init__(self, model_dir='models', workers=1, installers=None, timeout=None, history=100):
+        self.model_dir = model_dir
+        self.installers = dict(installers or {})
+        self.timeout = timeout
+
+        self._jobs = OrderedDict()
+        self._history = history
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._running = True
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+
+        self._threads = [
+            threading.Thread(target=self._work, name=f'training-worker-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, model, values, dates=None, **params):
+        """Queue a fit of `model` on a daily crime-count series; returns the job id"""
+        if model not in TRAINERS:
+            raise ValueError(f"model must be one of {sorted(TRAINERS)}, got {model!r}")
+        unknown = set(params) - set(TRAINING_PARAMS[model])
+        if unknown:
+            raise ValueError(f"Unknown {model} parameters: {', '.join(sorted(unknown))}")
+        job = TrainingJob(model, [float(value) for value in values], {**TRAINING_PARAMS[model], **params},
+                          dates=list(dates) if dates is not None else None)
+        with self._cond:
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self._trim()
+            self._cond.notify()
+        return job.id
+
+    def status(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def jobs(self):
+        with self._cond:
+            return [job.to_dict() for job in reversed(self._jobs.values())]
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job; returns False if it is unknown,
+        already finished or past training and being installed
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED or job.status == 'installing':
+                return False
+            if job.status == 'queued':
+                self._pending.remove(job)
+            elif job.process is not None:
+                job.process.terminate()
+            job.status = 'cancelled'
+            job.finished_at = datetime.utcnow()
+            self.cancelled += 1
+            return True
+
+    def _trim(self):
+        """Forget the oldest finished jobs beyond the history size; caller holds the lock"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(len(self._jobs) - self._history, 0)]:
+            del self._jobs[job_id]
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                job = self._pending.popleft()
+                job.status = 'running'
+                job.started_at = datetime.utcnow()
+            try:
+                self._run(job)
+            except Exception as e:
+                logger.error(f"Training job {job.id} ({job.model}) failed: {e}")
+                with self._cond:
+                    if job.status in ('running', 'installing'):
+                        job.status = 'failed'
+                        job.error = str(e)
+                        job.finished_at = datetime.utcnow()
+                        self.failed += 1
+
+    def _run(self, job):
+        job_dir = os.path.abspath(os.path.join(self.model_dir, 'jobs', job.id))
+        os.makedirs(job_dir, exist_ok=True)
+        try:
+            with open(os.path.join(job_dir, 'job.json'), 'w') as f:
+                json.dump({'model': job.model, 'values': job.values, 'params': job.params}, f)
+
+            with self._cond:
+                if job.status != 'running':
+                    return
+                job.process = subprocess.Popen(
+                    [sys.executable, '-m', 'model_training', job_dir],
+                    cwd=os.path.dirname(os.path.abspath(__file__)),
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE
+                )
+            start = time.perf_counter()
+            try:
+                _, stderr = job.process.communicate(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                job.process.kill()
+                job.process.communicate()
+                raise RuntimeError(f'Training timed out after {self.timeout}s')
+            duration = time.perf_counter() - start
+
+            with self._cond:
+                if job.status != 'running':
+                    return   # cancelled while the worker ran
+                # Past this point the job can no longer be cancelled
+                job.status = 'installing'
+            result_path = os.path.join(job_dir, 'result.json')
+            if job.process.returncode != 0 or not os.path.exists(result_path):
+                lines = stderr.decode(errors='replace').strip().splitlines()
+                raise RuntimeError(lines[-1] if lines else f'Worker exited with code {job.process.returncode}')
+            with open(result_path) as f:
+                result = json.load(f)
+
+            installed = False
+            installer = self.installers.get(job.model)
+            if installer is not None:
+                installer(job, {name: os.path.join(job_dir, name) for name in ARTIFACTS[job.model]})
+                installed = True
+
+            # Move the artifacts into place one atomic rename at a time
+            os.makedirs(self.model_dir, exist_ok=True)
+            paths = {}
+            for name in ARTIFACTS[job.model]:
+                paths[name] = os.path.join(self.model_dir, name)
+                os.replace(os.path.join(job_dir, name), paths[name])
+            with self._cond:
+                job.metrics = {**result['metrics'], 'seconds': round(duration, 3)}
+                job.artifacts = sorted(paths.values())
+                job.installed = installed
+                job.status = 'succeeded'
+                job.finished_at = datetime.utcnow()
+                self.completed += 1
+            logger.info(f"Training job {job.id} ({job.model}) finished in {duration:.1f}s")
+        finally:
+            job.process = None
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            for job in self._jobs.values():
+                if job.process is not None:
+                    job.process.terminate()
+            self._cond.notify_all()
+
+    def get_stats(self):
+        with self._cond:
+            by_status = {}
+            for job in self._jobs.values():
+                by_status[job.status] = by_status.get(job.status, 0) + 1
+            return {
+                'workers': len(self._threads),
+                'queued': len(self._pending),
+                'jobs': by_status,
+                'completed': self.completed,
+                'failed': self.failed,
+                'cancelled': self.cancelled
+            }
+
+
+def main():
+    """Worker process entry point: train the job described in <job dir>/job.json"""
+    job_dir = sys.argv[1]
+    with open(os.path.join(job_dir, 'job.json')) as f:
+        job = json.load(f)
+    metrics = TRAINERS[job['model']](job['values'], job_dir, **job['params'])
+    with open(os.path.join(job_dir, 'result.json'), 'w') as f:
+        json.dump({'metrics': metrics}, f)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+import requests as http_requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OSRM_URL = 'http://router.project-osrm.org'
+
+
+class RouteCache:
+    """
+    LRU + TTL cache of OSRM route geometries.
+
+    Keys are the start/end coordinates rounded to `precision` decimal places
+    (4 is ~11m), the travel mode and the snapping radius, so nearby repeat
+    requests share an entry. OSRMClient queries the rounded coordinates
+    too, so an entry holds the answer for its key rather than for whichever
+    nearby request filled it first. Only OSRM responses are cached; danger scoring
+    still runs against current crime data on every request. With a path the
+    cache is loaded on start-up and written back every persist_every new
+    entries and at exit.
+    """
+
+    def __init__(self, max_entries=1000, ttl=3600.0, precision=4, path=None, persist_every=20):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.precision = precision
+        self.path = path
+        self.persist_every = persist_every
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._unsaved = 0
+        self.hits = 0
+        self.misses = 0
+
+        if self.path:
+            self.load()
+            atexit.register(self.save)
+
+    def snap(self, lat, lng):
+        """Coordinates rounded to the cache precision"""
+        return round(lat, self.precision), round(lng, self.precision)
+
+    def key(self, mode, start_lat, start_lng, end_lat, end_lng, radius):
+        start_lat, start_lng = self.snap(start_lat, start_lng)
+        end_lat, end_lng = self.snap(end_lat, end_lng)
+        return f"{mode}|{start_lat},{start_lng}|{end_lat},{end_lng}|{radius}"
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, routes):
+        with self._lock:
+            self._entries[key] = (time.time(), routes)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._unsaved += 1
+            persist = self.path and self._unsaved >= self.persist_every
+        if persist:
+            self.save()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load route cache from {self.path}: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            for key, created, routes in stored:
+                if now - created <= self.ttl:
+                    self._entries[key] = (created, routes)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.info(f"Loaded {len(self._entries)} cached routes from {self.path}")
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            stored = [[key, created, routes] for key, (created, routes) in self._entries.items()]
+            self._unsaved = 0
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save route cache to {self.path}: {e}")
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'ttl_seconds': self.ttl,
+                'precision': self.precision,
+                'persisted': bool(self.path)
+            }
+
+
+class OSRMClient:
+    """
+    OSRM HTTP client with a pooled session and parallel alternative queries.
+
+    Each call has its own timeout (call_timeout) and a fan-out as a whole
+    gives up after total_budget seconds, returning whatever routes arrived
+    in time. An optional RouteCache short-circuits repeat queries.
+    """
+
+    def __init__(self, base_url=DEFAULT_OSRM_URL, call_timeout=10.0, total_budget=12.0,
+                 pool_size=10, max_workers=6, cache=None):
+        self.base_url = base_url.rstrip('/')
+        self.call_timeout = call_timeout
+        self.total_budget = total_budget
+        self.cache = cache
+
+        self.session = http_requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = 'CrimeScope/1.0'
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='osrm')
+
+    def route(self, mode, start_lat, start_lng, end_lat, end_lng, radius, alternatives=2, timeout=None):
+        """Fetch routes for one snapping radius (meters); raises RequestException/ValueError"""
+        if self.cache is not None:
+            # Route between the points the cache key stands for
+            start_lat, start_lng = self.cache.snap(start_lat, start_lng)
+            end_lat, end_lng = self.cache.snap(end_lat, end_lng)
+        # Built by hand: OSRM expects literal ';' separators in radiuses
+        url = (f"{self.base_url}/route/v1/{mode}/{start_lng},{start_lat};{end_lng},{end_lat}"
+               f"?overview=full&geometries=geojson&radiuses={radius};{radius}&alternatives={alternatives}")
+        response = self.session.get(url, timeout=timeout or self.call_timeout)
+        response.raise_for_status()
+        payload = response.json()
+        if not isinstance(payload, dict):
+            raise ValueError(f"Unexpected OSRM response of type {type(payload).__name__}")
+        routes = payload.get('routes', [])
+        if not isinstance(routes, list):
+            raise ValueError(f"Unexpected OSRM routes of type {type(routes).__name__}")
+
+        if self.cache is not None:
+            self.cache.put(self.cache.key(mode, start_lat, start_lng, end_lat, end_lng, radius), routes)
+        return routes
+
+    def route_alternatives(self, mode, start_lat, start_lng, end_lat, end_lng,
+                           radiuses=(5000, 10000, 20000), alternatives=2, budget=None):
+        """
+        Query every radius in parallel.
+
+        Returns (routes, errors): routes is a list of (radius, route) pairs in
+        radius order from the calls that finished within the budget, errors
+        maps each failed or timed-out radius to its exception.
+        """
+        budget = self.total_budget if budget is None else budget
+        deadline = time.monotonic() + budget
+
+        # Serve cached radiuses directly and only send the rest to OSRM
+        results = {}
+        futures = {}
+        for radius in radiuses:
+            if self.cache is not None:
+                cached = self.cache.get(self.cache.key(mode, start_lat, start_lng, end_lat, end_lng, radius))
+                if cached is not None:
+                    results[radius] = cached
+                    continue
+            future = self.executor.submit(
+                self.route, mode, start_lat, start_lng, end_lat, end_lng, radius, alternatives,
+                min(self.call_timeout, budget)
+            )
+            futures[future] = radius
+
+        done, pending = wait(futures, timeout=max(deadline - time.monotonic(), 0)) if futures else ((), ())
+
+        errors = {}
+        for future in done:
+            radius = futures[future]
+            try:
+                results[radius] = future.result()
+            except (http_requests.RequestException, ValueError) as e:
+                errors[radius] = e
+        for future in pending:
+            future.cancel()
+            errors[futures[future]] = TimeoutError(f"OSRM call exceeded {budget}s request budget")
+
+        for radius, error in errors.items():
+            logger.warning(f"Failed to get route with radius {radius}m: {error}")
+
+        routes = [(radius, route) for radius in radiuses for route in results.get(radius, [])]
+        return routes, errors
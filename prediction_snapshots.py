@@ -0,0 +1,226 @@
+"""
+Precomputed predictions served as versioned snapshots.
+
+A PredictionScheduler recomputes every forecast on a cadence, or sooner
+once enough crimes have changed, and publishes the results to a
+SnapshotStore. Request handlers then only look entries up. Each snapshot
+gets the next version number; each entry carries an ETag derived from its
+content, so clients keep a valid cache across versions whose forecast for
+them did not change. The latest snapshot is also written to a JSON file
+and read back at start-up, so a restarted server has predictions to serve
+before its first recompute finishes.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import jsonify, request
+
+logger = logging.getLogger(__name__)
+
+
+def content_etag(data):
+    """Short stable hash of a JSON-serializable value"""
+    encoded = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(encoded.encode()).hexdigest()[:16]
+
+
+def snapshot_response(payload, etag):
+    """JSON response with an ETag; answers 304 when the client already has it"""
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+class SnapshotStore:
+    """Latest snapshot of precomputed entries, kept in memory and optionally in a file"""
+
+    def __init__(self, path=None, history=20):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._etags = {}
+        self.version = 0
+        self.generated_at = None
+        self.history = deque(maxlen=history)
+
+    def publish(self, entries, reason='scheduled', duration=None):
+        """Replace the entries with a new version; returns the version number"""
+        etags = {key: content_etag(value) for key, value in entries.items()}
+        with self._lock:
+            changed = sum(1 for key, etag in etags.items() if self._etags.get(key) != etag)
+            self.version += 1
+            self.generated_at = datetime.utcnow()
+            self._entries = entries
+            self._etags = etags
+            self.history.append({
+                'version': self.version,
+                'generated_at': self.generated_at.isoformat(),
+                'reason': reason,
+                'entries': len(entries),
+                'changed_entries': changed,
+                'seconds': round(duration, 3) if duration is not None else None
+            })
+            version = self.version
+        if self.path:
+            try:
+                self._save()
+            except Exception as e:
+                logger.error(f"Error saving prediction snapshot to {self.path}: {e}")
+        return version
+
+    def get(self, key, generated_after=None):
+        """
+        (entry, etag, version, generated_at) for a key, or None if it is
+        missing or the snapshot was generated before generated_after
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            if generated_after is not None and self.generated_at < generated_after:
+                return None
+            return self._entries[key], self._etags[key], self.version, self.generated_at
+
+    def _save(self):
+        with self._lock:
+            snapshot = {
+                'version': self.version,
+                'generated_at': self.generated_at.isoformat(),
+                'entries': self._entries
+            }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f, default=str)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """Restore the snapshot saved by a previous run; returns True if one was loaded"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path) as f:
+                snapshot = json.load(f)
+            entries = snapshot['entries']
+            with self._lock:
+                self._entries = entries
+                self._etags = {key: content_etag(value) for key, value in entries.items()}
+                self.version = int(snapshot['version'])
+                self.generated_at = datetime.fromisoformat(snapshot['generated_at'])
+            logger.info(f"Loaded prediction snapshot v{self.version} from {self.path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error loading prediction snapshot from {self.path}: {e}")
+            return False
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'version': self.version,
+                'generated_at': self.generated_at.isoformat() if self.generated_at else None,
+                'entries': len(self._entries),
+                'history': list(self.history)
+            }
+
+
+class PredictionScheduler:
+    """
+    Runs compute() every `interval` seconds, or once min_changes crimes have
+    changed since the last run, and publishes its {key: entry} result.
+
+    note_change() has the CrimeStore subscriber signature. Changes that
+    arrive while a run is in progress count towards the next one.
+    """
+
+    def __init__(self, compute, store, interval=300.0, min_changes=50):
+        self.compute = compute
+        self.store = store
+        self.interval = interval
+        self.min_changes = min_changes
+
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._forced = False
+        self._running = True
+        self._last_run = None
+        self.runs = 0
+        self.failures = 0
+        self.last_error = None
+        self._thread = threading.Thread(target=self._run, name='prediction-scheduler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def note_change(self, change_type=None, crime_id=None, crime=None, old=None):
+        with self._cond:
+            self._pending += 1
+            if self._pending >= self.min_changes:
+                self._cond.notify()
+
+    def refresh_now(self):
+        with self._cond:
+            self._forced = True
+            self._cond.notify()
+
+    def _next_reason(self):
+        """Why a run is due now, or None; caller holds the condition"""
+        if self._last_run is None:
+            return 'startup'
+        if self._forced:
+            return 'requested'
+        if self._pending >= self.min_changes:
+            return f'{self._pending} new crimes'
+        if time.monotonic() - self._last_run >= self.interval:
+            return 'scheduled'
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and self._next_reason() is None:
+                    self._cond.wait(max(self.interval - (time.monotonic() - self._last_run), 0.01))
+                if not self._running:
+                    return
+                reason = self._next_reason()
+                self._pending = 0
+                self._forced = False
+                self._last_run = time.monotonic()
+
+            start = time.perf_counter()
+            try:
+                entries = self.compute()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                logger.error(f"Error precomputing predictions: {e}", exc_info=True)
+                continue
+            duration = time.perf_counter() - start
+            version = self.store.publish(entries, reason=reason, duration=duration)
+            self.runs += 1
+            logger.info(f"Published prediction snapshot v{version} ({reason}, {len(entries)} entries, {duration:.2f}s)")
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                'runs': self.runs,
+                'failures': self.failures,
+                'last_error': self.last_error,
+                'pending_changes': self._pending,
+                'min_changes': self.min_changes,
+                'interval_seconds': self.interval,
+                'snapshot': self.store.get_stats()
+            }
@@ -0,0 +1,90 @@
+"""
+Predictors that are imported the first time they are used.
+
+The forecasting backends pull in pandas, statsmodels or TensorFlow, which
+take far longer to import than the rest of the web tier. A registry entry
+names a 'module:attribute' factory; get() imports the module and builds the
+instance on first use, so a server that never predicts never pays for the
+import. preload() is the hook for doing it ahead of time, e.g. in a
+background thread at start-up or before forking workers.
+"""
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PredictorRegistry:
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._load_seconds = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, factory, *args, **kwargs):
+        """
+        Register a predictor built by `factory` ('module:attribute' or a
+        callable) with the given arguments
+        """
+        self._factories[name] = (factory, args, kwargs)
+
+    def get(self, name):
+        """The predictor, importing and building it on first use"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self._factories:
+            raise KeyError(f"Unknown predictor {name!r}")
+        with self._lock:
+            if name not in self._instances:
+                factory, args, kwargs = self._factories[name]
+                start = time.perf_counter()
+                try:
+                    if isinstance(factory, str):
+                        module_name, _, attribute = factory.partition(':')
+                        factory = getattr(importlib.import_module(module_name), attribute)
+                    self._instances[name] = factory(*args, **kwargs)
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._load_seconds[name] = time.perf_counter() - start
+                self._errors.pop(name, None)
+                logger.info(f"Loaded predictor {name} in {self._load_seconds[name]:.2f}s")
+            return self._instances[name]
+
+    def loaded(self, name):
+        return name in self._instances
+
+    def preload(self, names=None, background=False):
+        """Load the given predictors (default: all) now, or in a daemon thread"""
+        names = list(self._factories if names is None else names)
+
+        def load():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logger.error(f"Error preloading predictor {name}: {e}")
+
+        if not background:
+            load()
+            return None
+        thread = threading.Thread(target=load, name='predictor-preload', daemon=True)
+        thread.start()
+        return thread
+
+    def get_stats(self):
+        stats = {}
+        for name in self._factories:
+            instance = self._instances.get(name)
+            stats[name] = {
+                'loaded': instance is not None,
+                'load_seconds': round(self._load_seconds[name], 3) if name in self._load_seconds else None,
+                'error': self._errors.get(name)
+            }
+            if instance is not None and hasattr(instance, 'get_stats'):
+                stats[name]['stats'] = instance.get_stats()
+        return stats
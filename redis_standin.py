@@ -0,0 +1,194 @@
+"""
+Minimal Redis-compatible pub/sub server for local runs and tests.
+
+Speaks enough of the Redis protocol (RESP2, and RESP3 after HELLO 3) for the
+Socket.IO message queue: HELLO, PING, ECHO, SELECT, CLIENT, INFO, PUBLISH,
+SUBSCRIBE, UNSUBSCRIBE and QUIT.
+Nothing is stored. Run it and point SOCKETIO_MESSAGE_QUEUE at it:
+
+    python redis_standin.py --port 6379
+    SOCKETIO_MESSAGE_QUEUE=redis://127.0.0.1:6379/0
+"""
+import argparse
+import socketserver
+import threading
+
+
+class Push(list):
+    """Out-of-band pub/sub message, a push frame under RESP3"""
+
+
+def encode(value, protocol=2):
+    """RESP encoding of a reply"""
+    if value is None:
+        return b'_\r\n' if protocol == 3 else b'$-1\r\n'
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, bytes):
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+    if isinstance(value, str):
+        return b'+' + value.encode() + b'\r\n'
+    if isinstance(value, Exception):
+        return b'-ERR ' + str(value).encode() + b'\r\n'
+    if isinstance(value, dict):
+        if protocol == 3:
+            return b'%%%d\r\n' % len(value) + b''.join(
+                encode(k, protocol) + encode(v, protocol) for k, v in value.items()
+            )
+        value = [item for pair in value.items() for item in pair]
+    prefix = b'>' if isinstance(value, Push) and protocol == 3 else b'*'
+    return prefix + b'%d\r\n' % len(value) + b''.join(encode(item, protocol) for item in value)
+
+
+class PubSubBroker:
+    """Channel subscriptions shared by every connection"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}   # channel -> set of handlers
+
+    def subscribe(self, channel, handler):
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(handler)
+
+    def unsubscribe(self, channel, handler):
+        with self._lock:
+            handlers = self._channels.get(channel)
+            if handlers:
+                handlers.discard(handler)
+                if not handlers:
+                    del self._channels[channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            handlers = list(self._channels.get(channel, ()))
+        delivered = 0
+        for handler in handlers:
+            if handler.send(Push([b'message', channel, message])):
+                delivered += 1
+        return delivered
+
+
+class RedisHandler(socketserver.StreamRequestHandler):
+
+    def setup(self):
+        super().setup()
+        self.write_lock = threading.Lock()
+        self.channels = set()
+        self.protocol = 2
+
+    def send(self, reply):
+        try:
+            with self.write_lock:
+                self.wfile.write(encode(reply, self.protocol))
+                self.wfile.flush()
+            return True
+        except OSError:
+            return False
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.split()  # inline command, e.g. from telnet
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        broker = self.server.broker
+        try:
+            while True:
+                args = self.read_command()
+                if args is None:
+                    break
+                if not args:
+                    continue
+                command, params = args[0].upper(), args[1:]
+
+                if command == b'HELLO':
+                    if params and params[0] not in (b'2', b'3'):
+                        self.send(ValueError('NOPROTO unsupported protocol version'))
+                        continue
+                    if params:
+                        self.protocol = int(params[0])
+                    self.send({
+                        b'server': b'redis', b'version': b'7.0.0', b'proto': self.protocol,
+                        b'id': id(self) % 100000, b'mode': b'standalone', b'role': b'master', b'modules': []
+                    })
+                elif command == b'PING':
+                    if self.channels:
+                        self.send(Push([b'pong', params[0] if params else b'']))
+                    else:
+                        self.send(params[0] if params else 'PONG')
+                elif command == b'ECHO':
+                    self.send(params[0])
+                elif command in (b'SELECT', b'CLIENT'):
+                    self.send('OK')
+                elif command == b'INFO':
+                    self.send(b'# Server\r\nredis_version:7.0.0\r\nredis_mode:standalone\r\n')
+                elif command == b'PUBLISH':
+                    self.send(broker.publish(params[0], params[1]))
+                elif command == b'SUBSCRIBE':
+                    for channel in params:
+                        self.channels.add(channel)
+                        broker.subscribe(channel, self)
+                        self.send(Push([b'subscribe', channel, len(self.channels)]))
+                elif command == b'UNSUBSCRIBE':
+                    for channel in params or list(self.channels):
+                        self.channels.discard(channel)
+                        broker.unsubscribe(channel, self)
+                        self.send(Push([b'unsubscribe', channel, len(self.channels)]))
+                elif command == b'QUIT':
+                    self.send('OK')
+                    break
+                else:
+                    self.send(ValueError(f"unknown command '{command.decode(errors='replace')}'"))
+        except (OSError, ValueError):
+            pass
+        finally:
+            for channel in self.channels:
+                broker.unsubscribe(channel, self)
+
+
+class RedisStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=6379):
+        super().__init__((host, port), RedisHandler)
+        self.broker = PubSubBroker()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        """Serve from a background thread, handy in tests"""
+        thread = threading.Thread(target=self.serve_forever, name='redis-standin', daemon=True)
+        thread.start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a Redis-compatible pub/sub stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6379)
+    args = parser.parse_args()
+
+    server = RedisStandIn(args.host, args.port)
+    print(f"Redis stand-in listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,463 @@
+"""
+Storage behind the crime and alert handlers.
+
+CrimeRepository and AlertRepository are what app.py reads and writes
+through. Each sits on a Storage backend:
+
+- FirestoreStorage: the production Firestore collections
+- SqliteStorage: a local SQLite file (or ':memory:') with an R*Tree index on
+  coordinates, for running and load testing offline or as a read replica
+  kept next to a web node
+
+Documents are plain dicts keyed by string ids in both backends. Writes may
+use SERVER_TIMESTAMP for a field; it becomes the commit time.
+"""
+import calendar
+import json
+import logging
+import math
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+import geohash_index
+from crime_store import to_utc_naive
+from geo_math import ARC_KM_PER_DEGREE
+
+logger = logging.getLogger(__name__)
+
+
+class _ServerTimestamp:
+    def __repr__(self):
+        return 'SERVER_TIMESTAMP'
+
+
+# Backend-neutral stand-in for firestore.SERVER_TIMESTAMP
+SERVER_TIMESTAMP = _ServerTimestamp()
+
+
+class Collection(ABC):
+    """
+    One collection of documents in a storage backend.
+
+    watch() calls callback(changes) with lists of (change_type, doc_id, data)
+    tuples, change_type being 'ADDED', 'MODIFIED' or 'REMOVED' (data None),
+    and returns a handle with unsubscribe().
+    """
+
+    @abstractmethod
+    def new_id(self):
+        pass
+
+    @abstractmethod
+    def get(self, doc_id):
+        pass
+
+    @abstractmethod
+    def all(self):
+        """(doc_id, data) for every document"""
+
+    @abstractmethod
+    def since(self, start):
+        """(doc_id, data) for documents whose time field is after start"""
+
+    @abstractmethod
+    def set(self, doc_id, data):
+        pass
+
+    @abstractmethod
+    def update(self, doc_id, fields):
+        pass
+
+    @abstractmethod
+    def delete(self, doc_id):
+        pass
+
+    @abstractmethod
+    def nearby(self, lat, lng, radius_km):
+        """(doc_id, data) candidates around a point; callers filter by exact distance"""
+
+    @abstractmethod
+    def watch(self, callback):
+        pass
+
+
+class FirestoreCollection(Collection):
+
+    def __init__(self, db, name, time_field):
+        self.db = db
+        self.name = name
+        self.time_field = time_field
+
+    @property
+    def ref(self):
+        return self.db.collection(self.name)
+
+    @staticmethod
+    def to_firestore(data):
+        from google.cloud import firestore
+        return {key: firestore.SERVER_TIMESTAMP if value is SERVER_TIMESTAMP else value
+                for key, value in data.items()}
+
+    def new_id(self):
+        return self.ref.document().id
+
+    def get(self, doc_id):
+        doc = self.ref.document(doc_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    def all(self):
+        for doc in self.ref.stream():
+            yield doc.id, doc.to_dict() or {}
+
+    def since(self, start):
+        for doc in self.ref.where(self.time_field, '>', start).stream():
+            yield doc.id, doc.to_dict() or {}
+
+    def set(self, doc_id, data):
+        self.ref.document(doc_id).set(self.to_firestore(data))
+
+    def update(self, doc_id, fields):
+        self.ref.document(doc_id).update(self.to_firestore(fields))
+
+    def delete(self, doc_id):
+        self.ref.document(doc_id).delete()
+
+    def nearby(self, lat, lng, radius_km):
+        for doc in geohash_index.query_nearby(self.ref, lat, lng, radius_km):
+            yield doc.id, doc.to_dict() or {}
+
+    def watch(self, callback):
+        def on_snapshot(col_snapshot, changes, read_time):
+            callback([
+                (change.type.name, change.document.id,
+                 None if change.type.name == 'REMOVED' else change.document.to_dict() or {})
+                for change in changes
+            ])
+        return self.ref.on_snapshot(on_snapshot)
+
+
+class FirestoreBatch:
+    """Up to 500 writes committed atomically"""
+
+    def __init__(self, db):
+        self._batch = db.batch()
+
+    def set(self, collection, doc_id, data):
+        self._batch.set(collection.ref.document(doc_id), collection.to_firestore(data))
+
+    def commit(self):
+        self._batch.commit()
+
+
+class FirestoreStorage:
+    name = 'firestore'
+
+    def __init__(self, db):
+        self.db = db
+
+    def collection(self, name, time_field):
+        return FirestoreCollection(self.db, name, time_field)
+
+    def batch(self):
+        return FirestoreBatch(self.db)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'$datetime': value.isoformat()}
+    if hasattr(value, 'latitude') and hasattr(value, 'longitude'):
+        # GeoPoint and similar
+        return {'latitude': value.latitude, 'longitude': value.longitude}
+    return str(value)
+
+
+def _decode_object(obj):
+    if len(obj) == 1 and '$datetime' in obj:
+        return datetime.fromisoformat(obj['$datetime'])
+    return obj
+
+
+def _epoch(value):
+    value = to_utc_naive(value)
+    return calendar.timegm(value.timetuple()) + value.microsecond / 1e6 if value is not None else None
+
+
+def _coordinates(data):
+    try:
+        lat, lng = float(data['latitude']), float(data['longitude'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if math.isnan(lat) or math.isnan(lng):
+        return None
+    return lat, lng
+
+
+class SqliteCollection(Collection):
+    """
+    A table of JSON documents plus an R*Tree over their coordinates.
+
+    Changes are pushed to watch() callbacks of this process only; other
+    processes sharing the file see them through since() polling.
+    """
+
+    def __init__(self, storage, name, time_field):
+        self.storage = storage
+        self.name = name
+        self.time_field = time_field
+        self._watchers = []
+        with storage.lock:
+            storage.conn.executescript(f"""
+                CREATE TABLE IF NOT EXISTS "{name}" (
+                    rid INTEGER PRIMARY KEY,
+                    id TEXT NOT NULL UNIQUE,
+                    data TEXT NOT NULL,
+                    ts REAL
+                );
+                CREATE INDEX IF NOT EXISTS "{name}_ts" ON "{name}" (ts);
+                CREATE VIRTUAL TABLE IF NOT EXISTS "{name}_rtree" USING rtree(rid, min_lat, max_lat, min_lng, max_lng);
+            """)
+
+    def new_id(self):
+        return uuid.uuid4().hex[:20]
+
+    @staticmethod
+    def _load(text):
+        return json.loads(text, object_hook=_decode_object)
+
+    def get(self, doc_id):
+        with self.storage.lock:
+            row = self.storage.conn.execute(f'SELECT data FROM "{self.name}" WHERE id = ?', (doc_id,)).fetchone()
+        return self._load(row[0]) if row else None
+
+    def _rows(self, sql, params=()):
+        with self.storage.lock:
+            rows = self.storage.conn.execute(sql, params).fetchall()
+        return [(doc_id, self._load(data)) for doc_id, data in rows]
+
+    def all(self):
+        return self._rows(f'SELECT id, data FROM "{self.name}"')
+
+    def since(self, start):
+        return self._rows(f'SELECT id, data FROM "{self.name}" WHERE ts > ? ORDER BY ts', (_epoch(start),))
+
+    def _write(self, doc_id, data, now):
+        """Upsert one document; caller holds the lock. Returns (change_type, stored data)"""
+        data = {key: now if value is SERVER_TIMESTAMP else value for key, value in data.items()}
+        conn = self.storage.conn
+        existing = conn.execute(f'SELECT rid FROM "{self.name}" WHERE id = ?', (doc_id,)).fetchone()
+        encoded = json.dumps(data, default=_encode_value)
+        ts = _epoch(data.get(self.time_field))
+        if existing:
+            rid = existing[0]
+            conn.execute(f'UPDATE "{self.name}" SET data = ?, ts = ? WHERE rid = ?', (encoded, ts, rid))
+        else:
+            rid = conn.execute(f'INSERT INTO "{self.name}" (id, data, ts) VALUES (?, ?, ?)',
+                               (doc_id, encoded, ts)).lastrowid
+        point = _coordinates(data)
+        if point is None:
+            conn.execute(f'DELETE FROM "{self.name}_rtree" WHERE rid = ?', (rid,))
+        else:
+            lat, lng = point
+            conn.execute(f'INSERT OR REPLACE INTO "{self.name}_rtree" VALUES (?, ?, ?, ?, ?)',
+                         (rid, lat, lat, lng, lng))
+        return ('MODIFIED' if existing else 'ADDED'), data
+
+    def set(self, doc_id, data):
+        with self.storage.transaction():
+            change = self._write(doc_id, data, datetime.utcnow())
+        self._notify([(change[0], doc_id, change[1])])
+
+    def update(self, doc_id, fields):
+        with self.storage.transaction():
+            current = self.get(doc_id)
+            if current is None:
+                raise KeyError(f"No document {doc_id} in {self.name}")
+            change = self._write(doc_id, {**current, **fields}, datetime.utcnow())
+        self._notify([(change[0], doc_id, change[1])])
+
+    def delete(self, doc_id):
+        with self.storage.transaction():
+            conn = self.storage.conn
+            row = conn.execute(f'SELECT rid FROM "{self.name}" WHERE id = ?', (doc_id,)).fetchone()
+            if row is None:
+                return
+            conn.execute(f'DELETE FROM "{self.name}_rtree" WHERE rid = ?', (row[0],))
+            conn.execute(f'DELETE FROM "{self.name}" WHERE rid = ?', (row[0],))
+        self._notify([('REMOVED', doc_id, None)])
+
+    def nearby(self, lat, lng, radius_km):
+        dlat = radius_km / ARC_KM_PER_DEGREE
+        dlng = radius_km / (ARC_KM_PER_DEGREE * max(math.cos(math.radians(min(abs(lat), 89.0))), 1e-6))
+        return self._rows(
+            f'SELECT d.id, d.data FROM "{self.name}_rtree" r JOIN "{self.name}" d ON d.rid = r.rid '
+            f'WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lng >= ? AND r.min_lng <= ?',
+            (lat - dlat, lat + dlat, lng - dlng, lng + dlng)
+        )
+
+    def watch(self, callback):
+        self._watchers.append(callback)
+        collection = self
+
+        class Handle:
+            def unsubscribe(self):
+                if callback in collection._watchers:
+                    collection._watchers.remove(callback)
+        return Handle()
+
+    def _notify(self, changes):
+        for callback in list(self._watchers):
+            try:
+                callback(changes)
+            except Exception as e:
+                logger.error(f"{self.name} watcher failed: {e}", exc_info=True)
+
+
+class SqliteBatch:
+    """Writes applied in one SQLite transaction"""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._writes = []
+
+    def set(self, collection, doc_id, data):
+        self._writes.append((collection, doc_id, data))
+
+    def commit(self):
+        now = datetime.utcnow()
+        changes = []
+        with self.storage.transaction():
+            for collection, doc_id, data in self._writes:
+                change_type, stored = collection._write(doc_id, data, now)
+                changes.append((collection, (change_type, doc_id, stored)))
+        for collection, change in changes:
+            collection._notify([change])
+
+
+class SqliteStorage:
+    """
+    SQLite database shared by the collections opened on it.
+
+    One connection serves every thread, serialized by a lock; file databases
+    use WAL so other processes can read while this one writes.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ':memory:':
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._collections = {}
+
+    def collection(self, name, time_field):
+        with self.lock:
+            if name not in self._collections:
+                self._collections[name] = SqliteCollection(self, name, time_field)
+            return self._collections[name]
+
+    def batch(self):
+        return SqliteBatch(self)
+
+    def transaction(self):
+        return _Transaction(self)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class _Transaction:
+    """Lock plus BEGIN/COMMIT, nesting into an outer transaction"""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.outer = False
+
+    def __enter__(self):
+        self.storage.lock.acquire()
+        self.outer = not self.storage.conn.in_transaction
+        if self.outer:
+            self.storage.conn.execute('BEGIN')
+        return self.storage.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.outer:
+                self.storage.conn.execute('COMMIT' if exc_type is None else 'ROLLBACK')
+        finally:
+            self.storage.lock.release()
+        return False
+
+
+class DocumentRepository:
+    """Collection of one document type on a storage backend"""
+
+    collection_name = None
+    time_field = None
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.collection = storage.collection(self.collection_name, self.time_field)
+
+    def new_id(self):
+        return self.collection.new_id()
+
+    def get(self, doc_id):
+        return self.collection.get(doc_id)
+
+    def all(self):
+        return self.collection.all()
+
+    def since(self, start):
+        return self.collection.since(start)
+
+    def save(self, doc_id, data):
+        """Create or replace a document"""
+        self.collection.set(doc_id, data)
+
+    def add(self, data):
+        """Create a document under a new id and return the id"""
+        doc_id = self.new_id()
+        self.collection.set(doc_id, data)
+        return doc_id
+
+    def update(self, doc_id, fields):
+        self.collection.update(doc_id, fields)
+
+    def delete(self, doc_id):
+        self.collection.delete(doc_id)
+
+    def nearby(self, lat, lng, radius_km):
+        return self.collection.nearby(lat, lng, radius_km)
+
+    def watch(self, callback):
+        return self.collection.watch(callback)
+
+    def mirror(self, change_type, doc_id, data, old=None):
+        """CrimeStore subscriber that copies every change into this repository, e.g. a local replica"""
+        if change_type == 'REMOVED':
+            self.collection.delete(doc_id)
+        else:
+            self.collection.set(doc_id, data)
+
+
+class CrimeRepository(DocumentRepository):
+    collection_name = 'crimes'
+    time_field = 'timestamp'
+
+
+class AlertRepository(DocumentRepository):
+    collection_name = 'alerts'
+    time_field = 'created_at'
+
+    def active_near(self, lat, lng, radius_km):
+        """(alert_id, alert) candidates around a point that are still active"""
+        for alert_id, alert in self.nearby(lat, lng, radius_km):
+            if alert.get('status') == 'active':
+                yield alert_id, alert
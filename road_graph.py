@@ -0,0 +1,248 @@
+import argparse
+import heapq
+import json
+import math
+import numpy as np
+from geo_math import haversine_km, haversine_m, points_to_segments_dist
+from route_scoring import crime_penalties, KM_PER_DEGREE
+from spatial_index import SpatialIndex
+
+# Average speeds used to estimate durations on the local graph
+MODE_SPEEDS_KMH = {
+    'driving': 40.0,
+    'cycling': 15.0,
+    'walking': 5.0
+}
+
+# OSM highway values that are never routable
+EXCLUDED_HIGHWAYS = {'proposed', 'construction', 'abandoned', 'platform', 'raceway', 'bus_stop'}
+FOOT_ONLY_HIGHWAYS = {'footway', 'pedestrian', 'steps', 'path', 'corridor'}
+
+
+class RoadGraph:
+    """
+    Directed road graph in compressed sparse row (CSR) form.
+
+    Edges leaving node u are indices[indptr[u]:indptr[u+1]] with lengths in
+    meters at the same positions. Graphs are stored as .npz files and can be
+    built from an Overpass API JSON export of OSM ways.
+    """
+
+    def __init__(self, node_lat, node_lng, indptr, indices, lengths):
+        self.node_lat = np.asarray(node_lat, dtype=float)
+        self.node_lng = np.asarray(node_lng, dtype=float)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.lengths = np.asarray(lengths, dtype=float)
+
+        # Source node of every edge, handy for per-edge geometry
+        self.sources = np.repeat(np.arange(len(self.node_lat)), np.diff(self.indptr))
+        self.node_index = SpatialIndex(self.node_lat, self.node_lng, cell_size=0.005)
+
+        # Plain lists are much faster than array indexing inside the search loop
+        self._indptr = self.indptr.tolist()
+        self._indices = self.indices.tolist()
+        self._lengths = self.lengths.tolist()
+        self._edge_index = None
+
+    @classmethod
+    def from_edges(cls, node_lat, node_lng, edges):
+        """Build a graph from (source, target) node pairs; lengths are great-circle meters"""
+        node_lat = np.asarray(node_lat, dtype=float)
+        node_lng = np.asarray(node_lng, dtype=float)
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        order = np.lexsort((edges[:, 1], edges[:, 0]))
+        edges = edges[order]
+
+        counts = np.bincount(edges[:, 0], minlength=len(node_lat))
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+        lengths = haversine_km(
+            node_lat[edges[:, 0]], node_lng[edges[:, 0]], node_lat[edges[:, 1]], node_lng[edges[:, 1]]
+        ) * 1000
+        return cls(node_lat, node_lng, indptr, edges[:, 1], lengths)
+
+    @classmethod
+    def from_overpass(cls, data, mode='driving'):
+        """Build a graph from Overpass JSON ('out body; >; out skel qt;' style)"""
+        coords = {}
+        ways = []
+        for element in data.get('elements', []):
+            if element.get('type') == 'node':
+                coords[element['id']] = (element['lat'], element['lon'])
+            elif element.get('type') == 'way' and 'highway' in element.get('tags', {}):
+                ways.append(element)
+
+        node_ids = {}
+        edges = []
+        for way in ways:
+            tags = way['tags']
+            highway = tags['highway']
+            if highway in EXCLUDED_HIGHWAYS:
+                continue
+            if mode != 'walking' and highway in FOOT_ONLY_HIGHWAYS:
+                continue
+            oneway = mode != 'walking' and tags.get('oneway') in ('yes', 'true', '1', '-1')
+            reverse = tags.get('oneway') == '-1'
+
+            nodes = [n for n in way.get('nodes', []) if n in coords]
+            for u, v in zip(nodes, nodes[1:]):
+                if u == v:
+                    continue
+                ui = node_ids.setdefault(u, len(node_ids))
+                vi = node_ids.setdefault(v, len(node_ids))
+                if not oneway or not reverse:
+                    edges.append((ui, vi))
+                if not oneway or reverse:
+                    edges.append((vi, ui))
+
+        node_lat = np.empty(len(node_ids))
+        node_lng = np.empty(len(node_ids))
+        for osm_id, index in node_ids.items():
+            node_lat[index], node_lng[index] = coords[osm_id]
+        return cls.from_edges(node_lat, node_lng, edges)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['node_lat'], data['node_lng'], data['indptr'], data['indices'], data['lengths'])
+
+    def save(self, path):
+        np.savez_compressed(
+            path, node_lat=self.node_lat, node_lng=self.node_lng,
+            indptr=self.indptr, indices=self.indices, lengths=self.lengths
+        )
+
+    @property
+    def num_nodes(self):
+        return len(self.node_lat)
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    def nearest_node(self, lat, lng, max_radius_km=None):
+        nodes, _ = self.node_index.query_nearest(lat, lng, k=1, max_radius_km=max_radius_km)
+        return int(nodes[0]) if len(nodes) else None
+
+    def edge_index(self):
+        """Spatial index over edge midpoints plus the largest half edge span in degrees"""
+        if self._edge_index is None:
+            a_lat, a_lng = self.node_lat[self.sources], self.node_lng[self.sources]
+            b_lat, b_lng = self.node_lat[self.indices], self.node_lng[self.indices]
+            half_span = 0.5 * max(
+                float(np.abs(b_lat - a_lat).max(initial=0)), float(np.abs(b_lng - a_lng).max(initial=0))
+            )
+            index = SpatialIndex((a_lat + b_lat) / 2, (a_lng + b_lng) / 2, cell_size=0.01)
+            self._edge_index = (index, half_span)
+        return self._edge_index
+
+    def edges_near(self, lat, lng, distance_km):
+        """Edges whose segment may lie within distance_km (planar degree metric) of a point"""
+        index, half_span = self.edge_index()
+        pad = distance_km / KM_PER_DEGREE + half_span
+        return index.query_box(lat - pad, lng - pad, lat + pad, lng + pad)
+
+    def crime_edge_costs(self, crime_points, reach_km, **kwargs):
+        """
+        Per-edge danger penalty sums and barrier counts from crime points.
+
+        Uses the same barrier and falloff rules as route scoring, applied to
+        every edge on its own. Returns (penalty_sum, barrier_count) arrays.
+        """
+        penalty_sum = np.zeros(self.num_edges)
+        barrier_count = np.zeros(self.num_edges, dtype=np.int64)
+        for lat, lng, _, radius in np.asarray(crime_points, dtype=float).reshape(-1, 4):
+            edges, penalty, barrier = self.crime_contribution(lat, lng, radius, reach_km, **kwargs)
+            penalty_sum[edges] += penalty
+            barrier_count[edges] += barrier
+        return penalty_sum, barrier_count
+
+    def crime_contribution(self, lat, lng, radius, reach_km, **kwargs):
+        """Edges affected by one crime with the penalty and barrier flag it adds to each"""
+        edges = self.edges_near(lat, lng, reach_km)
+        if edges.size == 0:
+            return edges, np.empty(0), np.empty(0, dtype=np.int64)
+        sources, targets = self.sources[edges], self.indices[edges]
+        dist = points_to_segments_dist(
+            np.array([lat]), np.array([lng]),
+            self.node_lat[sources], self.node_lng[sources],
+            self.node_lat[targets], self.node_lng[targets]
+        )[0] * KM_PER_DEGREE
+        barrier, in_buffer, penalty = crime_penalties(dist, radius, **kwargs)
+        penalty = np.where(in_buffer & ~barrier, penalty, 0.0)
+        return edges, penalty, barrier.astype(np.int64)
+
+    def shortest_path(self, source, target, edge_weights=None):
+        """
+        A* search from source to target node.
+
+        edge_weights defaults to edge lengths. The great-circle heuristic is
+        admissible as long as every weight is at least the edge length. Pass
+        weights that are reused across queries as a list; an array is
+        converted on every call, which costs O(edges).
+        Returns (node_path, cost) or (None, inf) if target is unreachable.
+        """
+        if edge_weights is None:
+            weights = self._lengths
+        elif isinstance(edge_weights, list):
+            weights = edge_weights
+        else:
+            weights = edge_weights.tolist()
+        indptr, indices = self._indptr, self._indices
+        node_lat, node_lng = self.node_lat, self.node_lng
+        target_lat, target_lng = float(node_lat[target]), float(node_lng[target])
+
+        best = {source: 0.0}
+        previous = {}
+        heuristic = {}
+        queue = [(0.0, 0.0, source)]
+        while queue:
+            _, cost, node = heapq.heappop(queue)
+            if node == target:
+                path = [node]
+                while node in previous:
+                    node = previous[node]
+                    path.append(node)
+                return path[::-1], cost
+            if cost > best.get(node, math.inf):
+                continue
+            for edge in range(indptr[node], indptr[node + 1]):
+                weight = weights[edge]
+                if weight == math.inf:
+                    continue
+                neighbour = indices[edge]
+                new_cost = cost + weight
+                if new_cost < best.get(neighbour, math.inf):
+                    best[neighbour] = new_cost
+                    previous[neighbour] = node
+                    h = heuristic.get(neighbour)
+                    if h is None:
+                        h = haversine_m(float(node_lat[neighbour]), float(node_lng[neighbour]),
+                                        target_lat, target_lng)
+                        heuristic[neighbour] = h
+                    heapq.heappush(queue, (new_cost + h, new_cost, neighbour))
+        return None, math.inf
+
+    def path_geometry(self, path):
+        """GeoJSON LineString and length in meters for a node path"""
+        coordinates = [[float(self.node_lng[n]), float(self.node_lat[n])] for n in path]
+        lats, lngs = self.node_lat[path], self.node_lng[path]
+        distance = float(haversine_km(lats[:-1], lngs[:-1], lats[1:], lngs[1:]).sum()) * 1000
+        return {'type': 'LineString', 'coordinates': coordinates}, distance
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert an Overpass JSON export into a road graph file')
+    parser.add_argument('source', help='Overpass API JSON export of highway ways and their nodes')
+    parser.add_argument('output', help='Output .npz graph file')
+    parser.add_argument('--mode', default='driving', choices=sorted(MODE_SPEEDS_KMH))
+    args = parser.parse_args()
+
+    with open(args.source, 'r', encoding='utf-8') as f:
+        graph = RoadGraph.from_overpass(json.load(f), mode=args.mode)
+    graph.save(args.output)
+    print(f"Saved {graph.num_nodes} nodes and {graph.num_edges} edges to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
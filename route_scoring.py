@@ -0,0 +1,184 @@
+import math
+import numpy as np
+from geo_math import points_to_segments_dist
+
+# Scoring constants used by /api/safe-route
+GLOBAL_DANGER_RADIUS = 0.2      # ~22km minimum distance from any crime
+BUFFER_ZONE_MULTIPLIER = 6.0
+MIN_DISTANCE_MULTIPLIER = 30.0
+BASE_PENALTY = 15000000.0
+KM_PER_DEGREE = 111.32
+
+# Segments scored per crime block, keeps the crime x segment matrix around 16MB
+MAX_BLOCK_ELEMENTS = 2000000
+
+
+def point_to_segment_dist(p, a, b):
+    px = b[1] - a[1]
+    py = b[0] - a[0]
+    norm = px*px + py*py
+    u = ((p[1] - a[1]) * px + (p[0] - a[0]) * py) / float(norm) if norm != 0 else 0
+    u = max(0, min(1, u))
+    x = a[1] + u * px
+    y = a[0] + u * py
+    dx = x - p[1]
+    dy = y - p[0]
+    return math.sqrt(dx*dx + dy*dy)
+
+
+def _as_crime_array(crime_points):
+    """Return crime points as a float (N, 4) array of lat, lng, weight, radius"""
+    crimes = np.asarray(crime_points, dtype=float)
+    if crimes.size == 0:
+        return np.empty((0, 4))
+    return crimes.reshape(-1, 4)
+
+
+def influence_radius_km(crime_points,
+                        global_danger_radius=GLOBAL_DANGER_RADIUS,
+                        buffer_zone_multiplier=BUFFER_ZONE_MULTIPLIER):
+    """Largest distance at which any of the crimes can still affect a segment"""
+    crimes = _as_crime_array(crime_points)
+    max_radius = float(crimes[:, 3].max()) if len(crimes) else 0.0
+    return max(max_radius * buffer_zone_multiplier * 1.2, global_danger_radius * 1.5)
+
+
+def crime_penalties(dist, radius,
+                    global_danger_radius=GLOBAL_DANGER_RADIUS,
+                    buffer_zone_multiplier=BUFFER_ZONE_MULTIPLIER,
+                    min_distance_multiplier=MIN_DISTANCE_MULTIPLIER):
+    """
+    Apply the barrier and falloff rules to crime-to-segment distances (km).
+
+    Returns (barrier, in_buffer, penalty) arrays shaped like dist: whether
+    the segment is inside the crime's barrier, whether it is inside the
+    buffer zone, and the penalty the crime adds there.
+    """
+    barrier = (dist <= radius * 1.2) | (dist < global_danger_radius * 1.5)
+    in_buffer = dist <= radius * buffer_zone_multiplier * 1.2
+
+    # The legacy loop always resolves crime severity to 'medium' (x12.0)
+    distance_ratio = np.maximum(0, (dist - radius) / (radius * (buffer_zone_multiplier - 1)))
+    falloff = np.exp(-4.0 * distance_ratio)
+    distance_penalty = (1.0 / (dist ** 0.7 + 0.0001)) * min_distance_multiplier * 2000
+    penalty = (BASE_PENALTY * falloff * 12.0) + distance_penalty
+    return barrier, in_buffer, penalty
+
+
+def score_route(coordinates, crime_points,
+                global_danger_radius=GLOBAL_DANGER_RADIUS,
+                buffer_zone_multiplier=BUFFER_ZONE_MULTIPLIER,
+                min_distance_multiplier=MIN_DISTANCE_MULTIPLIER,
+                index=None, reach_km=None):
+    """
+    Score a route against crime points using batched array operations.
+
+    coordinates is the OSRM geometry ([lng, lat] pairs) and crime_points a
+    sequence or (N, 4) array of (lat, lng, weighted_severity, radius).
+    When a SpatialIndex built over the same crimes is given, only crimes
+    within reach_km of the route's segments are scored.
+    Returns (segment_penalties, danger_score) matching score_route_loop.
+    """
+    coords = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+    num_segments = max(len(coords) - 1, 0)
+    crimes = _as_crime_array(crime_points)
+
+    if num_segments == 0:
+        return [], 0.0
+
+    if index is not None and len(crimes):
+        if reach_km is None:
+            reach_km = influence_radius_km(crimes, global_danger_radius, buffer_zone_multiplier)
+        # Candidates come back in ascending order, so summation order is kept
+        crimes = crimes[index.query_polyline(coords, reach_km, exact=False)]
+
+    a_lng, a_lat = coords[:-1, 0], coords[:-1, 1]
+    b_lng, b_lat = coords[1:, 0], coords[1:, 1]
+
+    penalties = np.zeros(num_segments)
+    blocked = np.zeros(num_segments, dtype=bool)
+    block_size = max(1, MAX_BLOCK_ELEMENTS // num_segments)
+    segment_index = np.arange(num_segments)
+
+    for start in range(0, len(crimes), block_size):
+        block = crimes[start:start + block_size]
+        radius = block[:, 3:4]
+
+        dist = points_to_segments_dist(
+            block[:, 0], block[:, 1], a_lat, a_lng, b_lat, b_lng
+        ) * KM_PER_DEGREE
+
+        barrier, in_buffer, total_penalty = crime_penalties(
+            dist, radius, global_danger_radius, buffer_zone_multiplier, min_distance_multiplier
+        )
+
+        # A crime stops contributing at the first segment that hits its barrier
+        has_barrier = barrier.any(axis=1)
+        first_barrier = np.where(has_barrier, barrier.argmax(axis=1), num_segments)
+        blocked[first_barrier[has_barrier]] = True
+        in_buffer &= segment_index[None, :] < first_barrier[:, None]
+
+        # Rows are summed in crime order, same as the per-crime loop
+        penalties += np.where(in_buffer, total_penalty, 0.0).sum(axis=0)
+
+    penalties[blocked] = np.inf
+    segment_penalties = penalties.tolist()
+    danger_score = sum(penalty ** 2 for penalty in segment_penalties) ** 0.5
+    return segment_penalties, danger_score
+
+
+def score_route_loop(coordinates, crime_points,
+                     global_danger_radius=GLOBAL_DANGER_RADIUS,
+                     buffer_zone_multiplier=BUFFER_ZONE_MULTIPLIER,
+                     min_distance_multiplier=MIN_DISTANCE_MULTIPLIER):
+    """Reference per-crime, per-segment scorer kept for benchmarks and checks"""
+    segment_penalties = [0] * (len(coordinates) - 1)  # Track danger per segment
+
+    for crime_lat, crime_lng, severity, radius in crime_points:
+        crime_point = (crime_lat, crime_lng)
+
+        # Check distance to each segment of the route
+        for j in range(len(coordinates) - 1):
+            p1 = (coordinates[j][1], coordinates[j][0])  # lat, lng
+            p2 = (coordinates[j+1][1], coordinates[j+1][0])
+
+            # Calculate distance from crime to this segment in kilometers
+            dist = point_to_segment_dist(crime_point, p1, p2) * KM_PER_DEGREE
+
+            # Absolute barrier - any route through immediate crime areas is rejected
+            if dist <= radius * 1.2:
+                segment_penalties[j] = float('inf')
+                break
+
+            # Apply a global minimum distance penalty to all crimes
+            if dist < global_danger_radius * 1.5:
+                segment_penalties[j] = float('inf')
+                break
+
+            # Enhanced danger zone calculation with exponential falloff
+            if dist <= radius * buffer_zone_multiplier * 1.2:
+                distance_ratio = max(0, (dist - radius) / (radius * (buffer_zone_multiplier - 1)))
+                falloff = math.exp(-4.0 * distance_ratio)
+
+                current_severity = crime_point[2] if len(crime_point) > 2 else 'medium'
+                severity_weights = {
+                    'high': 30.0,
+                    'medium': 12.0,
+                    'low': 6.0
+                }
+                severity_multiplier = severity_weights.get(current_severity, 1.0)
+
+                distance_penalty = (1.0 / (dist ** 0.7 + 0.0001)) * min_distance_multiplier * 2000
+                total_penalty = (BASE_PENALTY * falloff * severity_multiplier) + distance_penalty
+                segment_penalties[j] += total_penalty
+
+                if current_severity == 'high' and dist < radius * 1.8:
+                    segment_penalties[j] = float('inf')
+                    break
+
+                if dist < radius * 0.7:
+                    segment_penalties = [float('inf')] * len(segment_penalties)
+                    break
+
+    danger_score = sum(penalty ** 2 for penalty in segment_penalties) ** 0.5
+    return segment_penalties, danger_score
@@ -0,0 +1,131 @@
+import logging
+import threading
+from abc import ABC, abstractmethod
+import numpy as np
+from road_graph import RoadGraph, MODE_SPEEDS_KMH
+
+logger = logging.getLogger(__name__)
+
+# Edge cost used instead of infinity for edges inside a crime barrier, so a
+# route still exists when every way out passes a crime
+BLOCKED_EDGE_PENALTY = 1e10
+
+
+class RoutingBackend(ABC):
+    """
+    Interface behind /api/safe-route.
+
+    routes() returns (routes, errors) where routes is a list of
+    (label, route) pairs and each route is an OSRM-style dict with a GeoJSON
+    'geometry', 'distance' in meters and 'duration' in seconds. crime_layer
+    is the current RoutingCrimeLayer, for backends that can route around it.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def routes(self, mode, start_lat, start_lng, end_lat, end_lng, crime_layer=None, reach_km=None):
+        pass
+
+
+class OSRMBackend(RoutingBackend):
+    """Alternatives from an OSRM server at several snapping radiuses"""
+
+    name = 'osrm'
+
+    def __init__(self, client, radiuses=(5000, 10000, 20000), alternatives=2):
+        self.client = client
+        self.radiuses = radiuses
+        self.alternatives = alternatives
+
+    def routes(self, mode, start_lat, start_lng, end_lat, end_lng, crime_layer=None, reach_km=None):
+        return self.client.route_alternatives(
+            mode, start_lat, start_lng, end_lat, end_lng,
+            radiuses=self.radiuses,
+            alternatives=self.alternatives
+        )
+
+
+class LocalGraphBackend(RoutingBackend):
+    """
+    Offline routing on a RoadGraph loaded from a file.
+
+    Returns the shortest path and, when a crime layer is given, the path
+    that minimizes length plus crime penalties, so the safest route is a
+    true weighted shortest path. With an EdgeDangerCosts the edge weights
+    are kept up to date as crimes arrive; otherwise edge penalties are
+    computed once per crime layer and reused until the layer changes.
+    """
+
+    name = 'local'
+
+    def __init__(self, graph, snap_radius_km=5.0, danger_costs=None):
+        self.graph = graph
+        self.snap_radius_km = snap_radius_km
+        self.danger_costs = danger_costs
+        self._lock = threading.Lock()
+        self._penalty_layer = None
+        self._penalties = None
+        self._layer_weights = None
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        graph = RoadGraph.load(path)
+        logger.info(f"Loaded road graph {path} with {graph.num_nodes} nodes and {graph.num_edges} edges")
+        return cls(graph, **kwargs)
+
+    def edge_penalties(self, crime_layer, reach_km):
+        """Additive per-edge danger costs for a crime layer"""
+        with self._lock:
+            if self._penalty_layer is not crime_layer:
+                penalty_sum, barrier_count = self.graph.crime_edge_costs(
+                    crime_layer.crime_points(1.0), reach_km
+                )
+                self._penalties = np.where(barrier_count > 0, BLOCKED_EDGE_PENALTY, penalty_sum)
+                self._layer_weights = None
+                self._penalty_layer = crime_layer
+            return self._penalties
+
+    def _crime_layer_weights(self, crime_layer, reach_km):
+        """Edge lengths plus the layer's penalties as a list, converted once per layer"""
+        penalties = self.edge_penalties(crime_layer, reach_km)
+        with self._lock:
+            if self._layer_weights is None or self._layer_weights[0] is not penalties:
+                self._layer_weights = (penalties, (self.graph.lengths + penalties).tolist())
+            return self._layer_weights[1]
+
+    def _route(self, source, target, mode, edge_weights=None):
+        path, _ = self.graph.shortest_path(source, target, edge_weights)
+        if path is None:
+            return None
+        geometry, distance = self.graph.path_geometry(path)
+        speed = MODE_SPEEDS_KMH.get(mode, MODE_SPEEDS_KMH['driving'])
+        return {
+            'geometry': geometry,
+            'distance': distance,
+            'duration': distance / (speed * 1000 / 3600)
+        }
+
+    def routes(self, mode, start_lat, start_lng, end_lat, end_lng, crime_layer=None, reach_km=None):
+        source = self.graph.nearest_node(start_lat, start_lng, self.snap_radius_km)
+        target = self.graph.nearest_node(end_lat, end_lng, self.snap_radius_km)
+        if source is None or target is None:
+            return [], {'local': ValueError('Start or end point is too far from the road graph')}
+
+        routes = []
+        shortest = self._route(source, target, mode)
+        if shortest is None:
+            return [], {'local': ValueError('No path between start and end on the road graph')}
+        routes.append(('shortest', shortest))
+
+        weights = None
+        if self.danger_costs is not None:
+            if len(self.danger_costs):
+                weights = self.danger_costs.edge_weight_list()
+        elif crime_layer is not None and len(crime_layer):
+            weights = self._crime_layer_weights(crime_layer, reach_km)
+        if weights is not None:
+            safest = self._route(source, target, mode, weights)
+            if safest is not None:
+                routes.append(('safest', safest))
+        return routes, {}
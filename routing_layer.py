@@ -0,0 +1,99 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+from route_scoring import influence_radius_km
+from spatial_index import SpatialIndex
+
+logger = logging.getLogger(__name__)
+
+# Increased danger zones to ensure wider berth around crime areas
+DANGER_ZONES = {
+    'high': 0.8,     # ~88km radius for high severity crimes
+    'medium': 0.5,   # ~55km radius for medium severity
+    'low': 0.3       # ~33km radius for low severity
+}
+
+
+class RoutingCrimeLayer:
+    """Crime coordinates, severities, thresholds and danger radii as arrays for routing"""
+
+    def __init__(self, lats, lngs, severities, danger_zones=None, cell_size=0.05):
+        self.lats = np.asarray(lats, dtype=float)
+        self.lngs = np.asarray(lngs, dtype=float)
+        self.severities = np.asarray(severities, dtype=float)
+        zones = danger_zones or DANGER_ZONES
+
+        # Severity percentiles split crimes into low/medium/high danger bands
+        if len(self.severities) > 3:
+            self.low_threshold = float(np.percentile(self.severities, 33))
+            self.high_threshold = float(np.percentile(self.severities, 66))
+        else:
+            self.low_threshold = 2
+            self.high_threshold = 4
+
+        self.radii = np.where(
+            self.severities >= self.high_threshold, zones['high'],
+            np.where(self.severities >= self.low_threshold, zones['medium'], zones['low'])
+        ).astype(float)
+        self.index = SpatialIndex(self.lats, self.lngs, cell_size=cell_size)
+
+    @classmethod
+    def from_crimes(cls, crimes, danger_zones=None):
+        """Build a layer from crime dicts, skipping ones without usable coordinates or severity"""
+        lats, lngs, severities = [], [], []
+        for crime in crimes:
+            try:
+                if 'latitude' not in crime or 'longitude' not in crime:
+                    continue
+                severity = float(crime.get('severity', 1))
+                lat, lng = float(crime['latitude']), float(crime['longitude'])
+            except (TypeError, ValueError):
+                continue
+            lats.append(lat)
+            lngs.append(lng)
+            severities.append(severity)
+        return cls(lats, lngs, severities, danger_zones)
+
+    def __len__(self):
+        return len(self.lats)
+
+    def crime_points(self, weight):
+        """(N, 4) array of lat, lng, weighted severity and radius for score_route"""
+        return np.column_stack([self.lats, self.lngs, self.severities * weight, self.radii])
+
+    def reach_km(self, **kwargs):
+        return influence_radius_km(self.crime_points(1.0), **kwargs)
+
+
+class RoutingLayerCache:
+    """
+    Keeps one RoutingCrimeLayer built from the last `days` of a CrimeStore.
+
+    The layer is rebuilt only when the store's version changes or the
+    window start has moved on by more than refresh_interval.
+    """
+
+    def __init__(self, store, days=90, refresh_interval=timedelta(hours=1)):
+        self.store = store
+        self.days = days
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._layer = None
+        self._version = None
+        self._built_at = None
+        self.builds = 0
+
+    def get(self):
+        now = datetime.utcnow()
+        with self._lock:
+            if (self._layer is None or self._version != self.store.version
+                    or now - self._built_at > self.refresh_interval):
+                version = self.store.version
+                crimes = self.store.since(now - timedelta(days=self.days))
+                self._layer = RoutingCrimeLayer.from_crimes(crimes)
+                self._version = version
+                self._built_at = now
+                self.builds += 1
+                logger.info(f"Built routing crime layer with {len(self._layer)} crimes (version {version})")
+            return self._layer
@@ -1,19 +1,74 @@
 import pandas as pd
 import numpy as np
+import bisect
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from statsmodels.tsa.arima.model import ARIMA
 import os
 
+from crime_store import to_utc_naive
+
+ARIMA_ORDER = (1, 1, 1)
+
+
+def series_fingerprint(dates, values):
+    """Stable key for a daily crime-count series"""
+    digest = hashlib.sha1()
+    digest.update(','.join(str(d) for d in dates).encode())
+    digest.update(np.ascontiguousarray(values, dtype=float).tobytes())
+    return digest.hexdigest()
+
+
 class SimpleCrimePredictor:
-    def __init__(self):
+    """
+    City-wide daily crime forecast with ARIMA.
+
+    Forecasts are cached by the fingerprint of the daily series and the
+    horizon. The fitted model is kept between calls: it covers every day but
+    the last (still filling up), and later series whose days up to the
+    model's last date match it are brought up to date with results.extend()
+    instead of a refit. Days are matched by date, so a sliding history
+    window that drops old days still extends, and the series has a count
+    for every calendar day, so a day that lost its crimes shows up as a
+    change rather than a gap. After refit_every extended
+    days, or when past days change, the model is refitted starting from the
+    previous parameters.
+    """
+
+    def __init__(self, cache_size=64, refit_every=7):
         self.model = None
-        
+        self.cache_size = cache_size
+        self.refit_every = refit_every
+
+        self._lock = threading.Lock()
+        self._fit_lock = threading.Lock()
+        self._forecasts = OrderedDict()   # (fingerprint, days) -> forecast values
+        self._base = None                 # {'dates', 'values', 'results'} fitted on a prefix of the series
+
+        self.hits = 0
+        self.misses = 0
+        self.full_fits = 0
+        self.warm_fits = 0
+        self.extends = 0
+        self.installs = 0
+
     def prepare_data(self, crimes):
         """Convert crime data into time series format"""
         df = pd.DataFrame(crimes)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        # Naive (store) and tz-aware (Firestore) timestamps can't be mixed in one column
+        df['timestamp'] = pd.to_datetime(df['timestamp'].map(to_utc_naive))
         df['date'] = df['timestamp'].dt.date
         return df
+    
+    def daily_counts(self, crimes):
+        """Crimes per day, as the series predict() fits the model on; days without crimes count 0"""
+        counts = self.prepare_data(crimes).groupby('date').size()
+        if counts.empty:
+            return counts
+        days = pd.date_range(counts.index.min(), counts.index.max(), freq='D').date
+        return counts.reindex(days, fill_value=0)
         
     def predict(self, crimes, days=7):
         """Simple prediction using ARIMA"""
@@ -21,15 +76,29 @@ class SimpleCrimePredictor:
             if not crimes:
                 return self._empty_predictions(days)
                 
-            df = self.prepare_data(crimes)
-            ts_data = df.groupby('date').size()
+            ts_data = self.daily_counts(crimes)
             
             if len(ts_data) < 2:
                 return self._empty_predictions(days)
                 
-            # Fit ARIMA model
-            self.model = ARIMA(ts_data, order=(1,1,1)).fit()
-            forecast = self.model.forecast(steps=days)
+            values = ts_data.to_numpy(dtype=float)
+            key = (series_fingerprint(ts_data.index, values), days)
+            with self._lock:
+                forecast = self._forecasts.get(key)
+                if forecast is not None:
+                    self._forecasts.move_to_end(key)
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            
+            if forecast is None:
+                # Fit (or update) the ARIMA model
+                self.model = self._fitted(list(ts_data.index), values)
+                forecast = [float(value) for value in self.model.forecast(steps=days)]
+                with self._lock:
+                    self._forecasts[key] = forecast
+                    while len(self._forecasts) > self.cache_size:
+                        self._forecasts.popitem(last=False)
             
             # Format predictions
             predictions = []
@@ -47,6 +116,81 @@ class SimpleCrimePredictor:
             print(f"Prediction error: {str(e)}")
             return self._empty_predictions(days)
     
+    def predict_horizons(self, crimes, horizons):
+        """
+        predict(crimes, days) for every days in horizons, sliced from one
+        forecast of the longest; each slice gets its own risk assessment
+        """
+        predictions = self.predict(crimes, max(horizons))
+        return {
+            days: self._assess_risk([dict(prediction) for prediction in predictions[:days]])
+            for days in horizons
+        }
+
+    def _fitted(self, dates, values):
+        """ARIMA results for the whole series, reusing the kept model where possible"""
+        with self._fit_lock:
+            if len(values) < 4:
+                # Too short to keep a prefix model; fitting is cheap anyway
+                self.full_fits += 1
+                return ARIMA(values, order=ARIMA_ORDER).fit()
+
+            base = self._base
+            if base is not None:
+                # Days after the model's last date are new observations
+                known = bisect.bisect_right(dates, base['dates'][-1])
+                new_days = len(dates) - known
+                # A sliding window cuts its first day short, so that day is not compared;
+                # every later day must line up with the model's last days and keep its count
+                overlap = known - 1
+                same_history = (
+                    overlap > 0 and overlap <= len(base['dates'])
+                    and list(dates[1:known]) == base['dates'][-overlap:]
+                    and values[1:known].tolist() == base['values'][-overlap:].tolist()
+                )
+                if 0 < new_days <= self.refit_every + 1 and same_history:
+                    self.extends += 1
+                    return base['results'].extend(values[known:])
+
+            # Refit on every day but the last, warm-started from the previous fit
+            prefix = values[:-1].copy()
+            if base is not None:
+                results = ARIMA(prefix, order=ARIMA_ORDER).fit(start_params=base['results'].params)
+                self.warm_fits += 1
+            else:
+                results = ARIMA(prefix, order=ARIMA_ORDER).fit()
+                self.full_fits += 1
+            self._base = {'dates': list(dates[:-1]), 'values': prefix, 'results': results}
+            return results.extend(values[-1:])
+
+    def install_model(self, dates, values, results):
+        """
+        Serve from ARIMA results fitted elsewhere on the daily counts `values`
+        for `dates`; later predictions extend it like a model fitted here
+        """
+        order = tuple(results.model.order)
+        if order != ARIMA_ORDER:
+            raise ValueError(f"ARIMA order must be {ARIMA_ORDER}, got {order}")
+        with self._fit_lock:
+            self._base = {'dates': list(dates), 'values': np.asarray(values, dtype=float), 'results': results}
+            with self._lock:
+                self._forecasts.clear()
+            self.installs += 1
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'cached_forecasts': len(self._forecasts),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'full_fits': self.full_fits,
+                'warm_fits': self.warm_fits,
+                'extends': self.extends,
+                'installed_models': self.installs
+            }
+
     def _assess_risk(self, predictions):
         """Add risk assessment to predictions"""
         if not predictions:
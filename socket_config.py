@@ -0,0 +1,59 @@
+import os
+from dotenv import load_dotenv
+
+ASYNC_MODES = ('threading', 'eventlet', 'gevent')
+
+
+def configure_async_mode():
+    """
+    Pick the Socket.IO async mode from SOCKETIO_ASYNC_MODE.
+
+    'eventlet' and 'gevent' serve each socket from a green thread instead of
+    an OS thread; they patch the standard library, so this has to run before
+    app.py imports anything that opens sockets or starts threads.
+    """
+    load_dotenv()
+    mode = os.getenv('SOCKETIO_ASYNC_MODE', 'threading').lower()
+    if mode not in ASYNC_MODES:
+        raise ValueError(f"SOCKETIO_ASYNC_MODE must be one of {ASYNC_MODES}, got {mode!r}")
+
+    if mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    elif mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+        # Firestore talks gRPC, which needs its own hook to cooperate with gevent
+        try:
+            from grpc.experimental import gevent as grpc_gevent
+            grpc_gevent.init_gevent()
+        except ImportError:
+            pass
+    return mode
+
+
+def socketio_options(mode):
+    """SocketIO keyword arguments from the environment"""
+    verbose = os.getenv('SOCKETIO_LOGGING', 'false').lower() in ('1', 'true', 'yes')
+    return {
+        'async_mode': mode,
+        # Shared by every worker so a broadcast reaches clients on all of them
+        'message_queue': os.getenv('SOCKETIO_MESSAGE_QUEUE') or None,
+        'logger': verbose,
+        'engineio_logger': verbose
+    }
+
+
+def make_emitter():
+    """
+    Write-only SocketIO that emits through SOCKETIO_MESSAGE_QUEUE.
+
+    Lets scripts and worker processes without a web server push events to
+    the clients connected to the app servers.
+    """
+    from flask_socketio import SocketIO
+    load_dotenv()
+    queue = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+    if not queue:
+        raise RuntimeError('SOCKETIO_MESSAGE_QUEUE is not set')
+    return SocketIO(message_queue=queue)
@@ -0,0 +1,202 @@
+import heapq
+import math
+import numpy as np
+from geo_math import haversine_km, points_to_segments_dist, ARC_KM_PER_DEGREE
+from route_scoring import KM_PER_DEGREE
+
+
+class SpatialIndex:
+    """
+    Uniform lat/lng grid over a fixed set of points.
+
+    Points are bucketed into square cells of cell_size degrees. Queries only
+    look at the cells a search area overlaps and then filter the candidates
+    exactly, so cost depends on local density rather than the total count.
+    """
+
+    def __init__(self, lats, lngs, ids=None, cell_size=0.01):
+        self.cell_size = float(cell_size)
+        self.lats = np.asarray(lats, dtype=float).ravel()
+        self.lngs = np.asarray(lngs, dtype=float).ravel()
+        self.ids = list(ids) if ids is not None else list(range(len(self.lats)))
+        self.cells = {}
+
+        cell_y = np.floor(self.lats / self.cell_size).astype(np.int64)
+        cell_x = np.floor(self.lngs / self.cell_size).astype(np.int64)
+        for index, key in enumerate(zip(cell_y.tolist(), cell_x.tolist())):
+            self.cells.setdefault(key, []).append(index)
+
+        if len(self.lats):
+            self.bounds = (int(cell_y.min()), int(cell_x.min()), int(cell_y.max()), int(cell_x.max()))
+            self.max_abs_lat = float(np.abs(self.lats).max())
+        else:
+            self.bounds = None
+            self.max_abs_lat = 0.0
+
+    @classmethod
+    def from_records(cls, records, cell_size=0.01, id_field='id'):
+        """Build an index from dicts that carry latitude/longitude fields"""
+        lats, lngs, ids = [], [], []
+        for record in records:
+            try:
+                lats.append(float(record['latitude']))
+                lngs.append(float(record['longitude']))
+            except (KeyError, TypeError, ValueError):
+                continue
+            ids.append(record.get(id_field))
+        return cls(lats, lngs, ids, cell_size=cell_size)
+
+    def __len__(self):
+        return len(self.lats)
+
+    def _cell(self, lat, lng):
+        return (int(math.floor(lat / self.cell_size)), int(math.floor(lng / self.cell_size)))
+
+    def _candidates(self, min_lat, min_lng, max_lat, max_lng):
+        """Indices of points in every cell overlapping the bounding box"""
+        y0, x0 = self._cell(min_lat, min_lng)
+        y1, x1 = self._cell(max_lat, max_lng)
+
+        # Scanning occupied cells is cheaper than a huge, mostly empty box
+        if (y1 - y0 + 1) * (x1 - x0 + 1) > len(self.cells):
+            return [i for (y, x), members in self.cells.items()
+                    if y0 <= y <= y1 and x0 <= x <= x1 for i in members]
+
+        found = []
+        for y in range(y0, y1 + 1):
+            for x in range(x0, x1 + 1):
+                members = self.cells.get((y, x))
+                if members:
+                    found.extend(members)
+        return found
+
+    def query_box(self, min_lat, min_lng, max_lat, max_lng):
+        """Return indices of points inside a lat/lng bounding box, in ascending order"""
+        candidates = np.asarray(
+            sorted(self._candidates(min_lat, min_lng, max_lat, max_lng)), dtype=np.int64
+        )
+        if candidates.size == 0:
+            return candidates
+        lats, lngs = self.lats[candidates], self.lngs[candidates]
+        inside = (lats >= min_lat) & (lats <= max_lat) & (lngs >= min_lng) & (lngs <= max_lng)
+        return candidates[inside]
+
+    def query_radius(self, lat, lng, radius_km):
+        """Return (indices, distances_km) of points within radius_km, nearest first"""
+        dlat = radius_km / ARC_KM_PER_DEGREE
+        cos_lat = max(math.cos(math.radians(min(abs(lat) + dlat, 90.0))), 1e-6)
+        dlng = min(radius_km / (ARC_KM_PER_DEGREE * cos_lat), 180.0)
+
+        candidates = np.asarray(
+            self._candidates(lat - dlat, lng - dlng, lat + dlat, lng + dlng), dtype=np.int64
+        )
+        if candidates.size == 0:
+            return candidates, np.empty(0)
+
+        distances = haversine_km(lat, lng, self.lats[candidates], self.lngs[candidates])
+        keep = distances <= radius_km
+        candidates, distances = candidates[keep], distances[keep]
+        order = np.argsort(distances, kind='stable')
+        return candidates[order], distances[order]
+
+    def query_nearest(self, lat, lng, k=1, max_radius_km=None):
+        """Return (indices, distances_km) of the k nearest points, nearest first"""
+        if k <= 0 or not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        cy, cx = self._cell(lat, lng)
+        # Lower bound on the width of a cell anywhere between us and the data
+        widest_lat = max(abs(lat), self.max_abs_lat)
+        cell_km = self.cell_size * ARC_KM_PER_DEGREE * max(math.cos(math.radians(widest_lat)), 1e-6)
+        min_y, min_x, max_y, max_x = self.bounds
+        max_ring = max(abs(cy - min_y), abs(cy - max_y), abs(cx - min_x), abs(cx - max_x))
+
+        best = []  # max-heap of (-distance, index)
+        seen = 0
+        ring = 0
+        while ring <= max_ring and seen < len(self):
+            # Every unvisited cell is at least (ring - 1) cells away
+            if len(best) == k and (ring - 1) * cell_km > -best[0][0]:
+                break
+            if max_radius_km is not None and (ring - 1) * cell_km > max_radius_km:
+                break
+
+            ring_members = []
+            for y in range(cy - ring, cy + ring + 1):
+                # Interior rows only touch the left and right edge of the ring
+                step = 1 if abs(y - cy) == ring else max(2 * ring, 1)
+                for x in range(cx - ring, cx + ring + 1, step):
+                    members = self.cells.get((y, x))
+                    if members:
+                        ring_members.extend(members)
+
+            if ring_members:
+                seen += len(ring_members)
+                members = np.asarray(ring_members, dtype=np.int64)
+                distances = haversine_km(lat, lng, self.lats[members], self.lngs[members])
+                for index, distance in zip(members.tolist(), distances.tolist()):
+                    if max_radius_km is not None and distance > max_radius_km:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, index))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, index))
+            ring += 1
+
+        best.sort(key=lambda item: (-item[0], item[1]))
+        return (np.asarray([index for _, index in best], dtype=np.int64),
+                np.asarray([-distance for distance, _ in best]))
+
+    def query_polyline(self, coordinates, distance_km, exact=True):
+        """
+        Return sorted indices of points within distance_km of a polyline.
+
+        coordinates are [lng, lat] pairs as returned by OSRM. Distances use
+        the same planar degree metric as the route scorer. With exact=False
+        every point near a segment's bounding box is returned, which is a
+        superset suitable for prefiltering.
+        """
+        coords = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+        if not len(self) or len(coords) == 0:
+            return np.empty(0, dtype=np.int64)
+        if len(coords) == 1:
+            coords = np.vstack([coords, coords])
+
+        pad = distance_km / KM_PER_DEGREE
+        a, b = coords[:-1], coords[1:]
+        min_lng = np.minimum(a[:, 0], b[:, 0]) - pad
+        max_lng = np.maximum(a[:, 0], b[:, 0]) + pad
+        min_lat = np.minimum(a[:, 1], b[:, 1]) - pad
+        max_lat = np.maximum(a[:, 1], b[:, 1]) + pad
+
+        # Collect the cells touched by each padded segment box
+        keys = set()
+        y0 = np.floor(min_lat / self.cell_size).astype(np.int64)
+        y1 = np.floor(max_lat / self.cell_size).astype(np.int64)
+        x0 = np.floor(min_lng / self.cell_size).astype(np.int64)
+        x1 = np.floor(max_lng / self.cell_size).astype(np.int64)
+        for sy0, sy1, sx0, sx1 in zip(y0.tolist(), y1.tolist(), x0.tolist(), x1.tolist()):
+            if (sy1 - sy0 + 1) * (sx1 - sx0 + 1) > len(self.cells):
+                keys.update(key for key in self.cells
+                            if sy0 <= key[0] <= sy1 and sx0 <= key[1] <= sx1)
+                continue
+            for y in range(sy0, sy1 + 1):
+                for x in range(sx0, sx1 + 1):
+                    if (y, x) in self.cells:
+                        keys.add((y, x))
+
+        candidates = sorted(i for key in keys for i in self.cells[key])
+        candidates = np.asarray(candidates, dtype=np.int64)
+        if not exact or candidates.size == 0:
+            return candidates
+
+        within = np.zeros(candidates.size, dtype=bool)
+        block = max(1, 2000000 // len(a))
+        for start in range(0, candidates.size, block):
+            members = candidates[start:start + block]
+            dist = points_to_segments_dist(
+                self.lats[members], self.lngs[members],
+                a[:, 1], a[:, 0], b[:, 1], b[:, 0]
+            ).min(axis=1) * KM_PER_DEGREE
+            within[start:start + block] = dist <= distance_km
+        return candidates[within]
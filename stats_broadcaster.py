@@ -0,0 +1,174 @@
+import copy
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+def dict_diff(old, new):
+    """
+    Changes that turn `old` into `new`: new or changed keys with their new
+    value (nested dicts are diffed recursively) and removed keys as None.
+    """
+    diff = {}
+    for key, value in new.items():
+        if key not in old:
+            diff[key] = value
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            nested = dict_diff(old[key], value)
+            if nested:
+                diff[key] = nested
+        elif old[key] != value:
+            diff[key] = value
+    for key in old:
+        if key not in new:
+            diff[key] = None
+    return diff
+
+
+class _Channel:
+    def __init__(self, producer, min_interval, full_every):
+        self.producer = producer
+        self.min_interval = min_interval
+        self.full_every = full_every
+        self.dirty_since = None
+        self.last_emit = 0.0
+        self.last_state = None
+        self.seq = 0
+        self.marks = 0
+        self.emits = 0
+        self.unchanged = 0
+
+
+class CoalescingBroadcaster:
+    """
+    Coalesces bursts of state changes into one diff-encoded emit per window.
+
+    Each event is registered with a producer that returns its current state
+    as a dict. mark_dirty() only flags the event; a background thread calls
+    the producer and emits once the coalescing window since the first
+    unsent change has passed, and never more often than the event's
+    min_interval, so a burst of N changes costs one producer call and one
+    emit per window instead of N.
+
+    Payloads carry a 'seq' and either the full state ('full': True) or a
+    diff against the previous seq ('base_seq'), where removed keys are None.
+    Every full_every-th emit is a full state so clients that missed one
+    recover; full_payload() serves clients that ask for it.
+
+    Sequences are counted per broadcaster, so every payload also carries
+    the broadcaster's random 'epoch'. When several workers broadcast to the
+    same clients through a message queue, their streams interleave. A
+    client must apply a diff only if its epoch and base_seq match the last
+    payload it applied, and otherwise ask for a full payload.
+    """
+
+    def __init__(self, emit, window=0.5):
+        self.emit = emit
+        self.window = window
+        self.epoch = uuid.uuid4().hex[:8]
+        self._channels = {}
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='stats-broadcaster', daemon=True)
+        self._thread.start()
+
+    def register(self, event, producer, min_interval=0.5, full_every=20):
+        with self._cond:
+            self._channels[event] = _Channel(producer, min_interval, full_every)
+
+    def mark_dirty(self, event):
+        """Note that an event's state changed; it will be emitted at the end of the window"""
+        with self._cond:
+            channel = self._channels[event]
+            channel.marks += 1
+            if channel.dirty_since is None:
+                channel.dirty_since = time.monotonic()
+                self._cond.notify()
+
+    def full_payload(self, event):
+        """Current full state of an event, e.g. for a client that asked to resync"""
+        with self._cond:
+            channel = self._channels[event]
+            seq = channel.seq
+        return {'status': 'success', 'epoch': self.epoch, 'seq': seq, 'full': True, 'data': channel.producer()}
+
+    def _due_at(self, channel):
+        return max(channel.dirty_since + self.window, channel.last_emit + channel.min_interval)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                now = time.monotonic()
+                pending = [(self._due_at(c), event) for event, c in self._channels.items()
+                           if c.dirty_since is not None]
+                due = [event for due_at, event in pending if due_at <= now]
+                if not due:
+                    timeout = min(due_at for due_at, _ in pending) - now if pending else None
+                    self._cond.wait(timeout)
+                    continue
+                for event in due:
+                    self._channels[event].dirty_since = None
+            for event in due:
+                self._flush(event)
+
+    def _flush(self, event):
+        channel = self._channels[event]
+        try:
+            state = channel.producer()
+        except Exception as e:
+            logger.error(f"Error producing {event}: {e}", exc_info=True)
+            self.emit(event, {'status': 'error', 'message': str(e)})
+            return
+
+        previous = channel.last_state
+        full = previous is None or (channel.seq + 1) % channel.full_every == 0
+        payload = {'status': 'success', 'epoch': self.epoch, 'seq': channel.seq + 1, 'full': full}
+        if full:
+            payload['data'] = state
+        else:
+            diff = dict_diff(previous, state)
+            if not diff:
+                channel.unchanged += 1
+                return
+            payload['base_seq'] = channel.seq
+            payload['data'] = diff
+
+        try:
+            self.emit(event, payload)
+        except Exception as e:
+            logger.error(f"Error emitting {event}: {e}", exc_info=True)
+            return
+        with self._cond:
+            channel.seq += 1
+            channel.last_state = copy.deepcopy(state)
+            channel.last_emit = time.monotonic()
+            channel.emits += 1
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout=5)
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                'window_seconds': self.window,
+                'epoch': self.epoch,
+                'events': {
+                    event: {
+                        'marks': c.marks,
+                        'emits': c.emits,
+                        'unchanged_skipped': c.unchanged,
+                        'seq': c.seq,
+                        'min_interval_seconds': c.min_interval,
+                        'pending': c.dirty_since is not None
+                    }
+                    for event, c in self._channels.items()
+                }
+            }
@@ -0,0 +1,144 @@
+from datetime import datetime
+
+from alert_changes import AlertChangeLog
+
+
+def alert(title):
+    return {'title': title, 'status': 'active', 'created_at': datetime(2024, 5, 1, 12, 0)}
+
+
+def test_first_sync_resets_and_lists_current_alerts():
+    log = AlertChangeLog()
+    log.apply('ADDED', 'a', alert('A'))
+    log.apply('ADDED', 'b', alert('B'))
+    log.apply('REMOVED', 'b', None)
+
+    page = log.changes_since(None)
+    assert page['reset']
+    assert [item['id'] for item in page['alerts']] == ['a']
+    assert page['alerts'][0]['created_at'] == '2024-05-01T12:00:00'
+    assert page['removed'] == []
+    assert not page['has_more']
+    assert page['cursor'] == log.cursor
+
+
+def test_cursor_returns_only_later_changes():
+    log = AlertChangeLog()
+    log.apply('ADDED', 'a', alert('A'))
+    log.apply('ADDED', 'b', alert('B'))
+    cursor = log.changes_since(None)['cursor']
+
+    log.apply('MODIFIED', 'a', alert('A2'))
+    log.apply('REMOVED', 'b', None)
+    page = log.changes_since(cursor)
+    assert not page['reset']
+    assert [(item['id'], item['title']) for item in page['alerts']] == [('a', 'A2')]
+    assert page['removed'] == ['b']
+
+    assert log.changes_since(page['cursor']) == {
+        'alerts': [], 'removed': [], 'cursor': page['cursor'], 'has_more': False, 'reset': False
+    }
+
+
+def test_superseded_changes_are_sent_once():
+    log = AlertChangeLog()
+    cursor = log.cursor
+    for i in range(5):
+        log.apply('MODIFIED', 'a', alert(f'A{i}'))
+    page = log.changes_since(cursor)
+    assert [item['title'] for item in page['alerts']] == ['A4']
+
+
+def test_has_more_pages_through_every_change():
+    log = AlertChangeLog()
+    cursor = log.cursor
+    for i in range(25):
+        log.apply('ADDED', f'alert-{i}', alert(str(i)))
+
+    seen = []
+    pages = 0
+    while True:
+        page = log.changes_since(cursor, limit=10)
+        seen.extend(item['id'] for item in page['alerts'])
+        cursor = page['cursor']
+        pages += 1
+        if not page['has_more']:
+            break
+    assert pages == 3
+    assert seen == [f'alert-{i}' for i in range(25)]
+    assert cursor == log.cursor
+
+
+def test_reset_pages_skip_tombstones():
+    log = AlertChangeLog()
+    for i in range(6):
+        log.apply('ADDED', f'alert-{i}', alert(str(i)))
+    for i in range(0, 6, 2):
+        log.apply('REMOVED', f'alert-{i}', None)
+
+    page = log.changes_since(None, limit=2)
+    assert page['reset'] and page['has_more']
+    assert [item['id'] for item in page['alerts']] == ['alert-1', 'alert-3']
+    # Later pages are incremental again; ids the client never had are harmless
+    rest = log.changes_since(page['cursor'])
+    assert not rest['reset']
+    assert [item['id'] for item in rest['alerts']] == ['alert-5']
+    assert rest['removed'] == ['alert-0', 'alert-2', 'alert-4']
+    assert not rest['has_more']
+
+
+def test_cursor_below_tombstone_floor_resets():
+    log = AlertChangeLog(max_tombstones=2)
+    log.apply('ADDED', 'keep', alert('keep'))
+    cursor = log.cursor
+    for i in range(3):
+        log.apply('ADDED', f'gone-{i}', alert(str(i)))
+        log.apply('REMOVED', f'gone-{i}', None)
+
+    assert log.get_stats()['tombstones'] == 2
+    page = log.changes_since(cursor)
+    assert page['reset']
+    assert [item['id'] for item in page['alerts']] == ['keep']
+
+
+def test_foreign_or_malformed_cursor_resets():
+    log = AlertChangeLog()
+    log.apply('ADDED', 'a', alert('A'))
+    other = AlertChangeLog()
+    for cursor in (other.cursor, 'garbage', f'{log.epoch}:99'):
+        assert log.changes_since(cursor)['reset']
+
+
+def test_resumable_matches_reset():
+    log = AlertChangeLog(max_tombstones=1)
+    log.apply('ADDED', 'a', alert('A'))
+    cursor = log.cursor
+    assert log.resumable(cursor)
+    assert not log.resumable(None)
+    assert not log.resumable(AlertChangeLog().cursor)
+
+    log.apply('REMOVED', 'a', None)
+    log.apply('ADDED', 'b', alert('B'))
+    log.apply('REMOVED', 'b', None)
+    assert not log.resumable(cursor)
+    assert log.changes_since(cursor)['reset']
+
+
+def test_cursors_only_resume_on_the_log_that_issued_them():
+    # Two workers see the same changes but number them independently
+    first, second = AlertChangeLog(), AlertChangeLog()
+    for log in (first, second):
+        log.apply('ADDED', 'a', alert('A'))
+
+    foreign = first.cursor
+    assert not second.resumable(foreign)
+    assert second.changes_since(foreign)['reset']
+
+    # A cursor taken from the worker serving the socket settles into deltas
+    own = second.cursor
+    for log in (first, second):
+        log.apply('ADDED', 'b', alert('B'))
+    page = second.changes_since(own)
+    assert not page['reset']
+    assert [item['id'] for item in page['alerts']] == ['b']
+    assert second.changes_since(page['cursor'])['alerts'] == []
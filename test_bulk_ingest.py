@@ -0,0 +1,98 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from bulk_ingest import MAX_BATCH_WRITES, BulkIngester, parse_reports
+from repositories import AlertRepository, CrimeRepository, SqliteStorage
+
+
+def report(i, **fields):
+    return {'type': 'theft', 'severity': 'medium', 'location': f'Block {i}, Hyderabad',
+            'description': f'report {i}', 'latitude': 17.38 + i * 1e-4, 'longitude': 78.48, **fields}
+
+
+class CountingStorage(SqliteStorage):
+    """SqliteStorage that records the number of writes in every committed batch"""
+
+    def __init__(self):
+        super().__init__()
+        self.batch_sizes = []
+
+    def batch(self):
+        batch = super().batch()
+        commit = batch.commit
+
+        def counted():
+            self.batch_sizes.append(len(batch._writes))
+            commit()
+        batch.commit = counted
+        return batch
+
+
+def ingester(storage, **kwargs):
+    return BulkIngester(CrimeRepository(storage), AlertRepository(storage), **kwargs)
+
+
+def test_parse_reports_formats():
+    reports = [report(0), report(1)]
+    assert parse_reports(json.dumps(reports), 'json') == reports
+    assert parse_reports(json.dumps({'reports': reports}), 'json') == reports
+    assert parse_reports('\n'.join(json.dumps(r) for r in reports) + '\n\n', 'jsonl') == reports
+
+    text = 'type,severity,location,description,latitude,longitude\n' \
+           'theft,high,"Block 1, Hyderabad",bike stolen,17.38,78.48\n'
+    assert parse_reports(text, 'csv') == [{
+        'type': 'theft', 'severity': 'high', 'location': 'Block 1, Hyderabad',
+        'description': 'bike stolen', 'latitude': '17.38', 'longitude': '78.48'
+    }]
+
+    with pytest.raises(ValueError):
+        parse_reports('"theft"', 'json')
+    with pytest.raises(ValueError):
+        parse_reports('', 'xml')
+
+
+def test_batches_stay_within_the_write_limit():
+    storage = CountingStorage()
+    result = ingester(storage, concurrency=1).ingest([report(i) for i in range(MAX_BATCH_WRITES + 1)])
+
+    # a crime and its alert share a batch, so a full batch holds 250 reports
+    assert storage.batch_sizes == [MAX_BATCH_WRITES, MAX_BATCH_WRITES, 2]
+    assert (result['written'], result['alerts_created'], result['batches']) == (501, 501, 3)
+    assert len(CrimeRepository(storage).all()) == 501
+
+    storage = CountingStorage()
+    result = ingester(storage, batch_size=100).ingest([report(i) for i in range(250)], create_alerts=False)
+    assert sorted(storage.batch_sizes) == [50, 100, 100]
+    assert result['alerts_created'] == 0
+
+    with pytest.raises(ValueError):
+        ingester(storage, batch_size=MAX_BATCH_WRITES + 1)
+
+
+def test_invalid_rows_are_reported_by_index():
+    reports = [
+        report(0),
+        report(1, latitude='north'),
+        {'type': 'theft'},
+        report(3, latitude=91),
+        report(4, timestamp='yesterday'),
+        'not an object',
+        report(6, timestamp='2024-03-01T10:00:00Z'),
+    ]
+    storage = SqliteStorage()
+    result = ingester(storage).ingest(reports)
+
+    assert (result['received'], result['written']) == (7, 2)
+    errors = {error['index']: error['error'] for error in result['rejected']}
+    assert sorted(errors) == [1, 2, 3, 4, 5]
+    assert errors[1] == 'latitude and longitude must be numbers'
+    assert errors[2].startswith('Missing required fields: severity')
+    assert errors[3] == 'latitude/longitude out of range'
+    assert errors[4].startswith('Invalid timestamp')
+    assert errors[5] == 'Report must be an object'
+
+    kept = [crime for _, crime in CrimeRepository(storage).all() if crime['description'] == 'report 6']
+    assert kept[0]['timestamp'] == datetime(2024, 3, 1, 10, 0)
+    assert kept[0]['location_name'] == 'Block 6, Hyderabad'
@@ -0,0 +1,95 @@
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+from crime_rollups import CrimeRollupStore
+from crime_stats import CrimeStatsAggregator
+
+TYPES = ['theft', 'assault', 'burglary', 'vandalism']
+START = datetime(2024, 3, 1)
+
+
+def random_crimes(count, seed=3):
+    rng = random.Random(seed)
+    return [{
+        'id': f'crime-{i}',
+        'type': rng.choice(TYPES),
+        'severity': rng.choice(['low', 'medium', 'high']),
+        'latitude': 37.7 + rng.uniform(0, 0.1),
+        'longitude': -122.5 + rng.uniform(0, 0.1),
+        'timestamp': START + timedelta(seconds=rng.randrange(20 * 86400))
+    } for i in range(count)]
+
+
+def brute_force(crimes, start, end):
+    """Counts over whole hours, start hour through end hour inclusive"""
+    start = start.replace(minute=0, second=0, microsecond=0)
+    end = end.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    by_type = Counter(crime['type'] for crime in crimes if start <= crime['timestamp'] < end)
+    return {'total_crimes': sum(by_type.values()), 'by_type': dict(by_type)}
+
+
+def test_windows_match_brute_force_count():
+    crimes = random_crimes(2000)
+    rollups = CrimeRollupStore()
+    rollups.rebuild(crimes)
+
+    rng = random.Random(5)
+    windows = [
+        (START, START + timedelta(days=20)),
+        (START + timedelta(hours=5, minutes=30), START + timedelta(hours=7, minutes=10)),
+        (START + timedelta(days=2), START + timedelta(days=3)),
+        (START + timedelta(days=1, hours=23), START + timedelta(days=9, hours=1, minutes=59)),
+    ]
+    for _ in range(50):
+        start = START + timedelta(seconds=rng.randrange(20 * 86400))
+        windows.append((start, start + timedelta(seconds=rng.randrange(6 * 86400))))
+
+    for start, end in windows:
+        assert rollups.window(start, end) == brute_force(crimes, start, end), (start, end)
+
+
+def test_changes_move_crimes_between_buckets():
+    crimes = random_crimes(300)
+    rollups = CrimeRollupStore()
+    rollups.rebuild(crimes)
+
+    moved = dict(crimes[0], timestamp=START + timedelta(days=30), type='theft')
+    rollups.apply('MODIFIED', moved['id'], moved)
+    rollups.apply('REMOVED', crimes[1]['id'], None)
+    current = [moved] + crimes[2:]
+
+    end = START + timedelta(days=31)
+    assert rollups.window(START, end) == brute_force(current, START, end)
+    assert rollups.get_stats()['crimes'] == len(current)
+
+
+def test_query_groups_by_cell():
+    crimes = random_crimes(500)
+    rollups = CrimeRollupStore(cell_size=0.05)
+    rollups.rebuild(crimes)
+    end = START + timedelta(days=20)
+
+    by_cell = rollups.query(START, end, group_by=('cell',))
+    assert sum(by_cell.values()) == len(crimes)
+    top = rollups.top_cells(START, end, limit=2)
+    assert [cell['count'] for cell in top] == sorted(by_cell.values(), reverse=True)[:2]
+
+
+def test_type_counts_match_the_aggregator_across_case():
+    crimes = [
+        {'id': 'a', 'type': 'Theft', 'severity': 'High', 'timestamp': START},
+        {'id': 'b', 'type': 'theft', 'severity': 'low', 'timestamp': START},
+        {'id': 'c', 'type': 'THEFT ', 'timestamp': START},
+        {'id': 'd', 'type': 'Assault', 'timestamp': START},
+        {'id': 'e', 'timestamp': START},
+    ]
+    rollups = CrimeRollupStore()
+    rollups.rebuild(crimes)
+    aggregator = CrimeStatsAggregator()
+    aggregator.rebuild(crimes)
+
+    expected = {'theft': 3, 'assault': 1, 'other': 1}
+    assert rollups.window(START, START)['by_type'] == expected
+    assert aggregator.snapshot()['by_type'] == expected
+    assert aggregator.snapshot()['by_severity'] == {'high': 1, 'medium': 3, 'low': 1}
@@ -0,0 +1,121 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from crime_store import CrimeStore
+from repositories import CrimeRepository, SqliteStorage
+
+
+def crime(hours_ago, **fields):
+    return {'type': 'theft', 'latitude': 37.77, 'longitude': -122.42,
+            'timestamp': datetime.utcnow() - timedelta(hours=hours_ago), **fields}
+
+
+def test_listener_mode_applies_changes(tmp_path):
+    repo = CrimeRepository(SqliteStorage(str(tmp_path / 'crimes.db')))
+    repo.save('a', crime(2))
+    store = CrimeStore(repo, mode='listener').start()
+    changes = []
+    store.subscribe(lambda change_type, crime_id, new, old: changes.append((change_type, crime_id)))
+
+    repo.save('b', crime(1))
+    repo.delete('a')
+    assert [c['id'] for c in store.all()] == ['b']
+    assert changes == [('ADDED', 'b'), ('REMOVED', 'a')]
+    assert store.get_stats()['misses'] == 0
+
+
+def test_quiet_listener_keeps_serving_from_memory(tmp_path):
+    repo = CrimeRepository(SqliteStorage(str(tmp_path / 'crimes.db')))
+    repo.save('a', crime(2))
+    store = CrimeStore(repo, mode='listener', max_staleness=0.01, reconcile_interval=0.01).start()
+    repo.all = repo.since = None   # any poll or reconcile would now fail
+
+    time.sleep(0.05)
+    assert store.get('a') is not None
+    stats = store.get_stats()
+    assert stats['misses'] == 0 and stats['reconciles'] == 0
+
+
+def test_listener_error_forces_a_full_reload(tmp_path):
+    path = str(tmp_path / 'crimes.db')
+    repo = CrimeRepository(SqliteStorage(path))
+    repo.save('a', crime(2))
+    store = CrimeStore(repo, mode='listener', max_staleness=3600).start()
+
+    other = CrimeRepository(SqliteStorage(path))
+    other.save('a', crime(5, type='assault'))   # older timestamp, invisible to since()
+    store._on_changes([('MODIFIED', 'a')])      # malformed snapshot
+    stats = store.get_stats()
+    assert stats['listener_errors'] == 1 and stats['listener_failed']
+
+    assert store.get('a')['type'] == 'assault'
+    stats = store.get_stats()
+    assert not stats['listener_failed']
+    assert stats['reconciles'] == 1
+
+
+def test_poll_mode_sees_other_writers(tmp_path):
+    path = str(tmp_path / 'crimes.db')
+    repo = CrimeRepository(SqliteStorage(path))
+    repo.save('a', crime(2))
+    store = CrimeStore(repo, mode='poll', max_staleness=0).start()
+
+    CrimeRepository(SqliteStorage(path)).save('b', crime(1))
+    assert sorted(c['id'] for c in store.all()) == ['a', 'b']
+
+
+def test_reload_keeps_changes_made_during_its_read(tmp_path):
+    repo = CrimeRepository(SqliteStorage(str(tmp_path / 'crimes.db')))
+    repo.save('a', crime(2))
+    repo.save('b', crime(3))
+    store = CrimeStore(repo, mode='poll').start()
+
+    read_all = repo.all
+
+    def all_then_write():
+        docs = list(read_all())
+        # Writes that land after the read but before the reload applies it
+        store.put('a', crime(2, type='assault'))
+        store.put('c', crime(1))
+        store.remove('b')
+        return docs
+
+    repo.all = all_then_write
+    store.reload()
+    assert store.get('a')['type'] == 'assault'
+    assert store.get('c') is not None
+    assert store.get('b') is None
+
+    # Later reloads reconcile those documents again
+    repo.all = read_all
+    store.reload()
+    assert store.get('a')['type'] == 'theft'
+    assert store.get('c') is None
+    assert store.get('b') is not None
+
+
+def test_concurrent_stale_reads_share_one_poll(tmp_path):
+    repo = CrimeRepository(SqliteStorage(str(tmp_path / 'crimes.db')))
+    repo.save('a', crime(2))
+    store = CrimeStore(repo, mode='poll', max_staleness=0.05).start()
+
+    polls = []
+    poll = repo.since
+
+    def slow_since(start):
+        polls.append(start)
+        time.sleep(0.1)
+        return poll(start)
+
+    repo.since = slow_since
+    time.sleep(0.1)
+    readers = [threading.Thread(target=store.all) for _ in range(8)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+
+    assert len(polls) == 1
+    stats = store.get_stats()
+    assert stats['misses'] == 8 and stats['hits'] == 0
@@ -0,0 +1,85 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from danger_costs import EdgeDangerCosts
+from road_graph import RoadGraph
+
+
+def grid_graph(size=12, step=0.02):
+    lats, lngs, edges = [], [], []
+    for row in range(size):
+        for col in range(size):
+            lats.append(37.77 + row * step)
+            lngs.append(-122.42 + col * step)
+            node = row * size + col
+            if col + 1 < size:
+                edges += [(node, node + 1), (node + 1, node)]
+            if row + 1 < size:
+                edges += [(node, node + size), (node + size, node)]
+    return RoadGraph.from_edges(lats, lngs, edges)
+
+
+def random_crime(rng, crime_id):
+    return {
+        'id': crime_id,
+        'latitude': 37.77 + rng.uniform(0, 0.22),
+        'longitude': -122.42 + rng.uniform(0, 0.22),
+        'severity': rng.randint(1, 5),
+        'timestamp': datetime.utcnow() - timedelta(days=rng.uniform(0, 60))
+    }
+
+
+def assert_same_costs(incremental, rebuilt):
+    # Penalties run to ~1e8, so adding and withdrawing them leaves rounding residue near zero
+    assert np.allclose(incremental.penalty_sum, rebuilt.penalty_sum, atol=1e-3)
+    assert np.array_equal(incremental.barrier_count, rebuilt.barrier_count)
+    assert np.allclose(incremental.edge_weights(), rebuilt.edge_weights(), atol=1e-3)
+    assert incremental._thresholds == rebuilt._thresholds
+
+
+def test_incremental_changes_match_a_rebuild():
+    graph = grid_graph()
+    rng = random.Random(11)
+    costs = EdgeDangerCosts(graph)
+    current = {}
+    for step in range(300):
+        action = rng.random()
+        if current and action < 0.2:
+            crime_id = rng.choice(sorted(current))
+            del current[crime_id]
+            costs.apply('REMOVED', crime_id, None)
+        elif current and action < 0.45:
+            crime_id = rng.choice(sorted(current))
+            current[crime_id] = random_crime(rng, crime_id)
+            costs.apply('MODIFIED', crime_id, current[crime_id])
+        else:
+            crime_id = f'crime-{step}'
+            current[crime_id] = random_crime(rng, crime_id)
+            costs.apply('ADDED', crime_id, current[crime_id])
+
+        if step % 50 == 49:
+            rebuilt = EdgeDangerCosts(graph)
+            rebuilt.load(list(current.values()))
+            assert_same_costs(costs, rebuilt)
+            # Some edges are blocked and some only penalized, so both counters are exercised
+            assert 0 < (costs.barrier_count > 0).sum() < graph.num_edges
+            assert len(costs) == len(current)
+
+
+def test_crimes_outside_the_window_do_not_count():
+    graph = grid_graph(size=4)
+    costs = EdgeDangerCosts(graph, days=30)
+    old = dict(random_crime(random.Random(1), 'old'), timestamp=datetime.utcnow() - timedelta(days=31))
+    costs.apply('ADDED', 'old', old)
+    assert len(costs) == 0
+    assert not costs.penalty_sum.any() and not costs.barrier_count.any()
+
+    # A change that moves a crime out of the window withdraws it
+    recent = dict(old, timestamp=datetime.utcnow())
+    costs.apply('MODIFIED', 'old', recent)
+    assert len(costs) == 1
+    costs.apply('MODIFIED', 'old', old)
+    assert len(costs) == 0
+    assert np.allclose(costs.penalty_sum, 0) and not costs.barrier_count.any()
@@ -0,0 +1,98 @@
+import math
+
+import numpy as np
+import pytest
+
+from geo_math import (ARC_KM_PER_DEGREE, distance_km, equirectangular_km, grid_bucket, haversine_km,
+                      haversine_m, point_to_polyline_km, points_to_segments_dist, record_coordinates,
+                      vincenty_km)
+
+
+def test_haversine_reference_distances():
+    assert haversine_km(0, 0, 0, 1) == pytest.approx(ARC_KM_PER_DEGREE)
+    assert haversine_km(0, 0, 0, 180) == pytest.approx(math.pi * 6371.0)
+    assert haversine_km(90, 0, -90, 0) == pytest.approx(math.pi * 6371.0)
+    assert haversine_m(17.385, 78.4867, 17.4474, 78.3762) == pytest.approx(
+        1000 * haversine_km(17.385, 78.4867, 17.4474, 78.3762))
+
+    lats = np.array([17.385, 17.4474, -33.9])
+    lngs = np.array([78.4867, 78.3762, 151.2])
+    assert haversine_km(17.385, 78.4867, lats, lngs).shape == (3,)
+    assert haversine_km(17.385, 78.4867, lats, lngs)[0] == 0
+
+
+def test_vincenty_matches_the_published_geodesic():
+    # Flinders Peak to Buninyong, the example in Vincenty (1975): 54972.271 m
+    flinders = (-(37 + 57 / 60 + 3.72030 / 3600), 144 + 25 / 60 + 29.52440 / 3600)
+    buninyong = (-(37 + 39 / 60 + 10.15610 / 3600), 143 + 55 / 60 + 35.38390 / 3600)
+    assert vincenty_km(*flinders, *buninyong) == pytest.approx(54.972271, abs=1e-6)
+
+    # a degree of the equator on WGS84
+    assert vincenty_km(0, 0, 0, 1) == pytest.approx(111.319491, abs=1e-6)
+    assert vincenty_km(10, 20, 10, 20) == 0
+    # nearly antipodal pairs fall back to haversine instead of returning NaN
+    antipodal = vincenty_km(0, 0, 0.5, 179.7)
+    assert np.isfinite(antipodal) and antipodal == pytest.approx(haversine_km(0, 0, 0.5, 179.7), rel=0.01)
+
+
+def test_fast_modes_stay_close_to_haversine():
+    rng = np.random.default_rng(3)
+    lat = rng.uniform(-70, 70, 2000)
+    lng = rng.uniform(-180, 180, 2000)
+    bearing = rng.uniform(0, 2 * np.pi, 2000)
+    reach = rng.uniform(0.1, 100, 2000) / ARC_KM_PER_DEGREE
+    lat2 = np.clip(lat + reach * np.cos(bearing), -70, 70)
+    lng2 = lng + reach * np.sin(bearing) / np.cos(np.radians(lat))
+
+    exact = haversine_km(lat, lng, lat2, lng2)
+    assert np.allclose(equirectangular_km(lat, lng, lat2, lng2), exact, rtol=2e-4)
+    assert np.allclose(vincenty_km(lat, lng, lat2, lng2), exact, rtol=6e-3)
+    # longitudes wrap across the antimeridian
+    assert equirectangular_km(0, 179.9, 0, -179.9) == pytest.approx(0.2 * ARC_KM_PER_DEGREE)
+
+    for mode in ('fast', 'haversine', 'ellipsoid'):
+        assert distance_km(17.385, 78.4867, 17.4474, 78.3762, mode=mode) == pytest.approx(13.62, abs=0.01)
+    with pytest.raises(ValueError):
+        distance_km(0, 0, 1, 1, mode='exact')
+
+
+def test_polyline_distances_match_dense_sampling():
+    line_lats = np.array([17.35, 17.38, 17.40, 17.46])
+    line_lngs = np.array([78.40, 78.45, 78.50, 78.52])
+    t = np.linspace(0, 1, 2001)[:, None]
+    dense_lats = (line_lats[:-1] + t * np.diff(line_lats)).ravel()
+    dense_lngs = (line_lngs[:-1] + t * np.diff(line_lngs)).ravel()
+
+    rng = np.random.default_rng(5)
+    lats, lngs = rng.uniform(17.3, 17.5, 200), rng.uniform(78.35, 78.6, 200)
+    sampled = np.array([equirectangular_km(lat, lng, dense_lats, dense_lngs).min() for lat, lng in zip(lats, lngs)])
+    assert np.allclose(point_to_polyline_km(lats, lngs, line_lats, line_lngs), sampled, atol=2e-3)
+
+    assert point_to_polyline_km([17.4], [78.5], [17.4], [78.6])[0] == pytest.approx(
+        equirectangular_km(17.4, 78.5, 17.4, 78.6))
+    assert np.isinf(point_to_polyline_km([17.4], [78.5], [], [])).all()
+
+
+def test_points_to_segments_dist_is_planar_degrees():
+    dist = points_to_segments_dist(np.array([0.0, 1.0, 3.0]), np.array([1.0, 0.5, 4.0]),
+                                   np.array([0.0, 0.0]), np.array([0.0, 0.0]),
+                                   np.array([0.0, 0.0]), np.array([2.0, 0.0]))
+    # segment 0 runs along the equator from lng 0 to 2; segment 1 is the point (0, 0)
+    assert dist.shape == (3, 2)
+    assert np.allclose(dist[:, 0], [0.0, 1.0, np.hypot(3, 2)])
+    assert np.allclose(dist[:, 1], [1.0, np.hypot(1, 0.5), 5.0])
+
+
+def test_record_coordinates_and_grid_bucket():
+    lats, lngs = record_coordinates([
+        {'latitude': '17.38', 'longitude': 78.48},
+        {'latitude': None, 'longitude': 78.48},
+        {'longitude': 78.48},
+    ])
+    assert lats[0] == 17.38 and lngs[0] == 78.48
+    assert np.isnan(lats[1:]).all() and np.isnan(lngs[1:]).all()
+
+    cell_lats, cell_lngs, inverse = grid_bucket([17.3851, 17.3849, 17.4], [78.4867, 78.4871, 78.5], decimals=3)
+    assert inverse[0] == inverse[1] != inverse[2]
+    assert (cell_lats[inverse[0]], cell_lngs[inverse[0]]) == (17.385, 78.487)
+    assert grid_bucket([], [])[2].size == 0
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import geohash_index
+from geo_math import haversine_km
+
+
+def test_encode_known_geohashes():
+    assert geohash_index.encode(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+    assert geohash_index.encode(42.6, -5.6, 5) == 'ezs42'
+    assert geohash_index.encode(17.385, 78.4867).startswith(geohash_index.encode(17.385, 78.4867, 6))
+    assert geohash_index.cell_size(1) == (45.0, 45.0)
+    assert geohash_index.cell_size(2) == (5.625, 11.25)
+
+
+def in_ranges(geohash, ranges):
+    return any(start <= geohash < end for start, end in ranges)
+
+
+@pytest.mark.parametrize('lat, lng, radius_km', [
+    (17.385, 78.4867, 0.3),
+    (17.385, 78.4867, 5),
+    (37.7749, -122.4194, 40),
+    (0.0, 0.0, 2),            # meets the four top-level cells
+    (51.5, -0.0001, 1),       # straddles the prime meridian
+    (70.0, 25.0, 50),         # high latitude, wide in longitude
+    (-33.9, 151.2, 0.05),
+])
+def test_prefix_ranges_cover_every_point_in_the_circle(lat, lng, radius_km):
+    rng = np.random.default_rng(7)
+    bearing = rng.uniform(0, 2 * np.pi, 4000)
+    # points out to the circle's edge, most of them near it
+    reach = radius_km * rng.uniform(0, 1, bearing.size) ** 0.125
+    dlat = reach * np.cos(bearing) / 111.195
+    dlng = reach * np.sin(bearing) / (111.195 * np.cos(np.radians(lat + dlat)))
+    lats, lngs = lat + dlat, lng + dlng
+    inside = haversine_km(lat, lng, lats, lngs) <= radius_km
+    assert inside.sum() > 3000
+
+    for max_cells in (4, 16):
+        ranges = geohash_index.prefix_ranges(lat, lng, radius_km, max_cells)
+        missed = [(p_lat, p_lng) for p_lat, p_lng in zip(lats[inside], lngs[inside])
+                  if not in_ranges(geohash_index.encode(p_lat, p_lng), ranges)]
+        assert not missed, missed[:3]
+
+
+def test_cover_uses_the_finest_precision_within_max_cells():
+    precision, cells = geohash_index.cover_circle(17.385, 78.4867, 1.0, max_cells=16)
+    assert len(cells) <= 16 and all(len(cell) == precision for cell in cells)
+    finer = geohash_index.cover_circle(17.385, 78.4867, 1.0, precision=precision + 1)[1]
+    assert len(finer) > 16
+
+    ranges = geohash_index.prefix_ranges(17.385, 78.4867, 1.0)
+    assert len(ranges) <= len(cells)
+    assert all(end.endswith(geohash_index.RANGE_END) for _, end in ranges)
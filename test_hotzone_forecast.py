@@ -0,0 +1,100 @@
+import math
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from hotzone_forecast import ALPHA, BETA, PHI, SEASONAL_PRIOR, CellSeries, build_series, forecast_counts, predict_hotzones
+
+
+def random_series(cells=6, days=40, seed=4):
+    rng = np.random.default_rng(seed)
+    counts = rng.poisson(rng.uniform(0, 3, (cells, 1)) * (1 + 0.5 * np.sin(np.arange(days) / 2)))
+    counts[0] = 0   # a cell with no history
+    return CellSeries(np.arange(cells) * 0.01, np.zeros(cells), counts.astype(float),
+                      date(2024, 3, 4), [None] * cells, np.ones(cells))
+
+
+def loop_ewma(row):
+    level = sum(row[:7]) / len(row[:7])
+    for count in row:
+        level = ALPHA * count + (1 - ALPHA) * level
+    return level
+
+
+def loop_holt(row, horizon):
+    level, trend = sum(row[:7]) / len(row[:7]), 0.0
+    for count in row:
+        previous = level
+        level = ALPHA * count + (1 - ALPHA) * (level + PHI * trend)
+        trend = BETA * (level - previous) + (1 - BETA) * PHI * trend
+    return [max(level + sum(PHI ** k for k in range(1, h + 1)) * trend, 0) for h in range(1, horizon + 1)]
+
+
+def loop_weekday_factors(series, cell):
+    days = [(series.first_day + timedelta(days=d)).weekday() for d in range(series.counts.shape[1])]
+    days_per_weekday = [days.count(w) for w in range(7)]
+    city = [sum(series.counts[:, d].sum() for d, w in enumerate(days) if w == weekday) / max(days_per_weekday[weekday], 1)
+            for weekday in range(7)]
+    city_factors = [c / (sum(city) / 7) for c in city]
+
+    row = series.counts[cell].tolist()
+    rate = sum(row) / len(row)
+    if rate == 0:
+        return city_factors
+    prior = SEASONAL_PRIOR / 7 * rate
+    return [(sum(count for count, w in zip(row, days) if w == weekday) + prior * city_factors[weekday])
+            / (rate * days_per_weekday[weekday] + prior) for weekday in range(7)]
+
+
+@pytest.mark.parametrize('model', ['ewma', 'holt', 'seasonal'])
+def test_vectorized_smoothing_matches_a_per_cell_loop(model):
+    series = random_series()
+    horizon = 10
+    forecast = forecast_counts(series, horizon, model)
+    assert forecast.shape == (len(series), horizon)
+
+    for cell in range(len(series)):
+        row = series.counts[cell].tolist()
+        if model == 'ewma':
+            expected = [loop_ewma(row)] * horizon
+        elif model == 'holt':
+            expected = loop_holt(row, horizon)
+        else:
+            factors = loop_weekday_factors(series, cell)
+            weekday = [(series.first_day + timedelta(days=d)).weekday() for d in range(len(row))]
+            level = loop_ewma([count / max(factors[w], 1e-3) for count, w in zip(row, weekday)])
+            last = series.first_day + timedelta(days=len(row) - 1)
+            expected = [level * factors[(last + timedelta(days=h)).weekday()] for h in range(1, horizon + 1)]
+        assert np.allclose(forecast[cell], expected), (model, cell)
+
+
+def test_page_methods_are_served_by_smoothing_models():
+    now = datetime(2024, 5, 1, 12, 0)
+    crimes = [
+        {'type': 'theft', 'severity': 'high', 'latitude': 17.38 + 0.01 * (i % 3), 'longitude': 78.48,
+         'timestamp': now - timedelta(days=1 + i % 30, hours=i % 5)}
+        for i in range(200)
+    ]
+    series = build_series(crimes, now.date() - timedelta(days=1))
+
+    for method, model in [('lstm', 'seasonal'), ('prophet', 'seasonal'), ('arima', 'holt')]:
+        predictions, metadata = predict_hotzones(crimes, days=5, method=method, now=now)
+        assert metadata['model'] == model
+        assert method in metadata['model_note'] and model in metadata['model_note']
+        assert predictions == predict_hotzones(None, days=5, method=model, now=now, series=series)[0]
+
+    _, metadata = predict_hotzones(crimes, days=5, method='ewma', now=now)
+    assert metadata['model_note'] == "vectorized 'ewma' smoothing model"
+    with pytest.raises(ValueError):
+        predict_hotzones(crimes, method='xgboost', now=now)
+
+
+def test_risk_is_the_chance_of_at_least_one_crime():
+    now = datetime(2024, 5, 1, 12, 0)
+    crimes = [{'type': 'theft', 'latitude': 17.38, 'longitude': 78.48, 'timestamp': now - timedelta(days=d)}
+              for d in range(1, 60) for _ in range(2)]
+    predictions, metadata = predict_hotzones(crimes, days=3, method='ewma', now=now)
+    assert metadata['cells'] == 1 and len(predictions) == 3
+    for prediction in predictions:
+        assert prediction['risk_score'] == round(1 - math.exp(-prediction['predicted_crimes']), 2)
@@ -0,0 +1,129 @@
+import threading
+import time
+
+from job_pipeline import JobPipeline
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_failed_stage_is_retried_with_backoff():
+    pipeline = JobPipeline(workers=2, backoff=0.05)
+    attempts, ran = [], []
+
+    def flaky(context):
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise RuntimeError('storage unavailable')
+
+    pipeline.register_stage('flaky', flaky)
+    pipeline.register_stage('after', lambda context: ran.append(context['n']))
+    assert pipeline.submit(['flaky', 'after'], {'n': 1}) is not None
+    wait_for(lambda: pipeline.get_stats()['completed'] == 1)
+    pipeline.stop()
+
+    # Backoff doubles from 0.05s, jittered down to half
+    assert attempts[1] - attempts[0] >= 0.025
+    assert attempts[2] - attempts[1] >= 0.05
+    assert ran == [1]
+    stats = pipeline.get_stats()['stages']['flaky']
+    assert (stats['retried'], stats['succeeded'], stats['failed']) == (2, 1, 0)
+
+
+def test_job_is_abandoned_after_max_attempts():
+    pipeline = JobPipeline(workers=1, max_attempts=3, backoff=0.01)
+    calls, ran = [], []
+
+    def broken(context):
+        calls.append(1)
+        raise RuntimeError('always fails')
+
+    pipeline.register_stage('broken', broken)
+    pipeline.register_stage('after', lambda context: ran.append(1))
+    pipeline.submit(['broken', 'after'], {})
+    wait_for(lambda: pipeline.get_stats()['abandoned'] == 1)
+    pipeline.stop()
+
+    assert len(calls) == 3
+    assert ran == []
+    stats = pipeline.get_stats()
+    assert stats['completed'] == 0
+    assert stats['stages']['broken']['failed'] == 1
+
+
+def test_full_queue_rejects_submissions():
+    pipeline = JobPipeline(workers=0, max_queue=2)
+    pipeline.register_stage('noop', lambda context: None)
+    assert pipeline.submit(['noop'], {}) is not None
+    assert pipeline.submit(['noop'], {}) is not None
+    assert pipeline.submit(['noop'], {}) is None
+
+    stats = pipeline.get_stats()
+    assert (stats['submitted'], stats['rejected'], stats['queue_depth']) == (2, 1, 2)
+
+
+def test_retries_are_not_dropped_by_a_full_queue():
+    pipeline = JobPipeline(workers=1, max_queue=1, backoff=0.01)
+    release = threading.Event()
+    failures = []
+
+    def stage(context):
+        if context['n'] == 0 and not failures:
+            failures.append(1)
+            raise RuntimeError('retry me')
+        if context['n'] == 1:
+            release.wait(5)
+
+    pipeline.register_stage('stage', stage)
+    pipeline.submit(['stage'], {'n': 0})
+    wait_for(lambda: failures)
+    pipeline.submit(['stage'], {'n': 1})     # holds the only worker
+    wait_for(lambda: pipeline.get_stats()['in_flight'] == 1)
+    pipeline.submit(['stage'], {'n': 2})     # fills the queue while job 0 waits to retry
+    release.set()
+    wait_for(lambda: pipeline.get_stats()['completed'] == 3)
+    pipeline.stop()
+
+
+def test_run_inline_continues_past_failed_stages():
+    pipeline = JobPipeline(workers=0)
+    ran = []
+
+    def broken(context):
+        raise RuntimeError('no police API')
+
+    pipeline.register_stage('stats', lambda context: ran.append('stats'))
+    pipeline.register_stage('police', broken)
+    pipeline.register_stage('alert', lambda context: ran.append('alert'))
+
+    assert pipeline.run_inline(['stats', 'police', 'alert'], {}) == ['police']
+    assert ran == ['stats', 'alert']
+    stages = pipeline.get_stats()['stages']
+    assert stages['police']['failed'] == 1 and stages['alert']['succeeded'] == 1
+
+
+def test_stop_drains_queued_jobs_and_retries():
+    pipeline = JobPipeline(workers=2, backoff=0.02)
+    done, failed_once = [], set()
+
+    def slow(context):
+        time.sleep(0.02)
+        if context['n'] % 3 == 0 and context['n'] not in failed_once:
+            failed_once.add(context['n'])
+            raise RuntimeError('retry me')
+        done.append(context['n'])
+
+    pipeline.register_stage('slow', slow)
+    for n in range(10):
+        pipeline.submit(['slow'], {'n': n})
+    pipeline.stop(timeout=10)
+
+    assert sorted(done) == list(range(10))
+    assert pipeline.submit(['slow'], {'n': 10}) is None
+    for thread in pipeline._threads:
+        thread.join(1)
+        assert not thread.is_alive()
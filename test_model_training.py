@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+
+import pytest
+
+from model_training import FINISHED, TrainingService
+
+VALUES = [float(20 + (i % 7) * 3 + (i % 3)) for i in range(60)]
+
+
+def wait_for(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = condition()
+        if result:
+            return result
+        time.sleep(0.02)
+    raise AssertionError('timed out waiting')
+
+
+def finished(service, job_id):
+    return wait_for(lambda: service.status(job_id) if service.status(job_id)['status'] in FINISHED else None)
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    return str(tmp_path / 'models')
+
+
+def test_trained_model_is_installed_then_moved_into_place(model_dir):
+    installed = []
+    service = TrainingService(model_dir, installers={'arima': lambda job, paths: installed.append(paths)})
+    try:
+        status = finished(service, service.submit('arima', VALUES))
+    finally:
+        service.stop()
+
+    assert status['status'] == 'succeeded', status['error']
+    assert status['installed']
+    assert not os.path.exists(installed[0]['arima_model.joblib'])   # the staged copy was moved
+    assert status['artifacts'] == [os.path.join(model_dir, 'arima_model.joblib')]
+    assert os.path.exists(status['artifacts'][0])
+    assert not os.listdir(os.path.join(model_dir, 'jobs'))
+
+
+def test_rejected_model_keeps_previous_artifacts(model_dir):
+    os.makedirs(model_dir)
+    previous = os.path.join(model_dir, 'arima_model.joblib')
+    with open(previous, 'w') as f:
+        f.write('previous')
+
+    def reject(job, paths):
+        raise ValueError('order mismatch')
+
+    service = TrainingService(model_dir, installers={'arima': reject})
+    try:
+        status = finished(service, service.submit('arima', VALUES))
+    finally:
+        service.stop()
+
+    assert status['status'] == 'failed'
+    assert status['error'] == 'order mismatch'
+    assert not status['installed']
+    with open(previous) as f:
+        assert f.read() == 'previous'
+    assert service.get_stats()['failed'] == 1
+
+
+def test_timeout_kills_the_worker(model_dir):
+    service = TrainingService(model_dir, timeout=0.01)
+    try:
+        status = finished(service, service.submit('arima', VALUES))
+    finally:
+        service.stop()
+
+    assert status['status'] == 'failed'
+    assert 'timed out' in status['error']
+    assert not os.path.exists(os.path.join(model_dir, 'arima_model.joblib'))
+
+
+def test_cancel_running_and_queued_jobs(model_dir):
+    service = TrainingService(model_dir, workers=1)
+    try:
+        running = service.submit('arima', VALUES)
+        queued = service.submit('arima', VALUES)
+        wait_for(lambda: service._jobs[running].process is not None)
+
+        assert service.cancel(queued)
+        assert service.cancel(running)
+        assert not service.cancel(running)
+        assert not service.cancel('unknown')
+
+        # The worker thread is free again for new jobs
+        status = finished(service, service.submit('arima', VALUES))
+    finally:
+        service.stop()
+
+    assert service.status(running)['status'] == 'cancelled'
+    assert service.status(queued)['status'] == 'cancelled'
+    assert status['status'] == 'succeeded'
+    assert service.get_stats()['cancelled'] == 2
+
+
+def test_submit_validates_model_and_params(model_dir):
+    service = TrainingService(model_dir)
+    try:
+        with pytest.raises(ValueError):
+            service.submit('prophet', VALUES)
+        with pytest.raises(ValueError):
+            service.submit('arima', VALUES, epochs=5)
+    finally:
+        service.stop()
+
+
+def test_job_cannot_be_cancelled_while_installing(model_dir):
+    installing = threading.Event()
+    release = threading.Event()
+
+    def install(job, paths):
+        installing.set()
+        release.wait(30)
+
+    service = TrainingService(model_dir, installers={'arima': install})
+    try:
+        job_id = service.submit('arima', VALUES)
+        assert installing.wait(60)
+        assert service.status(job_id)['status'] == 'installing'
+        assert not service.cancel(job_id)
+        release.set()
+        status = finished(service, job_id)
+    finally:
+        service.stop()
+
+    assert status['status'] == 'succeeded'
+    assert status['installed']
+    assert service.get_stats()['cancelled'] == 0
@@ -0,0 +1,110 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from crime_store import CrimeStore
+from prediction_snapshots import PredictionScheduler, SnapshotStore, snapshot_response
+from repositories import CrimeRepository, SqliteStorage
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+def test_etag_follows_entry_content_across_versions(tmp_path):
+    store = SnapshotStore(path=str(tmp_path / 'snapshot.json'))
+    store.publish({'a': [1, 2], 'b': {'x': 1}})
+    _, etag_a, _, _ = store.get('a')
+    _, etag_b, _, _ = store.get('b')
+
+    assert store.publish({'a': [1, 2], 'b': {'x': 2}}) == 2
+    entry, etag, version, _ = store.get('a')
+    assert (entry, etag, version) == ([1, 2], etag_a, 2)
+    assert store.get('b')[1] != etag_b
+    assert store.get_stats()['history'][-1]['changed_entries'] == 1
+    assert store.get('a', generated_after=datetime.utcnow() + timedelta(days=1)) is None
+    assert store.get('missing') is None
+
+    restored = SnapshotStore(path=str(tmp_path / 'snapshot.json'))
+    assert restored.load()
+    assert restored.get('b')[1:3] == store.get('b')[1:3]
+
+
+def test_matching_if_none_match_answers_304():
+    store = SnapshotStore()
+    app = Flask(__name__)
+
+    @app.route('/entry/<key>')
+    def entry(key):
+        value, etag, version, _ = store.get(key)
+        return snapshot_response({'value': value, 'version': version}, etag)
+
+    client = app.test_client()
+    store.publish({'a': [1, 2]})
+    first = client.get('/entry/a')
+    assert first.status_code == 200 and first.get_json()['value'] == [1, 2]
+    etag = first.headers['ETag']
+
+    assert client.get('/entry/a', headers={'If-None-Match': etag}).status_code == 304
+    store.publish({'a': [1, 2]})
+    assert client.get('/entry/a', headers={'If-None-Match': etag}).status_code == 304
+    store.publish({'a': [3]})
+    changed = client.get('/entry/a', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.get_json()['value'] == [3]
+    assert changed.headers['ETag'] != etag
+
+
+def test_store_change_replaces_the_snapshot(tmp_path):
+    repo = CrimeRepository(SqliteStorage(str(tmp_path / 'crimes.db')))
+    crimes = CrimeStore(repo, mode='listener').start()
+    store = SnapshotStore()
+    scheduler = PredictionScheduler(lambda: {'count': len(crimes.all())}, store, interval=3600, min_changes=2)
+    crimes.subscribe(scheduler.note_change)
+    scheduler.start()
+    try:
+        wait_for(lambda: store.version == 1)
+        assert store.get('count')[0] == 0
+
+        repo.save('a', {'type': 'theft', 'latitude': 37.77, 'longitude': -122.42,
+                        'timestamp': datetime.utcnow()})
+        time.sleep(0.05)
+        assert store.version == 1            # below min_changes
+        repo.save('b', {'type': 'assault', 'latitude': 37.78, 'longitude': -122.41,
+                        'timestamp': datetime.utcnow()})
+        wait_for(lambda: store.version == 2)
+        assert store.get('count')[0] == 2
+        assert store.get_stats()['history'][-1]['reason'].endswith('new crimes')
+
+        version = store.version
+        scheduler.refresh_now()
+        wait_for(lambda: store.version == version + 1)
+        assert store.get_stats()['history'][-1]['reason'] == 'requested'
+    finally:
+        scheduler.stop()
+
+
+def test_failed_compute_keeps_the_previous_snapshot():
+    store = SnapshotStore()
+    fail = threading.Event()
+
+    def compute():
+        if fail.is_set():
+            raise RuntimeError('boom')
+        return {'a': 1}
+
+    scheduler = PredictionScheduler(compute, store, interval=3600).start()
+    try:
+        wait_for(lambda: store.version == 1)
+        fail.set()
+        scheduler.refresh_now()
+        wait_for(lambda: scheduler.failures == 1)
+        entry, _, version, _ = store.get('a')
+        assert (entry, version) == (1, 1)
+        assert scheduler.get_stats()['last_error'] == 'boom'
+    finally:
+        scheduler.stop()
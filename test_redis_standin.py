@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+import socketio
+
+pytest.importorskip('redis')   # from requirements-async.txt
+
+from redis_standin import RedisStandIn
+from socket_config import make_emitter
+
+
+class RecordingManager(socketio.RedisManager):
+    """Receiving side of the queue that records emits instead of sending them to clients"""
+
+    def __init__(self, url, channel):
+        super().__init__(url, channel=channel)
+        self.received = []
+        self.arrived = threading.Event()
+
+    def _handle_emit(self, message):
+        self.received.append(message)
+        self.arrived.set()
+
+
+@pytest.fixture
+def standin():
+    server = RedisStandIn(port=0).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def receiver_for(url, channel='socketio'):
+    manager = RecordingManager(url, channel)
+    manager.set_server(socketio.Server(client_manager=manager))
+    manager.initialize()
+    return manager
+
+
+def payload(message):
+    # Newer python-socketio queues emit arguments as a list
+    data = message['data']
+    return data[0] if isinstance(data, list) else data
+
+
+def emit_until_received(emit, receiver, timeout=5.0):
+    # The receiver subscribes from a background thread; resend until it is listening
+    deadline = time.monotonic() + timeout
+    while not receiver.arrived.wait(0.1):
+        assert time.monotonic() < deadline, 'message never arrived'
+        emit()
+
+
+def test_emit_reaches_a_second_manager(standin):
+    receiver = receiver_for(standin.url)
+    sender = socketio.RedisManager(standin.url, write_only=True)
+
+    emit_until_received(
+        lambda: sender.emit('new_alert', {'id': 'a1'}, namespace='/', room='geo:9q8yy'), receiver
+    )
+    message = receiver.received[0]
+    assert (message['event'], payload(message), message['room']) == ('new_alert', {'id': 'a1'}, 'geo:9q8yy')
+
+
+def test_make_emitter_publishes_through_the_queue(standin, monkeypatch):
+    monkeypatch.setenv('SOCKETIO_MESSAGE_QUEUE', standin.url)
+    # Flask-SocketIO, as app.py runs it, queues on its own channel
+    receiver = receiver_for(standin.url, channel='flask-socketio')
+    emitter = make_emitter()
+
+    emit_until_received(lambda: emitter.emit('crime_stats_update', {'total_crimes': 3}), receiver)
+    message = receiver.received[0]
+    assert (message['event'], payload(message)) == ('crime_stats_update', {'total_crimes': 3})
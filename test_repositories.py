@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from geo_math import haversine_km
+from repositories import AlertRepository, Collection, CrimeRepository, SERVER_TIMESTAMP, SqliteStorage
+
+
+def make_crimes(repo, start):
+    points = [(37.7749, -122.4194), (37.7760, -122.4180), (37.7800, -122.4100),
+              (37.8044, -122.2712), (34.0522, -118.2437)]
+    for i, (lat, lng) in enumerate(points):
+        repo.save(f'crime-{i}', {
+            'type': 'theft', 'latitude': lat, 'longitude': lng,
+            'timestamp': start + timedelta(hours=i)
+        })
+
+
+def test_nearby_returns_candidates_within_radius():
+    repo = CrimeRepository(SqliteStorage())
+    make_crimes(repo, datetime(2024, 1, 1))
+    repo.save('no-location', {'type': 'theft', 'timestamp': datetime(2024, 1, 1)})
+
+    found = dict(repo.nearby(37.7749, -122.4194, 1.5))
+    assert set(found) == {'crime-0', 'crime-1', 'crime-2'}
+    for crime in found.values():
+        assert haversine_km(37.7749, -122.4194, crime['latitude'], crime['longitude']) < 1.5
+    assert set(dict(repo.nearby(37.7749, -122.4194, 20))) == {'crime-0', 'crime-1', 'crime-2', 'crime-3'}
+
+
+def test_nearby_follows_updates_and_deletes():
+    repo = CrimeRepository(SqliteStorage())
+    make_crimes(repo, datetime(2024, 1, 1))
+    repo.update('crime-4', {'latitude': 37.7750, 'longitude': -122.4195})
+    repo.delete('crime-0')
+    assert set(dict(repo.nearby(37.7749, -122.4194, 0.5))) == {'crime-1', 'crime-4'}
+
+
+def test_since_is_ordered_and_exclusive():
+    repo = CrimeRepository(SqliteStorage())
+    start = datetime(2024, 1, 1)
+    make_crimes(repo, start)
+    assert [doc_id for doc_id, _ in repo.since(start + timedelta(hours=2))] == ['crime-3', 'crime-4']
+    assert [doc_id for doc_id, _ in repo.since(start - timedelta(days=1))] == [f'crime-{i}' for i in range(5)]
+    assert repo.get('crime-3')['timestamp'] == start + timedelta(hours=3)
+
+
+def test_server_timestamp_and_active_alerts(tmp_path):
+    storage = SqliteStorage(str(tmp_path / 'local.db'))
+    alerts = AlertRepository(storage)
+    before = datetime.utcnow() - timedelta(seconds=1)
+    alert_id = alerts.add({'status': 'active', 'latitude': 37.77, 'longitude': -122.42,
+                           'created_at': SERVER_TIMESTAMP})
+    alerts.add({'status': 'resolved', 'latitude': 37.77, 'longitude': -122.42,
+                'created_at': SERVER_TIMESTAMP})
+
+    assert alerts.get(alert_id)['created_at'] >= before
+    assert len(alerts.since(before)) == 2
+    assert [doc_id for doc_id, _ in alerts.active_near(37.77, -122.42, 1)] == [alert_id]
+
+    # A second connection to the file sees the same documents
+    other = AlertRepository(SqliteStorage(str(tmp_path / 'local.db')))
+    assert other.get(alert_id)['status'] == 'active'
+
+
+def test_backend_missing_a_method_fails_at_construction():
+    class Incomplete(Collection):
+        def new_id(self):
+            return 'x'
+
+    with pytest.raises(TypeError, match='abstract'):
+        Incomplete()
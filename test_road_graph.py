@@ -0,0 +1,99 @@
+import heapq
+import math
+import random
+
+import numpy as np
+
+from road_graph import RoadGraph
+
+
+def random_graph(nodes=60, edges=180, seed=5):
+    rng = random.Random(seed)
+    lats = [37.75 + rng.uniform(0, 0.05) for _ in range(nodes)]
+    lngs = [-122.45 + rng.uniform(0, 0.05) for _ in range(nodes)]
+    pairs = set()
+    while len(pairs) < edges:
+        u, v = rng.randrange(nodes), rng.randrange(nodes)
+        if u != v:
+            pairs.add((u, v))
+    return RoadGraph.from_edges(lats, lngs, sorted(pairs)), sorted(pairs)
+
+
+def dijkstra(graph, source, weights):
+    best = {source: 0.0}
+    queue = [(0.0, source)]
+    while queue:
+        cost, node = heapq.heappop(queue)
+        if cost > best[node]:
+            continue
+        for edge in range(graph.indptr[node], graph.indptr[node + 1]):
+            if weights[edge] == math.inf:
+                continue
+            neighbour = int(graph.indices[edge])
+            new_cost = cost + weights[edge]
+            if new_cost < best.get(neighbour, math.inf):
+                best[neighbour] = new_cost
+                heapq.heappush(queue, (new_cost, neighbour))
+    return best
+
+
+def path_cost(graph, path, weights):
+    cost = 0.0
+    for u, v in zip(path, path[1:]):
+        edges = [e for e in range(graph.indptr[u], graph.indptr[u + 1]) if graph.indices[e] == v]
+        assert edges, (u, v)
+        cost += min(weights[e] for e in edges)
+    return cost
+
+
+def test_csr_holds_every_edge():
+    graph, pairs = random_graph()
+    rebuilt = sorted(
+        (u, int(v)) for u in range(graph.num_nodes)
+        for v in graph.indices[graph.indptr[u]:graph.indptr[u + 1]]
+    )
+    assert rebuilt == pairs
+    assert graph.num_edges == len(pairs)
+    assert np.array_equal(graph.sources, [u for u, _ in pairs])
+
+
+def test_a_star_matches_dijkstra():
+    graph, _ = random_graph()
+    rng = random.Random(9)
+    # Danger-weighted edges stay at or above their length, keeping the heuristic admissible
+    weighted = [length * (1 + 3 * rng.random()) for length in graph.lengths.tolist()]
+    for weights in (None, weighted, np.array(weighted)):
+        reference = graph.lengths.tolist() if weights is None else list(weights)
+        for source in range(0, graph.num_nodes, 7):
+            best = dijkstra(graph, source, reference)
+            for target in range(graph.num_nodes):
+                path, cost = graph.shortest_path(source, target, weights)
+                if target not in best:
+                    assert path is None and cost == math.inf
+                    continue
+                assert math.isclose(cost, best[target], rel_tol=1e-9)
+                assert path[0] == source and path[-1] == target
+                assert math.isclose(path_cost(graph, path, reference), cost, rel_tol=1e-9)
+
+
+def test_no_path_between_components():
+    # Two triangles with no edge between them
+    lats = [37.70, 37.71, 37.72, 37.80, 37.81, 37.82]
+    lngs = [-122.40, -122.41, -122.40, -122.40, -122.41, -122.40]
+    edges = [(0, 1), (1, 2), (2, 0), (3, 4), (4, 5), (5, 3)]
+    graph = RoadGraph.from_edges(lats, lngs, edges)
+
+    assert graph.shortest_path(0, 4) == (None, math.inf)
+    assert graph.shortest_path(0, 2)[0] == [0, 1, 2]   # edges are one-way
+
+
+def test_infinite_weights_block_edges():
+    lats, lngs = [37.70, 37.71, 37.72], [-122.40, -122.40, -122.40]
+    graph = RoadGraph.from_edges(lats, lngs, [(0, 1), (1, 2), (0, 2)])
+    weights = graph.lengths.tolist()
+    weights[1] = math.inf           # edges are sorted by source: (0, 1), (0, 2), (1, 2)
+    path, _ = graph.shortest_path(0, 2, weights)
+    assert path == [0, 1, 2]
+
+    weights[0] = math.inf
+    assert graph.shortest_path(0, 2, weights) == (None, math.inf)
@@ -0,0 +1,63 @@
+import math
+import random
+
+from route_scoring import score_route, score_route_loop
+from spatial_index import SpatialIndex
+
+ROUTE = [[-122.42 + 0.004 * i, 37.76 + 0.002 * i] for i in range(30)]
+
+
+def random_crimes(count, seed=7):
+    rng = random.Random(seed)
+    crimes = []
+    for _ in range(count):
+        lat = 37.76 + rng.uniform(-0.1, 0.15)
+        lng = -122.42 + rng.uniform(-0.1, 0.2)
+        crimes.append((lat, lng, rng.choice([0.5, 1.0, 2.0]), rng.uniform(0.05, 0.4)))
+    return crimes
+
+
+def assert_same_score(actual, expected):
+    penalties, score = actual
+    expected_penalties, expected_score = expected
+    assert len(penalties) == len(expected_penalties)
+    for value, expected_value in zip(penalties, expected_penalties):
+        if math.isinf(expected_value):
+            assert math.isinf(value)
+        else:
+            assert math.isclose(value, expected_value, rel_tol=1e-9)
+    if math.isinf(expected_score):
+        assert math.isinf(score)
+    else:
+        assert math.isclose(score, expected_score, rel_tol=1e-9)
+
+
+def test_score_route_matches_loop():
+    crimes = random_crimes(300)
+    assert_same_score(score_route(ROUTE, crimes), score_route_loop(ROUTE, crimes))
+
+
+def test_score_route_matches_loop_with_finite_penalties():
+    # Crimes between 0.5km and 3km off the route: buffer penalties but no barrier
+    crimes = [(lat + 0.01, lng - 0.01, 1.0, 0.4) for lng, lat in ROUTE[::3]]
+    expected = score_route_loop(ROUTE, crimes)
+    assert not math.isinf(expected[1]) and expected[1] > 0
+    assert_same_score(score_route(ROUTE, crimes), expected)
+
+
+def test_score_route_with_index_matches_loop():
+    crimes = random_crimes(500, seed=11)
+    index = SpatialIndex([crime[0] for crime in crimes], [crime[1] for crime in crimes])
+    assert_same_score(score_route(ROUTE, crimes, index=index), score_route_loop(ROUTE, crimes))
+
+
+def test_score_route_with_index_ignores_distant_crimes():
+    near = [(lat + 0.01, lng - 0.01, 1.0, 0.4) for lng, lat in ROUTE[::3]]
+    far = [(40.0 + i * 0.01, -100.0, 1.0, 0.4) for i in range(50)]
+    crimes = near + far
+    index = SpatialIndex([crime[0] for crime in crimes], [crime[1] for crime in crimes])
+    assert_same_score(score_route(ROUTE, crimes, index=index), score_route_loop(ROUTE, near))
+
+
+def test_score_route_without_segments():
+    assert score_route([[-122.42, 37.76]], random_crimes(5)) == ([], 0.0)
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from statsmodels.tsa.arima.model import ARIMA
+
+from simple_predictor import ARIMA_ORDER, SimpleCrimePredictor
+
+
+def test_daily_counts_mix_naive_and_aware_timestamps():
+    crimes = [
+        {'type': 'theft', 'timestamp': datetime(2024, 5, 1, 9, 0)},
+        {'type': 'theft', 'timestamp': datetime(2024, 5, 1, 23, 30, tzinfo=timezone.utc)},
+        {'type': 'assault', 'timestamp': '2024-05-02T08:15:00Z'},
+        {'type': 'assault', 'timestamp': datetime(2024, 5, 2, 10, 0)},
+    ]
+    counts = SimpleCrimePredictor().daily_counts(crimes)
+    assert {str(day): int(count) for day, count in counts.items()} == {'2024-05-01': 2, '2024-05-02': 2}
+
+
+def test_predict_mixed_timestamps_forecasts_the_series():
+    crimes = [
+        {'type': 'theft', 'timestamp': datetime(2024, 5, day, 12, 0, tzinfo=timezone.utc if day % 2 else None)}
+        for day in range(1, 21) for _ in range(day % 4 + 1)
+    ]
+    predictions = SimpleCrimePredictor().predict(crimes, days=3)
+    assert len(predictions) == 3
+    assert any(prediction['predicted_crimes'] > 0 for prediction in predictions)
+
+
+def crimes_for(counts, start=datetime(2024, 4, 1, 12, 0)):
+    """Crimes with counts[i] of them on day i after start"""
+    return [
+        {'type': 'theft', 'timestamp': start + timedelta(days=day, minutes=n)}
+        for day, count in enumerate(counts) for n in range(count)
+    ]
+
+
+def series(days=30, seed=2):
+    rng = np.random.default_rng(seed)
+    return [int(count) for count in 10 + 3 * np.sin(np.arange(days) / 3) + rng.integers(0, 4, days)]
+
+
+def forecast(predictions):
+    return np.array([prediction['predicted_crimes'] for prediction in predictions])
+
+
+def test_repeat_series_is_served_from_the_cache():
+    predictor = SimpleCrimePredictor()
+    crimes = crimes_for(series())
+    first = predictor.predict(crimes, days=5)
+    assert predictor.predict(list(reversed(crimes)), days=5) == first
+
+    stats = predictor.get_stats()
+    assert (stats['hits'], stats['misses'], stats['full_fits']) == (1, 1, 1)
+    predictor.predict(crimes, days=6)
+    assert predictor.get_stats()['misses'] == 2
+
+
+def test_new_days_extend_the_kept_model():
+    counts = series(34)
+    predictor = SimpleCrimePredictor(refit_every=7)
+    predictor.predict(crimes_for(counts[:30]), days=5)
+    params = predictor._base['results'].params
+
+    extended = forecast(predictor.predict(crimes_for(counts), days=5))
+    stats = predictor.get_stats()
+    assert (stats['extends'], stats['full_fits'], stats['warm_fits']) == (1, 1, 0)
+
+    # Extending equals running the fitted parameters over the whole series
+    fresh = ARIMA(np.array(counts, dtype=float), order=ARIMA_ORDER).filter(params)
+    expected = np.maximum(0, np.round(fresh.forecast(steps=5), 2))
+    assert np.allclose(extended, expected)
+
+
+def test_too_many_new_days_refit_warm_started():
+    counts = series(45)
+    predictor = SimpleCrimePredictor(refit_every=7)
+    predictor.predict(crimes_for(counts[:30]), days=5)
+    warm = forecast(predictor.predict(crimes_for(counts), days=5))
+
+    stats = predictor.get_stats()
+    assert (stats['extends'], stats['full_fits'], stats['warm_fits']) == (0, 1, 1)
+    cold = forecast(SimpleCrimePredictor().predict(crimes_for(counts), days=5))
+    assert np.allclose(warm, cold, rtol=0.05, atol=0.05)
+
+
+def test_changed_or_emptied_past_day_refits():
+    counts = series(30)
+    predictor = SimpleCrimePredictor()
+    predictor.predict(crimes_for(counts), days=5)
+
+    # Every crime of day 10 deleted, plus one new day
+    emptied = counts[:10] + [0] + counts[11:] + [counts[-1]]
+    predictor.predict(crimes_for(emptied), days=5)
+    stats = predictor.get_stats()
+    assert stats['extends'] == 0 and stats['warm_fits'] == 1
+
+    days = SimpleCrimePredictor().daily_counts(crimes_for(emptied))
+    assert len(days) == len(emptied) and int(days.iloc[10]) == 0
+
+
+def test_installed_model_serves_and_extends():
+    counts = series(31)
+    values = np.array(counts[:30], dtype=float)
+    dates = list(SimpleCrimePredictor().daily_counts(crimes_for(counts[:30])).index)
+    results = ARIMA(values, order=ARIMA_ORDER).fit()
+
+    predictor = SimpleCrimePredictor()
+    predictor.predict(crimes_for(series(20, seed=9)), days=5)
+    predictor.install_model(dates, values, results)
+    assert predictor.get_stats()['cached_forecasts'] == 0
+
+    served = forecast(predictor.predict(crimes_for(counts), days=5))
+    expected = np.maximum(0, np.round(results.extend(np.array(counts[30:], dtype=float)).forecast(steps=5), 2))
+    assert np.allclose(served, expected)
+    stats = predictor.get_stats()
+    assert (stats['installed_models'], stats['extends']) == (1, 1)
+
+    with pytest.raises(ValueError):
+        predictor.install_model(dates, values, ARIMA(values, order=(2, 0, 0)).fit())
+
+
+def test_horizons_match_separate_predictions():
+    crimes = crimes_for(series())
+    horizons = SimpleCrimePredictor().predict_horizons(crimes, (1, 7, 30))
+    assert sorted(horizons) == [1, 7, 30]
+    for days, predictions in horizons.items():
+        expected = SimpleCrimePredictor().predict(crimes, days)
+        assert np.allclose(forecast(predictions), forecast(expected))
+        assert [p['is_high_risk'] for p in predictions] == [p['is_high_risk'] for p in expected]
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from geo_math import haversine_km, points_to_segments_dist
+from route_scoring import KM_PER_DEGREE
+from spatial_index import SpatialIndex
+
+
+def points(n=3000, seed=11):
+    rng = np.random.default_rng(seed)
+    # a dense cluster plus a sparse spread, so queries cross empty and crowded cells
+    lats = np.concatenate([rng.normal(17.40, 0.02, n // 2), rng.uniform(17.0, 17.8, n - n // 2)])
+    lngs = np.concatenate([rng.normal(78.48, 0.02, n // 2), rng.uniform(78.0, 78.9, n - n // 2)])
+    return lats, lngs
+
+
+@pytest.mark.parametrize('cell_size', [0.005, 0.05])
+def test_radius_matches_brute_force(cell_size):
+    lats, lngs = points()
+    index = SpatialIndex(lats, lngs, cell_size=cell_size)
+    for lat, lng, radius in [(17.40, 78.48, 0.5), (17.40, 78.48, 3), (17.2, 78.1, 12), (16.0, 77.0, 5)]:
+        found, distances = index.query_radius(lat, lng, radius)
+        brute = haversine_km(lat, lng, lats, lngs)
+        assert sorted(found.tolist()) == np.flatnonzero(brute <= radius).tolist()
+        assert np.allclose(distances, brute[found])
+        assert np.all(np.diff(distances) >= 0)
+
+
+def test_nearest_matches_brute_force():
+    lats, lngs = points()
+    index = SpatialIndex(lats, lngs, cell_size=0.01)
+    for lat, lng in [(17.40, 78.48), (17.75, 78.85), (18.5, 79.5)]:
+        brute = haversine_km(lat, lng, lats, lngs)
+        for k in (1, 10, 50):
+            found, distances = index.query_nearest(lat, lng, k=k)
+            assert np.allclose(distances, np.sort(brute)[:k])
+            assert np.allclose(brute[found], distances)
+
+        found, distances = index.query_nearest(lat, lng, k=20, max_radius_km=2)
+        assert found.tolist() == [i for i in np.argsort(brute, kind='stable')[:20] if brute[i] <= 2]
+    assert index.query_nearest(17.4, 78.48, k=0)[0].size == 0
+    assert SpatialIndex([], []).query_nearest(17.4, 78.48, k=3)[0].size == 0
+
+
+def test_polyline_matches_brute_force():
+    lats, lngs = points()
+    index = SpatialIndex(lats, lngs, cell_size=0.01)
+    route = [[78.40, 17.35], [78.45, 17.38], [78.50, 17.40], [78.52, 17.46]]   # [lng, lat] pairs
+    a, b = np.array(route[:-1]), np.array(route[1:])
+
+    for distance in (0.2, 1.0):
+        brute = points_to_segments_dist(lats, lngs, a[:, 1], a[:, 0], b[:, 1], b[:, 0]).min(axis=1) * KM_PER_DEGREE
+        expected = np.flatnonzero(brute <= distance).tolist()
+        assert index.query_polyline(route, distance).tolist() == expected
+        assert set(expected) <= set(index.query_polyline(route, distance, exact=False).tolist())
+
+    single = index.query_polyline([route[0]], 1.0)
+    brute = np.hypot(lats - route[0][1], lngs - route[0][0]) * KM_PER_DEGREE
+    assert single.tolist() == np.flatnonzero(brute <= 1.0).tolist()
+
+
+def test_box_and_records():
+    lats, lngs = points(500)
+    records = [{'id': f'c{i}', 'latitude': lat, 'longitude': lng} for i, (lat, lng) in enumerate(zip(lats, lngs))]
+    records.append({'id': 'no-location', 'latitude': None, 'longitude': 78.4})
+    index = SpatialIndex.from_records(records)
+    assert len(index) == 500 and index.ids[0] == 'c0'
+
+    found = index.query_box(17.38, 78.46, 17.42, 78.50)
+    inside = (lats >= 17.38) & (lats <= 17.42) & (lngs >= 78.46) & (lngs <= 78.50)
+    assert found.tolist() == np.flatnonzero(inside).tolist()
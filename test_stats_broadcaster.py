@@ -0,0 +1,85 @@
+import threading
+import time
+
+from stats_broadcaster import CoalescingBroadcaster, dict_diff
+
+
+def merge(state, diff):
+    """What the alerts page does with a diff payload"""
+    merged = dict(state)
+    for key, value in diff.items():
+        if value is None:
+            merged.pop(key, None)
+        elif isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+def test_diff_round_trips_through_merge():
+    old = {'total': 3, 'by_type': {'theft': 2, 'assault': 1}, 'gone': 1}
+    new = {'total': 4, 'by_type': {'theft': 2, 'fraud': 2}, 'added': True}
+    diff = dict_diff(old, new)
+    assert diff == {'total': 4, 'by_type': {'fraud': 2, 'assault': None}, 'gone': None, 'added': True}
+    assert merge(old, diff) == new
+
+
+def test_burst_in_one_window_is_one_merged_diff():
+    emitted = []
+    lock = threading.Lock()
+    state = {'total_crimes': 0, 'by_type': {}}
+
+    def produce():
+        with lock:
+            return {'total_crimes': state['total_crimes'], 'by_type': dict(state['by_type'])}
+
+    broadcaster = CoalescingBroadcaster(lambda event, payload: emitted.append((event, payload)), window=0.2)
+    try:
+        broadcaster.register('stats', produce, min_interval=0, full_every=100)
+        broadcaster.mark_dirty('stats')
+        wait_for(lambda: len(emitted) == 1)
+        first = emitted[0][1]
+        assert first['full'] and first['seq'] == 1
+
+        for crime_type in ['theft'] * 7 + ['assault'] * 3:
+            with lock:
+                state['total_crimes'] += 1
+                state['by_type'][crime_type] = state['by_type'].get(crime_type, 0) + 1
+            broadcaster.mark_dirty('stats')
+        wait_for(lambda: len(emitted) == 2)
+        time.sleep(0.3)
+
+        assert len(emitted) == 2
+        event, payload = emitted[1]
+        assert event == 'stats' and not payload['full']
+        assert (payload['seq'], payload['base_seq'], payload['epoch']) == (2, 1, first['epoch'])
+        assert payload['data'] == {'total_crimes': 10, 'by_type': {'theft': 7, 'assault': 3}}
+        assert merge(first['data'], payload['data']) == produce()
+
+        stats = broadcaster.get_stats()['events']['stats']
+        assert (stats['marks'], stats['emits']) == (11, 2)
+    finally:
+        broadcaster.stop()
+
+
+def test_unchanged_state_is_not_emitted():
+    emitted = []
+    broadcaster = CoalescingBroadcaster(lambda event, payload: emitted.append(payload), window=0.01)
+    try:
+        broadcaster.register('stats', lambda: {'total_crimes': 1}, min_interval=0)
+        broadcaster.mark_dirty('stats')
+        wait_for(lambda: len(emitted) == 1)
+        broadcaster.mark_dirty('stats')
+        wait_for(lambda: broadcaster.get_stats()['events']['stats']['unchanged_skipped'] == 1)
+        assert len(emitted) == 1
+        assert broadcaster.full_payload('stats')['seq'] == 1
+    finally:
+        broadcaster.stop()